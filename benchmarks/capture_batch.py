@@ -0,0 +1,76 @@
+"""
+Benchmark: creating capture requests one by one via POST /capture vs at once via POST /captures/batch.
+
+Runs against the database configured in config.py, using Flask's test client.
+Capture tasks are not enqueued: calls to `start_capture_process.delay()` are counted instead.
+Records created by this script are deleted once it completes.
+
+Usage:
+    poetry run python benchmarks/capture_batch.py --count 300
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+
+from scoop_rest_api import create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=300, help="Number of capture requests.")
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config["MAX_PENDING_CAPTURES"] = max(app.config["MAX_PENDING_CAPTURES"], args.count * 2)
+    app.config["CAPTURE_BATCH_MAX_SIZE"] = max(app.config["CAPTURE_BATCH_MAX_SIZE"], args.count)
+    client = app.test_client()
+
+    with app.app_context():
+        from scoop_rest_api.models import AccessKey, Capture
+
+        access_key_digest = AccessKey.create_key_digest(salt=app.config["ACCESS_KEY_SALT"])
+        access_key = AccessKey.create(label="Benchmark", key_digest=access_key_digest[1])
+        headers = {"Access-Key": access_key_digest[0]}
+        captures = [
+            {"url": f"https://example.com/?page={i}", "callback_url": "https://example.com/cb"}
+            for i in range(0, args.count)
+        ]
+
+        try:
+            with (
+                patch("scoop_rest_api.views.capture.start_capture_process") as single_task,
+                patch("scoop_rest_api.views.captures.start_capture_process") as batch_task,
+            ):
+                start = time.perf_counter()
+                for capture in captures:
+                    response = client.post("/capture", headers=headers, json=capture)
+                    assert response.status_code == 200, response.get_json()
+                single_duration = time.perf_counter() - start
+
+                Capture.delete().where(Capture.id_access_key == access_key).execute()
+
+                start = time.perf_counter()
+                response = client.post(
+                    "/captures/batch", headers=headers, json={"captures": captures}
+                )
+                assert response.status_code == 200, response.get_json()
+                batch_duration = time.perf_counter() - start
+
+            print(f"{args.count} capture requests")
+            print(
+                f"- POST /capture (x{args.count}): {single_duration:.3f}s "
+                f"({single_task.delay.call_count} capture tasks enqueued)"
+            )
+            print(
+                f"- POST /captures/batch (x1): {batch_duration:.3f}s "
+                f"({batch_task.delay.call_count} capture tasks enqueued)"
+            )
+            print(f"- Speedup: {single_duration / batch_duration:.1f}x")
+        finally:
+            Capture.delete().where(Capture.id_access_key == access_key).execute()
+            access_key.delete_instance()
+
+
+if __name__ == "__main__":
+    main()
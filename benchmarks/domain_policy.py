@@ -0,0 +1,84 @@
+"""
+Benchmark: matching domains against per-domain settings (CUSTOM_USER_AGENT_DOMAINS).
+
+Compares:
+- The former `get_custom_agents`: substring scan of every configured domain, for every lookup.
+- `utils.DomainPolicy`: reversed-label suffix trie, compiled once.
+
+Does not require a database.
+
+Usage:
+    poetry run python benchmarks/domain_policy.py --entries 10 1000 10000
+"""
+
+import argparse
+import random
+import string
+import time
+
+from scoop_rest_api.utils import DomainPolicy
+
+
+def random_label(length: int = 8) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+def substring_scan(domain: str, custom_domains: dict) -> dict | None:
+    """Former implementation of `get_custom_agents`."""
+    for d, agents in custom_domains.items():
+        if d in domain:
+            return agents
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--entries", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--lookups", type=int, default=20000, help="Number of lookups.")
+    args = parser.parse_args()
+
+    random.seed(0)
+    tlds = ["com", "org", "gov", "edu", "net"]
+
+    for entries in args.entries:
+        custom_domains = {
+            f"{random_label()}.{random.choice(tlds)}": {"validator_ua": f"Validator {i}"}
+            for i in range(0, entries)
+        }
+        configured = list(custom_domains)
+
+        # Half of the lookups are subdomains of configured domains, half are not configured
+        domains = [
+            (
+                f"www.{random.choice(configured)}"
+                if i % 2
+                else f"{random_label()}.{random.choice(tlds)}"
+            )
+            for i in range(0, args.lookups)
+        ]
+
+        start = time.perf_counter()
+        policy = DomainPolicy.from_config(
+            {
+                "CUSTOM_USER_AGENT_DOMAINS": custom_domains,
+                "VIDEO_ATTACHMENT_DOMAINS": [],
+                "SCOOP_DOMAIN_PROFILES": {},
+            }
+        )
+        compile_duration = time.perf_counter() - start
+
+        print(f"{entries} entries (compiled in {compile_duration * 1000:.2f}ms):")
+
+        for name, candidate in [
+            ("substring scan (former)", lambda domain: substring_scan(domain, custom_domains)),
+            ("DomainPolicy", policy.match),
+        ]:
+            start = time.perf_counter()
+            for domain in domains:
+                candidate(domain)
+            duration = time.perf_counter() - start
+            print(f"- {name}: {args.lookups / duration:,.0f} lookups/s")
+
+
+if __name__ == "__main__":
+    main()
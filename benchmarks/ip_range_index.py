@@ -0,0 +1,71 @@
+"""
+Benchmark: checking IP addresses against BANNED_IP_RANGES.
+
+Compares:
+- The former `validate_ip`: parsing every range of BANNED_IP_RANGES with netaddr, for every check.
+- `utils.IPRangeIndex`: ranges compiled once into sorted intervals, checked via binary search.
+
+Does not require a database.
+
+Usage:
+    poetry run python benchmarks/ip_range_index.py --count 100000
+"""
+
+import argparse
+import ipaddress
+import random
+import time
+
+from netaddr import IPAddress, IPNetwork
+
+from scoop_rest_api import config
+from scoop_rest_api.utils import IPRangeIndex
+
+
+def linear_scan(ip: str, banned_ip_ranges: list[str]) -> bool:
+    """Former implementation of `validate_ip` (True if allowed)."""
+    ip = IPAddress(ip)
+    for banned_ip_range in banned_ip_ranges:
+        if IPAddress(ip) in IPNetwork(banned_ip_range):
+            return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=100_000, help="Number of lookups.")
+    args = parser.parse_args()
+
+    random.seed(0)
+    banned_ip_ranges = config.BANNED_IP_RANGES
+    addresses = [
+        (
+            str(ipaddress.IPv4Address(random.getrandbits(32)))
+            if i % 2
+            else str(ipaddress.IPv6Address(random.getrandbits(128)))
+        )
+        for i in range(0, args.count)
+    ]
+
+    start = time.perf_counter()
+    index = IPRangeIndex(banned_ip_ranges)
+    print(f"Compiled {len(banned_ip_ranges)} ranges into {len(index)} intervals", end=" ")
+    print(f"in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    candidates = {
+        "netaddr, linear scan (former)": lambda ip: linear_scan(ip, banned_ip_ranges),
+        "IPRangeIndex": lambda ip: ip not in index,
+    }
+
+    results = {}
+    for name, candidate in candidates.items():
+        start = time.perf_counter()
+        results[name] = [candidate(address) for address in addresses]
+        duration = time.perf_counter() - start
+        print(f"- {name}: {args.count / duration:,.0f} lookups/s")
+
+    assert len(set(tuple(result) for result in results.values())) == 1, "Results differ"
+
+
+if __name__ == "__main__":
+    main()
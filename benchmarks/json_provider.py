@@ -0,0 +1,88 @@
+"""
+Benchmark: serializing user-facing capture information, with large Scoop summaries and logs.
+
+Compares:
+- The former callback path: Flask's default provider via `jsonify`, decoded, parsed with
+  `json.loads` and serialized again by `requests`.
+- Flask's default JSON provider.
+- `utils.FastJSONProvider` (backed by orjson).
+
+Does not require a database.
+
+Usage:
+    poetry run python benchmarks/json_provider.py --resources 5000 --logs-size 5000000
+"""
+
+import argparse
+import datetime
+import json
+import timeit
+import uuid
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from scoop_rest_api.utils.json_provider import FastJSONProvider
+
+
+def build_capture_dict(resources: int, logs_size: int) -> dict:
+    """Returns a dictionary shaped like the output of `utils.capture_to_dict` for a large capture."""
+    now = datetime.datetime.now(datetime.UTC)
+    log_line = "2023-06-28T16:30:28.000Z | INFO | Capturing https://example.com/resource\n"
+
+    return {
+        "id_capture": uuid.uuid4(),
+        "status": "success",
+        "created_timestamp": now,
+        "started_timestamp": now,
+        "ended_timestamp": now,
+        "url": "https://example.com",
+        "callback_url": "https://example.com/callback",
+        "stdout_logs": log_line * (logs_size // len(log_line)),
+        "stderr_logs": "",
+        "scoop_capture_summary": {
+            "state": 4,
+            "states": ["INIT", "SETUP", "CAPTURE", "COMPLETE", "PARTIAL"],
+            "exchangeUrls": [f"https://example.com/resource/{i}" for i in range(0, resources)],
+            "attachments": {
+                "screenshot": "screenshot.png",
+                "certificates": [f"host-{i}.pem" for i in range(0, 20)],
+            },
+            "options": {"captureTimeout": 45000, "headless": False},
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--resources", type=int, default=5000, help="Exchanges in the summary.")
+    parser.add_argument("--logs-size", type=int, default=5_000_000, help="Size of logs (bytes).")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    data = build_capture_dict(args.resources, args.logs_size)
+
+    def former_callback_path():
+        with app.app_context():
+            json_data = json.loads(jsonify(data).data.decode("utf-8"))
+        return json.dumps(json_data).encode("utf-8")  # As done by requests' `json=`
+
+    candidates = {
+        "jsonify + json.loads + json.dumps (former callbacks)": former_callback_path,
+        "DefaultJSONProvider.dumps": lambda: default_provider.dumps(data).encode("utf-8"),
+        "FastJSONProvider.dumps_bytes": lambda: fast_provider.dumps_bytes(data),
+    }
+
+    payload_size = len(fast_provider.dumps_bytes(data))
+    print(f"Payload: {payload_size / 1_000_000:.1f} MB")
+
+    for name, candidate in candidates.items():
+        duration = min(timeit.repeat(candidate, number=1, repeat=args.runs))
+        print(f"- {name}: {duration * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: concurrent URL validations per process, and leaks under slow servers.
+
+Compares `utils.get_response` (asyncio validation engine) with the former approach:
+one thread, and one `requests.Session`, per validation, abandoned after a join timeout.
+
+Runs against a local HTTP server which answers after `--latency` seconds, or trickles headers
+forever for /hang.
+Does not require a database.
+
+Usage:
+    poetry run python benchmarks/validation_engine.py --concurrency 200 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+import requests
+
+from scoop_rest_api import create_app
+
+
+def start_server(latency: float) -> int:
+    """Starts a local HTTP server in a background thread. Returns its port."""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    port = None
+
+    async def handle(reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+
+            # Never finish sending headers, but keep the connection busy (defeats read timeouts),
+            # until the client gives up and closes the connection.
+            if request.startswith(b"GET /hang"):
+                writer.write(b"HTTP/1.1 200 OK\r\n")
+                while not reader.at_eof():
+                    writer.write(b"X-Slow: 1\r\n")
+                    await writer.drain()
+                    await asyncio.sleep(0.5)
+                return
+
+            await asyncio.sleep(latency)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 648\r\n\r\n")
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        nonlocal port
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=4096)
+        port = server.sockets[0].getsockname()[1]
+        started.set()
+        await server.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(serve(),), daemon=True).start()
+    started.wait()
+    return port
+
+
+def legacy_get_response(url: str, timeout: float):
+    """Former implementation: a thread per validation, abandoned if it does not complete."""
+    result = {}
+
+    def run():
+        try:
+            with requests.Session() as session:
+                result["response"] = session.get(url, timeout=max(timeout - 1, 1), stream=True)
+                result["response"].close()
+        except requests.RequestException:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=timeout)
+    return result.get("response")
+
+
+def count_fds() -> int:
+    return len(os.listdir("/proc/self/fd")) if os.path.exists("/proc/self/fd") else -1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent validations.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Server latency (seconds).")
+    parser.add_argument("--timeout", type=float, default=2, help="Validation timeout (seconds).")
+    args = parser.parse_args()
+
+    port = start_server(args.latency)
+    app = create_app()
+    app.logger.setLevel(logging.WARNING)
+    app.config["VALIDATION_TIMEOUT"] = args.timeout
+    app.config["VALIDATION_MAX_CONNECTIONS"] = max(args.concurrency, 1)
+
+    def engine_get_response(url: str, timeout: float):
+        with app.app_context():
+            from scoop_rest_api.utils import get_response
+
+            return get_response(url)
+
+    # Request threads of the API process (i.e: gunicorn gthread workers) are simulated by a pool
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for name, get_response in [
+            ("thread per validation (former)", legacy_get_response),
+            ("asyncio engine", engine_get_response),
+        ]:
+            get_response(f"http://127.0.0.1:{port}/", args.timeout)  # Warm up
+
+            # Throughput
+            url = f"http://127.0.0.1:{port}/"
+            start = time.perf_counter()
+            futures = [
+                pool.submit(get_response, url, args.timeout) for i in range(0, args.concurrency)
+            ]
+            ok = sum(1 for future in futures if future.result() is not None)
+            duration = time.perf_counter() - start
+
+            print(f"{name}:")
+            print(f"- {args.concurrency} validations in {duration:.2f}s ({ok} succeeded)")
+
+            # Leaks: validations of a server that never answers time out
+            threads_before, fds_before = threading.active_count(), count_fds()
+            url = f"http://127.0.0.1:{port}/hang"
+            futures = [
+                pool.submit(get_response, url, args.timeout) for i in range(0, args.concurrency)
+            ]
+            [future.result() for future in futures]
+            time.sleep(0.5)
+
+            print(
+                f"- After {args.concurrency} timeouts: "
+                f"{threading.active_count() - threads_before:+d} threads, "
+                f"{count_fds() - fds_before:+d} open file descriptors"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,12 @@ if [ "$1" = '/bin/bash' ]; then
     if [ "$START_CELERY" = 'true' ]; then
         echo "Launching Celery."
         poetry run celery -A make_celery worker --loglevel=info --concurrency=3 --without-gossip --without-mingle --without-heartbeat -B -Q main,background -n w1@%h &
+        # Callbacks are delivered by a separate pool, so that capture slots never wait on them
+        poetry run celery -A make_celery worker --loglevel=info --concurrency=4 --without-gossip --without-mingle --without-heartbeat -Q callbacks -n callbacks@%h &
+        # Heavy captures are processed by a separate pool, if routed (see CAPTURE_ROUTING_ENABLED)
+        if [ "$CAPTURE_ROUTING_ENABLED" = 'True' ]; then
+            poetry run celery -A make_celery worker --loglevel=info --concurrency=${CAPTURE_HEAVY_WORKER_SLOTS:-1} --without-gossip --without-mingle --without-heartbeat -Q heavy -n heavy@%h &
+        fi
     else
         echo "Not launching Celery."
     fi
@@ -6,6 +6,7 @@ import logging
 from pathlib import Path
 
 from celery import Celery, Task
+from celery.signals import worker_ready
 from flask import Flask
 
 from scoop_rest_api import utils
@@ -18,6 +19,7 @@ def create_app(config_override: dict = {}):
     """
     app = Flask(__name__)
     app.config.from_object("scoop_rest_api.config")
+    app.json = utils.FastJSONProvider(app)
 
     # Handle config override
     if config_override and isinstance(config_override, dict):
@@ -33,6 +35,31 @@ def create_app(config_override: dict = {}):
         # Check that provided configuration is sufficient to run the app
         utils.config_check()
 
+        # Banned IP ranges, compiled once (see utils.validate_ip)
+        app.extensions["banned_ip_ranges"] = utils.IPRangeIndex(app.config["BANNED_IP_RANGES"])
+
+        # Per-domain settings, compiled once (see utils.DomainPolicy)
+        app.extensions["domain_policy"] = utils.DomainPolicy.from_config(app.config)
+
+        # Per-process cache for small artifacts (see views.artifact)
+        app.extensions["artifact_cache"] = utils.ByteLRUCache(
+            app.config["ARTIFACT_CACHE_SIZE"],
+            app.config["ARTIFACT_CACHE_MAX_ITEM_SIZE"],
+        )
+
+        # Compression of JSON responses, and per-process cache of compressed responses
+        # for captures in a final state (see utils.response_compression)
+        app.extensions["compression_cache"] = utils.ByteLRUCache(
+            app.config["COMPRESSION_CACHE_SIZE"],
+            app.config["COMPRESSION_CACHE_MAX_ITEM_SIZE"],
+        )
+        app.after_request(utils.compress_response)
+
+        # Per-process cache of URL validation results (see views.validate)
+        app.extensions["validation_cache"] = utils.TTLCache(
+            app.config["VALIDATION_CACHE_MAX_ENTRIES"]
+        )
+
         # Import views
         from scoop_rest_api import commands, views
 
@@ -56,6 +83,14 @@ def create_celery_app(app: Flask) -> Celery:
 
     celery_app = Celery(app.name, task_cls=FlaskTask)
 
+    def on_worker_ready(**kwargs) -> None:
+        """Cleans up after workers that previously crashed or were killed mid-capture."""
+        with app.app_context():
+            utils.reap_orphaned_process_groups()
+            utils.reclaim_orphaned_workspaces()
+
+    worker_ready.connect(on_worker_ready, weak=False)
+
     # only schedule those celerybeat tasks that are listed in CELERYBEAT_TASKS
     celerybeat_schedule = {}
     for task_name, task_config in app.config["CELERY_SETTINGS"]["beat_schedule"].items():
@@ -67,6 +102,10 @@ def create_celery_app(app: Flask) -> Celery:
         app.config["CELERY_SETTINGS"].pop("result_backend", None)
 
     celery_app.config_from_object(app.config["CELERY_SETTINGS"])
+
+    # Needed by tasks.route_capture_task, which may run outside of an app context
+    celery_app.conf.capture_routing_enabled = app.config["CAPTURE_ROUTING_ENABLED"]
+
     celery_app.set_default()
     app.extensions["celery"] = celery_app
     return celery_app
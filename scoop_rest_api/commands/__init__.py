@@ -9,3 +9,4 @@ from .cancel_access_key import cancel_access_key
 from .status import status
 from .cleanup import cleanup, cleanup_local, cleanup_global
 from .inspect_capture import inspect_capture
+from .domain_stats import domain_stats
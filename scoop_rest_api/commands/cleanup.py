@@ -12,6 +12,7 @@ from pathlib import Path
 from flask import current_app
 
 from ..models import Capture
+from ..utils import reap_orphaned_process_groups, reclaim_orphaned_workspaces
 
 #
 # Commands
@@ -22,6 +23,7 @@ from ..models import Capture
 def cleanup() -> None:
     """
     - Clears expired files from temporary storage .
+    - Reaps orphaned Scoop processes.
     - Clears expired captures from the database.
     - Marks failed captures as failed.
     """
@@ -32,7 +34,7 @@ def cleanup() -> None:
 @current_app.cli.command("cleanup-local")
 def cleanup_local() -> None:
     """
-    Clears temporary storage of expired files.
+    Clears temporary storage of expired files and reaps orphaned Scoop processes.
     """
     _cleanup_local()
 
@@ -52,7 +54,7 @@ def cleanup_global() -> None:
 
 def _cleanup_local() -> None:
     """
-    Clears temporary storage of expired files.
+    Clears temporary storage of expired files and reaps orphaned Scoop processes.
     """
     TEMPORARY_STORAGE_EXPIRATION = int(current_app.config["TEMPORARY_STORAGE_EXPIRATION"])
 
@@ -74,6 +76,19 @@ def _cleanup_local() -> None:
     else:
         click.echo(f"No Scoop tmp dir to clean.")
 
+    #
+    # Capture workspaces left behind by workers that crashed or were killed mid-capture.
+    #
+    workspaces_start = time.time()
+    reclaimed = reclaim_orphaned_workspaces()
+    click.echo(f"Reclaimed {reclaimed} capture workspaces in {time.time() - workspaces_start}.")
+
+    #
+    # Scoop processes left behind by workers that crashed or were killed mid-capture.
+    #
+    reaped = reap_orphaned_process_groups()
+    click.echo(f"Reaped {reaped} orphaned Scoop process groups.")
+
 
 def _cleanup_global() -> None:
     """
@@ -97,9 +112,11 @@ def _cleanup_global() -> None:
                 f"Retrieved stale started captures in {time.time() - stale_started_captures_query_start}."
             )
         click.echo(f"#{capture.id_capture} is stale and will be marked as failed.")
-        capture.status = "failed"
-        capture.ended_timestamp = datetime.datetime.utcnow()
-        capture.save()
+        capture.update_if_started(
+            status="failed",
+            failed_reason="stale",
+            ended_timestamp=datetime.datetime.utcnow(),
+        )
     else:
         queryset_evaluated = True
         click.echo(
@@ -4,8 +4,9 @@
 
 import click
 from flask import current_app
+from playhouse.migrate import PostgresqlMigrator, migrate
 
-from ..utils import get_db
+from ..utils import create_capture_events_trigger, get_db
 
 
 @current_app.cli.command("create-tables")
@@ -13,10 +14,33 @@ def create_tables() -> None:
     """
     Initializes database for the Scoop REST API.
     Tables will be created only if they don't already exist.
+    Columns and indexes added to existing models since will be added to existing tables.
+    Triggers (see utils.capture_events) are created or replaced.
     """
-    from ..models import AccessKey, Capture
+    from ..models import AccessKey, Capture, DomainStats
+
+    models = [AccessKey, Capture, DomainStats]
+    db = get_db()
 
     click.echo("Creating tables...")
-    get_db().create_tables([AccessKey, Capture])
+    db.create_tables(models)
+
+    migrator = PostgresqlMigrator(db)
+    for model in models:
+        table_name = model._meta.table_name
+        existing_columns = [column.name for column in db.get_columns(table_name)]
+
+        for field in model._meta.sorted_fields:
+            if field.column_name not in existing_columns:
+                click.echo(f"Adding {table_name}.{field.column_name}...")
+                migrate(migrator.add_column(table_name, field.column_name, field))
+
+        # Indexes added to existing models since are not created by `create_tables`
+        for index in model._meta.fields_to_index():
+            db.execute(index.safe(True))
+
+    click.echo("Creating triggers...")
+    create_capture_events_trigger(db)
+
     click.echo("Done.")
     exit(0)
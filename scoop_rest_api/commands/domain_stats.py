@@ -0,0 +1,62 @@
+"""
+`commands.domain_stats` module: Controller for the `domain-stats` CLI command.
+"""
+
+import click
+from flask import current_app
+
+from ..models import DomainStats
+
+SORT_FIELDS = {
+    "captures": DomainStats.total_captures,
+    "duration": DomainStats.p50_duration,
+    "failure-rate": DomainStats.failure_rate,
+    "size": DomainStats.mean_archive_size,
+}
+""" Fields by which the report can be sorted (in descending order). """
+
+
+@current_app.cli.command("domain-stats")
+@click.option("--domain", required=False, type=str, help="Only report on this domain name.")
+@click.option("--sort", default="captures", type=click.Choice(list(SORT_FIELDS.keys())))
+@click.option("--limit", default=20, type=int, help="Maximum number of domains to report on.")
+def domain_stats(domain: str | None, sort: str, limit: int) -> None:
+    """
+    Prints capture statistics per domain name (see models.DomainStats):
+    - Number of captures, and failure rate over the last DOMAIN_STATS_WINDOW captures
+    - Median and 90th percentile of capture duration
+    - Average archive size
+    - Circuit breaker state
+    """
+    entries = DomainStats.select().order_by(
+        SORT_FIELDS[sort].desc(nulls="LAST"), DomainStats.domain
+    )
+
+    if domain:
+        entries = entries.where(DomainStats.domain == domain.lower().rstrip("."))
+
+    entries = list(entries.limit(limit))
+
+    click.echo(80 * "-")
+    click.echo(f"Domain statistics (sorted by {sort}):")
+    click.echo(80 * "-")
+
+    for entry in entries:
+        output = f"{entry.domain} "
+        output += f"captures: {entry.total_captures} "
+
+        if entry.failure_rate is not None:
+            output += f"failure rate: {entry.failure_rate:.1%} "
+
+        if entry.p50_duration is not None:
+            output += f"p50: {entry.p50_duration:.1f}s p90: {entry.p90_duration:.1f}s "
+
+        if entry.mean_archive_size is not None:
+            output += f"size: {entry.mean_archive_size / 1024 / 1024:.2f} MB "
+
+        if entry.breaker_opened_timestamp is not None:
+            output += f"circuit breaker open since: {entry.breaker_opened_timestamp} "
+
+        click.echo(output.strip())
+
+    click.echo(f"-- {len(entries)} domain(s).")
@@ -25,9 +25,12 @@ def inspect_capture(id_capture: int) -> None:
     except ValueError:
         click.echo("Invalid format for id_capture.")
 
-    try:
-        capture = Capture.get(Capture.id_capture == id_capture)
-    except Capture.DoesNotExist:
+    # Artifacts are not part of the report: no need to pull them from the database
+    capture = (
+        Capture.select_without_artifacts().where(Capture.id_capture == id_capture).get_or_none()
+    )
+
+    if capture is None:
         click.echo(f"Capture #{id_capture} could not be found.")
         exit(1)
 
@@ -40,6 +43,9 @@ def inspect_capture(id_capture: int) -> None:
                 "id_access_key": int(str(capture.id_access_key)),
                 "url": capture.url,
                 "callback_url": capture.callback_url,
+                "callback_status": capture.callback_status,
+                "callback_attempts": capture.callback_attempts,
+                "callback_last_status_code": capture.callback_last_status_code,
                 "status": capture.status,
                 "created_timestamp": capture.created_timestamp,
                 "started_timestamp": capture.started_timestamp,
@@ -22,6 +22,99 @@ ACCESS_KEY_SALT = os.environ.get(
 MAX_PENDING_CAPTURES = 300
 """ Stop accepting new capture requests if there are over X captures in the queue. """
 
+CAPTURE_BATCH_MAX_SIZE = 300
+""" Maximum number of capture requests accepted at once by POST /captures/batch. """
+
+CAPTURE_STATUS_MAX_SIZE = 300
+""" Maximum number of capture ids accepted at once by POST /captures/status. """
+
+CAPTURE_LIST_PAGE_SIZE = 100
+""" Default number of captures per page for GET /captures. """
+
+CAPTURE_LIST_MAX_PAGE_SIZE = 1000
+""" Maximum number of captures per page for GET /captures. """
+
+CAPTURE_WORKER_SLOTS = 3
+"""
+How many captures can run at once, across all workers consuming the "main" queue.
+Should match the workers' total concurrency. Used to avoid enqueuing more capture tasks than can run.
+"""
+
+CAPTURE_ROUTING_ENABLED = os.environ.get("CAPTURE_ROUTING_ENABLED", "False") == "True"
+"""
+If `True`, "heavy" captures (see utils.classify_capture) are processed by workers consuming the
+"heavy" queue, and "light" captures by workers consuming the "main" queue.
+If `False`, workers consuming the "main" queue process all captures, in order.
+"""
+
+CAPTURE_HEAVY_WORKER_SLOTS = int(os.environ.get("CAPTURE_HEAVY_WORKER_SLOTS", "1"))
+"""
+How many captures can run at once, across all workers consuming the "heavy" queue.
+Only used if CAPTURE_ROUTING_ENABLED is `True`. See CAPTURE_WORKER_SLOTS.
+"""
+
+CAPTURE_HEAVY_CONTENT_LENGTH = 50 * 1024 * 1024
+""" URLs reporting at least that many bytes upon validation are considered "heavy" captures. """
+
+CAPTURE_HEAVY_PROFILES = ["media"]
+""" Captures using these capture profiles (see SCOOP_CAPTURE_PROFILES) are considered "heavy". """
+
+CAPTURE_HEAVY_ARCHIVE_SIZE = 50 * 1024 * 1024
+"""
+Captures of domains whose archives weigh that many bytes on average are considered "heavy"
+(see models.DomainStats).
+"""
+
+CAPTURE_HEAVY_DURATION = 40
+"""
+Captures of domains for which 1 in 10 captures takes that many seconds or more
+are considered "heavy" (see models.DomainStats).
+"""
+
+CAPTURE_SCHEDULING_POLICY = os.environ.get("CAPTURE_SCHEDULING_POLICY", "fifo")
+"""
+Order in which pending captures are processed:
+- "fifo": Oldest first.
+- "sjf": Shortest expected job first, based on past captures of the same domain, with aging.
+  See models.Capture.get_shortest_pending_capture.
+"""
+
+CAPTURE_SCHEDULING_WINDOW = 100
+""" "sjf" scheduling: how many of the oldest pending captures are considered at once. """
+
+CAPTURE_SCHEDULING_AGING = 0.1
+"""
+"sjf" scheduling: how many seconds are taken off a pending capture's expected duration
+for every second it spent waiting. Higher values are closer to "fifo".
+"""
+
+CAPTURE_SCHEDULING_DEFAULT_DURATION = 30
+""" "sjf" scheduling: expected duration of captures of domains without statistics (in seconds). """
+
+CIRCUIT_BREAKER_THRESHOLD = 5
+"""
+Captures of a domain fail right away, without running Scoop, after X consecutive failures
+(see models.DomainStats.check_circuit_breaker). 0 disables this behavior.
+"""
+
+CIRCUIT_BREAKER_WINDOW = 10 * 60
+""" Failures more than X seconds apart are not considered consecutive. """
+
+CIRCUIT_BREAKER_COOLDOWN = 5 * 60
+""" How long a domain's circuit breaker stays open before a capture is let through as a probe (in seconds). """  # noqa
+
+DOMAIN_STATS_WINDOW = 100
+""" Domain statistics are computed over the last X captures of a given domain (see models.DomainStats). """  # noqa
+
+SSE_HEARTBEAT_INTERVAL = 15
+""" How often to send a heartbeat on otherwise idle event streams (in seconds). """
+
+SSE_MAX_DURATION = 60
+"""
+How long event streams stay open for, at most (in seconds). Clients are expected to reconnect.
+Should stay below the WSGI server's worker timeout (i.e: gunicorn's --timeout).
+"""
+
 EXPOSE_SCOOP_LOGS = os.environ.get("EXPOSE_SCOOP_LOGS", "True") == "True"
 """ If `True`, Scoop logs will be exposed at API level by capture_to_dict. Handle with care. """
 
@@ -64,6 +157,46 @@ MAX_SUPPORTED_ARCHIVE_FILESIZE = int(os.environ.get("MAX_SUPPORTED_ARCHIVE_FILES
 TEMPORARY_STORAGE_EXPIRATION = os.environ.get("TEMPORARY_STORAGE_EXPIRATION", str(60 * 60 * 24))
 """ How long should temporary files be stored for? (In seconds). Can be provided via an environment variable. """  # noqa
 
+ARTIFACT_CACHE_SIZE = int(os.environ.get("ARTIFACT_CACHE_SIZE", 64 * 1024 * 1024))
+"""
+    How much memory each API process may use to cache recently served artifacts (in bytes).
+    Set to 0 to disable. Can be provided via an environment variable.
+"""
+
+ARTIFACT_CACHE_MAX_ITEM_SIZE = 1024 * 1024
+""" Artifacts larger than this are never cached (in bytes). """
+
+COMPRESSION_MIN_SIZE = 1024
+"""
+    JSON responses of this size or more are compressed, if the client accepts it (in bytes).
+    See utils.response_compression.
+"""
+
+COMPRESSION_CACHE_SIZE = int(os.environ.get("COMPRESSION_CACHE_SIZE", 16 * 1024 * 1024))
+"""
+    How much memory each API process may use to cache compressed responses of captures
+    in a final state (in bytes). Set to 0 to disable. Can be provided via an environment variable.
+"""
+
+COMPRESSION_CACHE_MAX_ITEM_SIZE = 1024 * 1024
+""" Compressed responses larger than this are never cached (in bytes). """
+
+CAPTURE_WORKSPACE_PATH = os.environ.get("CAPTURE_WORKSPACE_PATH", "/tmp/scoop-rest-api/workspaces")
+"""
+    Folder in which temporary capture workspaces are created (see utils.capture_workspace).
+    Can point to a tmpfs mount (i.e: /dev/shm/scoop-rest-api) to keep capture I/O in memory.
+    Can be provided via an environment variable.
+"""
+
+CAPTURE_WORKSPACE_QUOTA = int(os.environ.get("CAPTURE_WORKSPACE_QUOTA", 0)) or None
+"""
+    If set, how much space a capture may use in its workspace (in bytes).
+    Captures do not start unless that much space is available, and are stopped if they go over.
+    Can be provided via an environment variable.
+
+    Default: None (no quota)
+"""
+
 DEPLOYMENT_SENTINEL_PATH = "/tmp/deployment-pending"
 
 #
@@ -79,7 +212,43 @@ API_STORAGE_URL = f"{API_DOMAIN}/storage"
 # Background processing options
 #
 PROXY_PORT = 9000
-"""Default port for Scoop Proxy."""
+"""First port of the range leased to Scoop's proxy by concurrent captures on a given host."""
+
+PROXY_PORT_RANGE = 100
+"""Number of ports, starting at PROXY_PORT, that can be leased to Scoop's proxy on a given host."""
+
+PROXY_PORT_LEASE_PATH = "/tmp/scoop-rest-api/proxy-ports"
+"""Folder holding the lock files used to lease proxy ports (see utils.port_allocator)."""
+
+#
+# Callback settings
+#
+CALLBACK_TIMEOUT = 10
+""" How long to wait for a callback URL to respond (in seconds). """
+
+CALLBACK_MAX_ATTEMPTS = 6
+""" How many times delivering a callback should be attempted before giving up. """
+
+CALLBACK_RETRY_BACKOFF = 10
+""" Delay before the first callback delivery retry (in seconds). Doubles on every retry. """
+
+CALLBACK_RETRY_BACKOFF_MAX = 600
+""" Maximum delay between two callback delivery attempts (in seconds). """
+
+CALLBACK_POOL_MAXSIZE = 4
+""" Maximum number of keep-alive connections kept open per callback host, per process. """
+
+CALLBACK_SESSIONS_MAX = 100
+""" Maximum number of callback hosts keep-alive connections are kept for, per process. """
+
+CALLBACK_BATCH_WINDOW = 10
+"""
+How long batched callbacks (see "batch_callback" in POST /capture) are held for,
+so that captures completing in the meantime can be delivered together (in seconds).
+"""
+
+CALLBACK_BATCH_MAX_SIZE = 100
+""" Maximum number of captures per batched callback. Full batches are delivered right away. """
 
 #
 # Scoop settings
@@ -139,7 +308,7 @@ SCOOP_CLI_OPTIONS = {
     "--auto-play-media": "true",
     "--grab-secondary-resources": "true",
     "--run-site-specific-behaviors": "true",
-    "--headless": "false",  # Note: `xvfb-run --auto-servernum --` prefix may be needed if false.
+    "--headless": "false",  # Note: needs an X display if false (see `XVFB_DISPLAY_POOL`).
     # "--user-agent-suffix": "",
     "--blocklist": rf"/https?:\/\/localhost/,{','.join(BANNED_IP_RANGES)}",
     "--public-ip-resolver-endpoint": "https://icanhazip.com",
@@ -152,9 +321,89 @@ SCOOP_CLI_OPTIONS = {
     - utils.config_check.EXCLUDED_SCOOP_CLI_OPTIONS
 """
 
+SCOOP_CAPTURE_PROFILES = {
+    "document": {
+        "--pdf-snapshot": "false",
+        "--dom-snapshot": "false",
+        "--capture-video-as-attachment": "false",
+        "--auto-scroll": "false",
+        "--auto-play-media": "false",
+        "--run-site-specific-behaviors": "false",
+    },
+    "media": {
+        "--capture-video-as-attachment": "true",
+        "--auto-scroll": "true",
+        "--auto-play-media": "true",
+        "--run-site-specific-behaviors": "true",
+    },
+}
+"""
+    Named sets of Scoop CLI options, overriding SCOOP_CLI_OPTIONS for a given capture.
+    Can be selected per capture request (see views.capture) or per domain (see SCOOP_DOMAIN_PROFILES).
+
+    - "document": Skips capture phases that plain documents do not need.
+    - "media": Full capture, including videos (still subject to VIDEO_ATTACHMENT_DOMAINS).
+
+    Only options listed in utils.config_check.PROFILE_SCOOP_CLI_OPTIONS can be overridden.
+"""
+
+SCOOP_DOMAIN_PROFILES = json.loads(os.getenv("SCOOP_DOMAIN_PROFILES", "{}"))
+"""
+    Capture profile to use by default for a given domain and its subdomains.
+    The most specific match wins (see utils.DomainPolicy).
+    A profile selected via the capture request takes precedence.
+
+    Takes a JSON dictionary. Can be provided via an environment variable.
+
+    Example:
+    {"www.federalregister.gov": "document", "youtube.com": "media"}
+"""
+
 SCOOP_TIMEOUT_FUSE = 60
 """ Number of seconds to wait before "killing" a Scoop progress after capture timeout. """
 
+SCOOP_KILL_GRACE_PERIOD = 5
+""" Number of seconds Scoop's process tree is given to exit after SIGTERM, before being sent SIGKILL. """  # noqa
+
+SCOOP_MEMORY_LIMIT = int(os.environ.get("SCOOP_MEMORY_LIMIT", 0)) or None
+"""
+    If set, maximum size of the data segment (RLIMIT_DATA) of every process in Scoop's
+    process tree (browser, ffmpeg, yt-dlp ...). In bytes.
+    Can be provided via an environment variable.
+
+    Default: None (no limit)
+"""
+
+SCOOP_CPU_TIME_LIMIT = int(os.environ.get("SCOOP_CPU_TIME_LIMIT", 0)) or None
+"""
+    If set, maximum CPU time (RLIMIT_CPU) every process in Scoop's process tree may use. In seconds.
+    Can be provided via an environment variable.
+
+    Default: None (no limit)
+"""
+
+XVFB_DISPLAY_POOL = os.environ.get("XVFB_DISPLAY_POOL", "False") == "True"
+"""
+    If `True`, each concurrent capture gets its own Xvfb display, started and health-checked
+    on demand (see utils.display_pool), instead of sharing the display set via `DISPLAY`.
+    Only applies when Scoop runs in headful mode. Can be provided via an environment variable.
+"""
+
+XVFB_DISPLAY_BASE = 100
+""" Display number of the first capture slot's Xvfb server. Slot N uses XVFB_DISPLAY_BASE + N. """
+
+XVFB_SCREEN = "1920x1080x24"
+""" Screen size and depth of pooled Xvfb displays. Must fit --capture-window-x/y. """
+
+XVFB_STARTUP_TIMEOUT = 5
+""" Number of seconds to wait for a pooled Xvfb display to accept connections. """
+
+CANCEL_POLL_INTERVAL = 1
+""" How often (in seconds) running captures check whether they were canceled. """
+
+SCOOP_PROCESS_REGISTRY_PATH = "/tmp/scoop-rest-api/processes"
+""" Folder in which running Scoop process groups are recorded, so that orphans can be reaped. """
+
 if "VIDEO_ATTACHMENT_DOMAINS" in os.environ:
     VIDEO_ATTACHMENT_DOMAINS = os.environ["VIDEO_ATTACHMENT_DOMAINS"].split(",")
 else:
@@ -162,8 +411,8 @@ else:
 """
     Optionally override Scoop setting "--capture-video-as-attachment": "true",
     so that video captures are only attempted when the target URL's domain is
-    in this list. (May enhance performance; may reduce the incidence of
-    low-quality video captures.)
+    in this list, or is a subdomain of one of them. (May enhance performance;
+    may reduce the incidence of low-quality video captures.)
 """
 
 CUSTOM_USER_AGENT_DOMAINS = json.loads(os.getenv("CUSTOM_USER_AGENT_DOMAINS", "{}"))
@@ -171,7 +420,8 @@ CUSTOM_USER_AGENT_DOMAINS = json.loads(os.getenv("CUSTOM_USER_AGENT_DOMAINS", "{
     If the API should use a particular user agent header when validating URLs
     from a specific domain, and/or if Scoop should append a suffix to the browser's
     user agent header when making captures from that domain, you can supply those
-    strings using this setting.
+    strings using this setting. Settings apply to subdomains as well: if several entries match,
+    the most specific one wins (see utils.DomainPolicy).
 
     Takes a JSON dictionary.
 
@@ -199,6 +449,54 @@ VALIDATION_EXTRA_HEADERS = {
 
 VALIDATION_TIMEOUT = int(os.environ.get("VALIDATION_TIMEOUT", "45"))
 
+VALIDATION_MAX_CONNECTIONS = 100
+"""
+    How many validation requests each process may have in flight at once.
+    Further requests wait for a connection to be available (see utils.validation_engine).
+"""
+
+DNS_CACHE_TTL = 300
+"""
+    For how long the addresses a domain name resolves to are cached by each process (in seconds).
+    Shared by URL validation and capture pre-flight checks (see utils.dns_resolver).
+"""
+
+DNS_CACHE_NEGATIVE_TTL = 30
+""" Same as DNS_CACHE_TTL, for domain names which do not resolve. """
+
+DNS_CACHE_MAX_ENTRIES = 10000
+""" Maximum number of domain names cached by each process. """
+
+DNS_TIMEOUT = 5
+""" DNS lookups taking longer than this are considered failed (in seconds). """
+
+CAPTURE_PREFLIGHT_CHECK = True
+"""
+    If True, captures of URLs whose domain name does not resolve, or resolves to one of the
+    BANNED_IP_RANGES, are marked as failed without running Scoop.
+"""
+
+VALIDATION_CACHE_TTL = 300
+"""
+    For how long each process caches the result of validating a URL, if valid (in seconds).
+    Results are keyed by normalized URL and user agent (see views.validate).
+"""
+
+VALIDATION_CACHE_INVALID_TTL = 60
+""" Same as VALIDATION_CACHE_TTL, for URLs found to be invalid. """
+
+VALIDATION_CACHE_MAX_ENTRIES = 10000
+""" Maximum number of validation results cached by each process. Set to 0 to disable. """
+
+VALIDATION_BATCH_MAX_SIZE = 300
+""" Maximum number of URLs that can be validated at once via [POST] /validate/batch. """
+
+VALIDATION_BATCH_CONCURRENCY = 20
+""" How many URLs of a given [POST] /validate/batch request may be validated concurrently. """
+
+VALIDATION_BATCH_PER_HOST = 4
+""" Same as VALIDATION_BATCH_CONCURRENCY, for URLs sharing the same host. """
+
 
 # https://yozachar.github.io/pyvalidators/stable/api/url/
 # `strict_query`: Fail validation on query string parsing error.
@@ -219,14 +517,26 @@ CELERY_SETTINGS = {
     # If a task is running longer than seven minutes, kill it
     "task_time_limit": 420,
     "task_always_eager": False,
-    "task_routes": {
-        "scoop_rest_api.tasks.start_capture_process": {"queue": "main"},
-    },
+    "task_routes": [
+        # Routes heavy captures to the "heavy" queue (see CAPTURE_ROUTING_ENABLED)
+        "scoop_rest_api.tasks.route_capture_task",
+        {
+            "scoop_rest_api.tasks.start_capture_process": {"queue": "main"},
+            "scoop_rest_api.tasks.deliver_callback": {"queue": "callbacks"},
+            "scoop_rest_api.tasks.deliver_callback_batch": {"queue": "callbacks"},
+        },
+    ],
     "beat_schedule": {
         "run-next-capture": {
             "task": "scoop_rest_api.tasks.start_capture_process",
             "schedule": crontab(minute="*"),
-        }
+        },
+        # Only needed if CAPTURE_ROUTING_ENABLED is True
+        "run-next-heavy-capture": {
+            "task": "scoop_rest_api.tasks.start_capture_process",
+            "schedule": crontab(minute="*"),
+            "kwargs": {"capture_class": "heavy"},
+        },
     },
 }
 ENABLE_CELERY_BACKEND = os.environ.get("ENABLE_CELERY_BACKEND", "False") == "True"
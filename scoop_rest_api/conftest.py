@@ -83,10 +83,12 @@ def app():
 
         # Create tables
         with app.app_context():
-            from scoop_rest_api.utils import get_db
-            from scoop_rest_api.models import AccessKey, Capture
+            from scoop_rest_api.utils import create_capture_events_trigger, get_db
+            from scoop_rest_api.models import AccessKey, Capture, DomainStats
 
-            get_db().create_tables([AccessKey, Capture])
+            db = get_db()
+            db.create_tables([AccessKey, Capture, DomainStats])
+            create_capture_events_trigger(db)
 
         # Run tests
         yield app
@@ -107,14 +109,24 @@ def database_cleanup(app):
     Clear leftover records before each test.
     """
     with app.app_context():
-        from scoop_rest_api.models import AccessKey, Capture
+        from scoop_rest_api.models import AccessKey, Capture, DomainStats
 
         Capture.delete().execute()
         AccessKey.delete().execute()
+        DomainStats.delete().execute()
 
         yield
 
 
+@pytest.fixture(autouse=True)
+def cache_cleanup(app):
+    """
+    Clear in-process caches before each test.
+    """
+    for cache in ["artifact_cache", "compression_cache", "validation_cache"]:
+        app.extensions[cache].clear()
+
+
 @pytest.fixture()
 def access_key(app) -> dict:
     """
@@ -159,8 +171,8 @@ def celery_worker_parameters():
         # of the vanilla Celery testing app, so disable the ping check
         "perform_ping_check": False,
         # Configure the test worker to listen for tasks sent to
-        # our "main" queue
-        "queues": ["main", "background"],
+        # our "main", "heavy" and "callbacks" queues
+        "queues": ["main", "heavy", "background", "callbacks"],
     }
 
 
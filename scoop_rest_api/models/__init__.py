@@ -3,4 +3,5 @@
 """
 
 from .access_key import AccessKey
+from .domain_stats import DomainStats
 from .capture import Capture
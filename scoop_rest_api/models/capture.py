@@ -5,18 +5,16 @@
 from __future__ import annotations
 
 import datetime
-import json
 import time
 import uuid
 
-from flask import current_app, jsonify
+from flask import current_app
 import peewee
 from playhouse.postgres_ext import JSONField
-import requests
 from requests import Response
 
-from scoop_rest_api.models import AccessKey
-from scoop_rest_api.utils import capture_to_dict, get_db
+from scoop_rest_api.models import AccessKey, DomainStats
+from scoop_rest_api.utils import CAPTURE_CLASSES, capture_to_dict, get_callback_session, get_db
 
 
 class Capture(peewee.Model):
@@ -43,15 +41,30 @@ class Capture(peewee.Model):
     callback_url = peewee.TextField(null=True)
 
     options = JSONField(null=True)
-    """JSON object for additional options and parameters (TBD)."""
+    """
+    JSON object for additional options and parameters.
+    - "batch_callback": If true, callback is delivered as part of a batch (see `tasks.deliver_callback_batch`).
+    - "profile": Name of the capture profile to use (see SCOOP_CAPTURE_PROFILES).
+    """
 
     status = peewee.CharField(
         max_length=16,
-        choices=["pending", "started", "failed", "success"],
+        choices=["pending", "started", "failed", "success", "canceled"],
         default="pending",
         index=True,
     )
-    """Current status can be: "pending", "started", "failed"."""
+    """Current status can be: "pending", "started", "failed", "success", "canceled"."""
+
+    capture_class = peewee.CharField(
+        max_length=16,
+        choices=CAPTURE_CLASSES,
+        default="light",
+        index=True,
+    )
+    """Class of capture, determined upon submission: "light" or "heavy" (see utils.classify_capture)."""
+
+    failed_reason = peewee.TextField(null=True, default=None)
+    """Why the capture failed, if it did (i.e: "timeout violation")."""
 
     stdout_logs = peewee.TextField(null=True)
     """STDOUT Logs generated by the capture software."""
@@ -68,31 +81,102 @@ class Capture(peewee.Model):
     attachments = peewee.BlobField(null=True)
     """ Effectively a zip file of attachments. """
 
+    callback_status = peewee.CharField(
+        max_length=16,
+        choices=["pending", "delivered", "failed"],
+        null=True,
+        default=None,
+    )
+    """Delivery status of the callback, if any: "pending", "delivered", "failed"."""
+
+    callback_attempts = peewee.IntegerField(null=False, default=0)
+    """Number of attempts made at delivering the callback."""
+
+    callback_last_status_code = peewee.IntegerField(null=True, default=None)
+    """HTTP status code returned by the callback URL on the last attempt, if any."""
+
     class Meta:
         table_name = "capture"
         database = get_db()
+        indexes = (
+            # Supports listing a given access key's captures, paginated by creation date
+            # (see views.captures_get)
+            (("id_access_key", "created_timestamp", "id_capture"), False),
+        )
+
+    TERMINAL_STATUSES = ["success", "failed", "canceled"]
+    """Statuses after which a capture no longer changes."""
 
     # Settings to allow our tests to draw out race conditions
     TEST_PAUSE_TIME = 0
     TEST_ALLOW_RACE = False
 
     @classmethod
-    def get_next_capture(cls, reserve: bool = False) -> Capture | None:
+    def select_without_artifacts(cls) -> peewee.ModelSelect:
+        """Selects every column but the ones holding artifacts (archive, attachments)."""
+        # Fields are compared by name: comparing them directly yields SQL expressions
+        return cls.select(
+            *[
+                field
+                for field in cls._meta.sorted_fields
+                if field.name not in (cls.archive.name, cls.attachments.name)
+            ]
+        )
+
+    @property
+    def is_terminal(self) -> bool:
+        """Returns True if this capture reached a final state, and will no longer change."""
+        return self.status in self.TERMINAL_STATUSES
+
+    def get_remaining_lifetime(self) -> int:
+        """
+        Returns for how many more seconds this capture will be kept: captures are deleted
+        TEMPORARY_STORAGE_EXPIRATION seconds after they started (see `cleanup` command).
+        Used as the max-age of cacheable responses about this capture, so that caches
+        do not outlive it.
+        """
+        expiration = int(current_app.config["TEMPORARY_STORAGE_EXPIRATION"])
+        start = self.started_timestamp or self.created_timestamp
+
+        # Timestamps read from the database are naive, and in UTC
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=datetime.UTC)
+
+        remaining = start + datetime.timedelta(seconds=expiration)
+        return max(int((remaining - datetime.datetime.now(datetime.UTC)).total_seconds()), 0)
+
+    @classmethod
+    def get_next_capture(
+        cls, reserve: bool = False, capture_class: str | None = None
+    ) -> Capture | None:
         """Get the next pending capture from the database.
 
         Optionally reserves the capture by marking it as started; this
         removes it from the queue and ensures it won't be retrieved
         twice.
 
+        Optionally only considers captures of a given `capture_class`.
+
+        Pending captures are taken in order, unless CAPTURE_SCHEDULING_POLICY is "sjf"
+        (see `get_shortest_pending_capture`).
+
         Returns None if no pending capture is available.
         """
-        capture: Capture | None = (
-            cls.select()
-            .where(cls.status == "pending")
-            .order_by(cls.created_timestamp)
-            .paginate(1, 1)
-            .get_or_none()
-        )
+        conditions = [cls.status == "pending"]
+
+        if capture_class is not None:
+            conditions.append(cls.capture_class == capture_class)
+
+        if current_app.config["CAPTURE_SCHEDULING_POLICY"] == "sjf":
+            capture = cls.get_shortest_pending_capture(conditions)
+        else:
+            capture: Capture | None = (
+                cls.select()
+                .where(*conditions)
+                .order_by(cls.created_timestamp)
+                .paginate(1, 1)
+                .get_or_none()
+            )
 
         # Reserve capture if requested
         if (reserve is True) and (capture is not None):
@@ -100,7 +184,9 @@ class Capture(peewee.Model):
                 time.sleep(cls.TEST_PAUSE_TIME)
 
             update_count = (
-                Capture.update(status="started")
+                Capture.update(
+                    status="started", started_timestamp=datetime.datetime.now(datetime.UTC)
+                )
                 .where(Capture.id_capture == capture.id_capture, Capture.status == "pending")
                 .execute()
             )
@@ -113,19 +199,168 @@ class Capture(peewee.Model):
 
             # Refresh capture
             capture = Capture.get(Capture.id_capture == capture.id_capture)
-            capture.started_timestamp = datetime.datetime.now(datetime.UTC)
-            capture.save()
             current_app.logger.info(f"Capture #{capture.id_capture} | Marked as started")
 
         return capture
 
+    def update_if_started(self, **fields) -> bool:
+        """
+        Writes `fields` to this capture's database record, only if it is still "started".
+        Captures that were canceled (or marked as stale) in the meantime are left untouched.
+
+        Returns True if the record was updated, in which case `fields` are also set on this object.
+        Otherwise, returns False and refreshes this object's status from the database.
+        """
+        cls = type(self)
+
+        update_count = (
+            cls.update(**fields)
+            .where(cls.id_capture == self.id_capture, cls.status == "started")
+            .execute()
+        )
+
+        if update_count < 1:
+            self.status = cls.select(cls.status).where(cls.id_capture == self.id_capture).scalar()
+            current_app.logger.info(
+                f"Capture #{self.id_capture} | No longer started ({self.status}): not updated"
+            )
+            return False
+
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+        return True
+
+    @classmethod
+    def get_shortest_pending_capture(cls, conditions: list) -> Capture | None:
+        """
+        Shortest-expected-job-first, with aging: among the CAPTURE_SCHEDULING_WINDOW oldest
+        captures matching `conditions`, returns the one with the lowest score, where:
+
+        score = expected duration - CAPTURE_SCHEDULING_AGING * time spent waiting
+
+        The expected duration of a capture is the median duration of captures of its domain
+        (see `models.DomainStats`), or CAPTURE_SCHEDULING_DEFAULT_DURATION if unknown.
+        Aging ensures that captures of slow domains are eventually picked.
+        """
+        candidates = list(
+            cls.select(cls.id_capture, cls.url, cls.created_timestamp)
+            .where(*conditions)
+            .order_by(cls.created_timestamp)
+            .paginate(1, int(current_app.config["CAPTURE_SCHEDULING_WINDOW"]))
+        )
+
+        if not candidates:
+            return None
+
+        domains = {DomainStats.get_domain(candidate.url) for candidate in candidates}
+        expected_durations = {
+            stats.domain: stats.p50_duration
+            for stats in DomainStats.select(DomainStats.domain, DomainStats.p50_duration).where(
+                DomainStats.domain.in_([domain for domain in domains if domain])
+            )
+        }
+
+        default_duration = float(current_app.config["CAPTURE_SCHEDULING_DEFAULT_DURATION"])
+        aging = float(current_app.config["CAPTURE_SCHEDULING_AGING"])
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+        def get_score(candidate: Capture) -> float:
+            expected_duration = expected_durations.get(DomainStats.get_domain(candidate.url))
+
+            if expected_duration is None:
+                expected_duration = default_duration
+
+            waiting_time = (now - candidate.created_timestamp).total_seconds()
+            return expected_duration - aging * waiting_time
+
+        # Ties (i.e: no stats) are resolved in order
+        candidate = min(candidates, key=get_score)
+        return cls.get_or_none(cls.id_capture == candidate.id_capture)
+
+    @property
+    def is_batch_callback(self) -> bool:
+        """Returns True if this capture's callback should be delivered as part of a batch."""
+        return bool(self.options and self.options.get("batch_callback"))
+
+    @classmethod
+    def select_awaiting_batch_callback(cls, callback_url: str, *fields) -> peewee.ModelSelect:
+        """Selects completed captures whose batched callback to `callback_url` was not sent yet."""
+        return cls.select(*fields).where(
+            cls.callback_url == callback_url,
+            cls.callback_status.is_null(),
+            cls.status.in_(cls.TERMINAL_STATUSES),
+            cls.options["batch_callback"] == "true",
+        )
+
+    @classmethod
+    def claim_batch_callback(cls, callback_url: str, max_size: int) -> list[str]:
+        """
+        Reserves up to `max_size` completed captures awaiting a batched callback to `callback_url`,
+        by marking their callback as "pending". Oldest captures are reserved first.
+
+        Rows locked by a concurrent claim are skipped, so that a given capture is only ever
+        reserved by one batch.
+
+        Returns a list of reserved capture ids.
+        """
+        subquery = (
+            cls.select_awaiting_batch_callback(callback_url, cls.id_capture)
+            .order_by(cls.ended_timestamp)
+            .limit(max_size)
+            .for_update("FOR UPDATE SKIP LOCKED")
+        )
+
+        cursor = (
+            cls.update(callback_status="pending")
+            .where(cls.id_capture.in_(subquery))
+            .returning(cls.id_capture)
+            .execute()
+        )
+        return [str(row.id_capture) for row in cursor]
+
+    @staticmethod
+    def post_to_callback_url(callback_url: str, data: dict | list) -> Response:
+        """
+        Post `data` to a webhook URL as JSON.
+        `data` is serialized once, by the app's JSON provider, for consistency across the app.
+        Providers other than utils.FastJSONProvider serialize to `str`, which is then encoded.
+        """
+        dumps_bytes = getattr(current_app.json, "dumps_bytes", None)
+
+        if dumps_bytes is not None:
+            body = dumps_bytes(data)
+        else:
+            body = current_app.json.dumps(data).encode("utf-8")
+
+        return get_callback_session(callback_url).post(
+            callback_url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=current_app.config["CALLBACK_TIMEOUT"],
+        )
+
+    @classmethod
+    def call_batch_callback_url(cls, callback_url: str, captures: list[Capture]) -> Response | None:
+        """Post a single request to a webhook URL, listing several captures."""
+        current_app.logger.info(f"Batch of {len(captures)} capture(s) | Callback to {callback_url}")
+        try:
+            response = cls.post_to_callback_url(
+                callback_url, [capture_to_dict(capture) for capture in captures]
+            )
+        except Exception:
+            current_app.logger.exception(
+                f"Batch of {len(captures)} capture(s) | Callback to {callback_url} failed"
+            )
+            return None
+        else:
+            return response
+
     def call_callback_url(self) -> Response | None:
         """Post a request to this capture's webhook URL."""
         current_app.logger.info(f"Capture #{self.id_capture} | Callback to {self.callback_url}")
         try:
-            # Workaround to use Flask's jsonify, for consistency across the app
-            json_data = json.loads(jsonify(capture_to_dict(self)).data.decode("utf-8"))
-            response = requests.post(self.callback_url, json=json_data, timeout=10)
+            response = self.post_to_callback_url(self.callback_url, capture_to_dict(self))
         except Exception:
             current_app.logger.exception(
                 f"Capture #{self.id_capture} | Callback to {self.callback_url} failed"
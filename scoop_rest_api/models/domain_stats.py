@@ -0,0 +1,270 @@
+"""
+`models.domain_stats` module: Class to interact with the "domain_stats" table.
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+from urllib.parse import urlparse
+
+from flask import current_app
+import peewee
+from playhouse.postgres_ext import JSONField
+
+from ..utils import get_db
+
+
+class DomainStats(peewee.Model):
+    """
+    "domain_stats" table definition. Rolling statistics about captures, per domain name.
+    Updated every time a capture completes (see `record_capture`).
+
+    Also holds the state of each domain's circuit breaker (see `check_circuit_breaker`).
+    """
+
+    domain = peewee.CharField(max_length=255, primary_key=True)
+
+    updated_timestamp = peewee.TimestampField(utc=True, resolution=1000, null=False)
+
+    total_captures = peewee.IntegerField(null=False, default=0)
+    """Number of completed captures for this domain, ever."""
+
+    total_failures = peewee.IntegerField(null=False, default=0)
+    """Number of failed captures for this domain, ever."""
+
+    samples = JSONField(null=False, default=list)
+    """
+    Outcome of the last DOMAIN_STATS_WINDOW captures for this domain, oldest first.
+    Each sample is a JSON object with the following properties:
+    - "duration": Time between start and end of capture, in seconds.
+    - "success": Whether the capture succeeded.
+    - "size": Size of the archive, in bytes, if any.
+    """
+
+    p50_duration = peewee.FloatField(null=True, default=None)
+    """Median capture duration over the last samples, in seconds."""
+
+    p90_duration = peewee.FloatField(null=True, default=None)
+    """90th percentile of capture duration over the last samples, in seconds."""
+
+    failure_rate = peewee.FloatField(null=True, default=None)
+    """Share of failed captures over the last samples, between 0 and 1."""
+
+    mean_archive_size = peewee.BigIntegerField(null=True, default=None)
+    """Average archive size over the last successful samples, in bytes."""
+
+    consecutive_failures = peewee.IntegerField(null=False, default=0)
+    """
+    Number of failed captures since the last successful one,
+    each less than CIRCUIT_BREAKER_WINDOW seconds after the previous one.
+    """
+
+    last_failure_timestamp = peewee.TimestampField(
+        utc=True, resolution=1000, null=True, default=None
+    )
+
+    breaker_opened_timestamp = peewee.TimestampField(
+        utc=True, resolution=1000, null=True, default=None
+    )
+    """If set, the circuit breaker of this domain is open (see `check_circuit_breaker`)."""
+
+    breaker_probe_timestamp = peewee.TimestampField(
+        utc=True, resolution=1000, null=True, default=None
+    )
+    """When a capture was last let through an open circuit breaker, as a probe."""
+
+    class Meta:
+        table_name = "domain_stats"
+        database = get_db()
+
+    @staticmethod
+    def get_domain(url: str) -> str | None:
+        """Returns the normalized domain name of a URL, or None if it has none."""
+        try:
+            hostname = urlparse(url).hostname
+        except ValueError:
+            return None
+
+        return hostname.rstrip(".") if hostname else None
+
+    @staticmethod
+    def get_percentile(values: list[float], percentile: float) -> float | None:
+        """Returns a given percentile of a list of values (nearest-rank method)."""
+        if not values:
+            return None
+
+        values = sorted(values)
+        rank = max(math.ceil(percentile / 100 * len(values)), 1)
+        return values[rank - 1]
+
+    @staticmethod
+    def get_duration(capture) -> float | None:
+        """Returns how long a completed capture took, in seconds, if known."""
+        timestamps = []
+
+        for timestamp in [capture.started_timestamp, capture.ended_timestamp]:
+            if timestamp is None:
+                return None
+
+            # Timestamps read from the database are naive, and in UTC
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=datetime.UTC)
+
+            timestamps.append(timestamp)
+
+        return max((timestamps[1] - timestamps[0]).total_seconds(), 0.0)
+
+    @classmethod
+    def record_capture(cls, capture) -> DomainStats | None:
+        """
+        Adds the outcome of a completed capture ("success" or "failed") to its domain's statistics.
+        Rows are locked while being updated, so that concurrent captures are all accounted for.
+        """
+        domain = cls.get_domain(capture.url)
+        duration = cls.get_duration(capture)
+
+        if not domain or duration is None or capture.status not in ["success", "failed"]:
+            return None
+
+        sample = {
+            "duration": round(duration, 3),
+            "success": capture.status == "success",
+            "size": len(capture.archive) if capture.archive else None,
+        }
+
+        now = datetime.datetime.now(datetime.UTC)
+
+        with cls._meta.database.atomic():
+            cls.insert(domain=domain, updated_timestamp=now).on_conflict_ignore().execute()
+            stats = cls.select().where(cls.domain == domain).for_update().get()
+
+            stats.samples = (stats.samples + [sample])[
+                -int(current_app.config["DOMAIN_STATS_WINDOW"]) :
+            ]
+            stats.total_captures += 1
+            stats.total_failures += 0 if sample["success"] else 1
+            stats.updated_timestamp = now
+            stats.update_summary()
+
+            # Failures the domain is not responsible for leave its circuit breaker as is
+            if sample["success"] or cls.is_availability_failure(capture.failed_reason):
+                stats.update_circuit_breaker(sample["success"], now)
+
+            stats.save()
+
+        return stats
+
+    @staticmethod
+    def is_availability_failure(failed_reason: str | None) -> bool:
+        """
+        Returns True if a capture failed because its target did not respond or could not be
+        captured (i.e: "timeout violation", "exit code 1"), rather than because of its output
+        (i.e: "Archive over maximum supported filesize") or of the worker running it.
+        Only those failures count towards the circuit breaker.
+        """
+        return bool(failed_reason) and (
+            failed_reason == "timeout violation" or failed_reason.startswith("exit code ")
+        )
+
+    def update_circuit_breaker(self, success: bool, now: datetime.datetime) -> None:
+        """
+        Updates the state of this domain's circuit breaker, given the outcome of a capture
+        (see `is_availability_failure`):
+        - Successful captures close the circuit breaker.
+        - The circuit breaker opens after CIRCUIT_BREAKER_THRESHOLD consecutive failures,
+          each less than CIRCUIT_BREAKER_WINDOW seconds apart.
+        - Failures while the circuit breaker is open (i.e: failed probe) keep it open
+          for another CIRCUIT_BREAKER_COOLDOWN seconds.
+        """
+        threshold = int(current_app.config["CIRCUIT_BREAKER_THRESHOLD"])
+        window = datetime.timedelta(seconds=current_app.config["CIRCUIT_BREAKER_WINDOW"])
+
+        if success:
+            self.consecutive_failures = 0
+            self.breaker_opened_timestamp = None
+            self.breaker_probe_timestamp = None
+            return
+
+        # Timestamps read from the database are naive, and in UTC
+        if (
+            self.last_failure_timestamp
+            and now.replace(tzinfo=None) - self.last_failure_timestamp > window
+        ):
+            self.consecutive_failures = 0
+
+        self.consecutive_failures += 1
+        self.last_failure_timestamp = now
+
+        if self.breaker_opened_timestamp is not None or (
+            threshold and self.consecutive_failures >= threshold
+        ):
+            if self.breaker_opened_timestamp is None:
+                current_app.logger.warning(
+                    f"Circuit breaker open for {self.domain} "
+                    f"({self.consecutive_failures} consecutive failures)"
+                )
+
+            self.breaker_opened_timestamp = now
+            self.breaker_probe_timestamp = None
+
+    @classmethod
+    def check_circuit_breaker(cls, domain: str | None) -> str | None:
+        """
+        Checks whether captures of a given domain should be attempted.
+        Returns the reason why they should not, if the domain's circuit breaker is open.
+
+        Once open for CIRCUIT_BREAKER_COOLDOWN seconds, the circuit breaker is "half-open":
+        a single capture is let through, as a probe, and its outcome closes or re-opens it.
+        If that probe does not complete within CIRCUIT_BREAKER_COOLDOWN seconds, another one is.
+        """
+        if not domain or not current_app.config["CIRCUIT_BREAKER_THRESHOLD"]:
+            return None
+
+        stats = (
+            cls.select(cls.consecutive_failures, cls.breaker_opened_timestamp)
+            .where(cls.domain == domain)
+            .get_or_none()
+        )
+
+        if stats is None or stats.breaker_opened_timestamp is None:
+            return None
+
+        reason = (
+            f"circuit breaker open for {domain} "
+            f"({stats.consecutive_failures} consecutive failures)"
+        )
+
+        now = datetime.datetime.now(datetime.UTC)
+        cooldown = datetime.timedelta(seconds=current_app.config["CIRCUIT_BREAKER_COOLDOWN"])
+
+        if now.replace(tzinfo=None) - stats.breaker_opened_timestamp < cooldown:
+            return reason
+
+        # Half-open: only one capture gets to be the probe
+        claimed = (
+            cls.update(breaker_probe_timestamp=now)
+            .where(
+                cls.domain == domain,
+                cls.breaker_opened_timestamp.is_null(False),
+                cls.breaker_probe_timestamp.is_null()
+                | (cls.breaker_probe_timestamp < now - cooldown),
+            )
+            .execute()
+        )
+
+        return None if claimed else reason
+
+    def update_summary(self) -> None:
+        """Computes percentiles, failure rate and average archive size from samples."""
+        durations = [sample["duration"] for sample in self.samples]
+        sizes = [sample["size"] for sample in self.samples if sample["success"] and sample["size"]]
+
+        self.p50_duration = self.get_percentile(durations, 50)
+        self.p90_duration = self.get_percentile(durations, 90)
+        self.failure_rate = (
+            len([sample for sample in self.samples if not sample["success"]]) / len(self.samples)
+            if self.samples
+            else None
+        )
+        self.mean_archive_size = int(sum(sizes) / len(sizes)) if sizes else None
@@ -1,48 +1,63 @@
 import datetime
 from pathlib import Path
+from urllib.parse import urlparse
 
-from billiard import current_process
-from celery import shared_task
+from celery import current_app as current_celery_app, shared_task
 from flask import current_app
 
-from scoop_rest_api.models import Capture
-from scoop_rest_api.utils import ScoopRunner, check_proxy_port
+from scoop_rest_api.models import Capture, DomainStats
+from scoop_rest_api.utils import (
+    ScoopRunner,
+    get_display,
+    get_resolver,
+    lease_proxy_port,
+    validate_ip,
+)
 
 
-def get_unique_port(task):
-    PROXY_PORT = int(current_app.config["PROXY_PORT"])
+def get_routing_class(capture_class: str | None) -> str | None:
+    """
+    Returns the class of captures a capture task should process, if captures are routed by class:
+    tasks that don't specify one process "light" captures.
+    Returns None otherwise: the task processes any capture (see CAPTURE_ROUTING_ENABLED).
+    """
+    if not current_app.config["CAPTURE_ROUTING_ENABLED"]:
+        return None
 
-    worker_name = task.request.hostname
-    try:
-        # if worker names are of the expected format, "w1@.....",
-        # extract the worker's number
-        worker_number = int(worker_name.split("@")[0][1:])
-    except (AttributeError, ValueError):
-        # if the worker name doesn't match that format
-        # (for example, if running locally with task_always_eager=True)
-        # don't attempt this optimization
-        worker_number = 1
+    return capture_class or "light"
 
-    try:
-        # if workers are running with any concurrency, get this
-        # child's index
-        worker_index = current_process().index
-    except AttributeError:
-        # if we don't have an index, for instance, if this task is invoked
-        # with .run(), default to 0
-        worker_index = 0
 
-    return PROXY_PORT + 100 * (worker_number - 1) + worker_index
+def route_capture_task(name, args, kwargs, options, task=None, **kw) -> dict | None:
+    """
+    Celery router: sends capture tasks dedicated to heavy captures to the "heavy" queue,
+    if CAPTURE_ROUTING_ENABLED is `True`.
+    Other tasks are routed as per the rest of CELERY_SETTINGS["task_routes"].
+
+    Routers may run outside of an app context (i.e: celery beat): CAPTURE_ROUTING_ENABLED is read
+    from the configuration of the Celery app (see `create_celery_app`).
+    """
+    if not current_celery_app.conf.get("capture_routing_enabled"):
+        return None
+
+    if name == "scoop_rest_api.tasks.start_capture_process" and (
+        (kwargs or {}).get("capture_class") == "heavy"
+    ):
+        return {"queue": "heavy"}
+
+    return None
 
 
 @shared_task(bind=True)
-def start_capture_process(self):
+def start_capture_process(self, capture_class: str | None = None):
     """
     Take a capture from the queue and process it.
 
+    If `capture_class` is provided and CAPTURE_ROUTING_ENABLED is `True`,
+    only takes captures of that class (see utils.classify_capture).
+
     If interrupted during capture, puts the capture back into the queue.
     """
-    proxy_port = get_unique_port(self)
+    capture_class = get_routing_class(capture_class)
 
     #
     # Check for presence of deployment sentinel
@@ -52,39 +67,243 @@ def start_capture_process(self):
         current_app.logger.error("Deployment sentinel present, exiting.")
         return
 
-    #
-    # If proxy port is available, reserve next capture
-    #
-    proxy_port_is_available = check_proxy_port(proxy_port)
-    if proxy_port_is_available is True:
-        capture = Capture.get_next_capture(reserve=True)
-    else:
-        capture = None
-        current_app.logger.warning(f"(Pre-capture) | Port {proxy_port} already in use - retrying")
-        start_capture_process.delay()
+    with lease_proxy_port() as proxy_port:
+        #
+        # If a proxy port is available, reserve next capture.
+        # Otherwise, every port is in use by a running capture, which will start the next one.
+        #
+        if proxy_port is None:
+            current_app.logger.warning("(Pre-capture) | No proxy port available - skipping")
+            return
 
-    #
-    # Return early if no capture to process
-    #
-    if capture is None:
-        return
+        capture = Capture.get_next_capture(reserve=True, capture_class=capture_class)
+
+        #
+        # Return early if no capture to process
+        #
+        if capture is None:
+            return
+
+        #
+        # Execute capture via Scoop
+        #
+        try:
+            # Captures of domains that keep failing, or that cannot be captured, fail fast
+            preflight_failure = DomainStats.check_circuit_breaker(
+                DomainStats.get_domain(capture.url)
+            )
+
+            if not preflight_failure and current_app.config["CAPTURE_PREFLIGHT_CHECK"]:
+                preflight_failure = get_preflight_failure(capture.url)
+
+            if preflight_failure:
+                if capture.update_if_started(
+                    status="failed",
+                    failed_reason=preflight_failure,
+                    ended_timestamp=datetime.datetime.now(datetime.UTC),
+                ):
+                    current_app.logger.warning(
+                        f"Capture #{capture.id_capture} | Failed ({preflight_failure})"
+                    )
+            else:
+                scoop_runner = ScoopRunner(capture, proxy_port, display=get_display(proxy_port))
+                scoop_runner.run()
+                record_capture_stats(capture)
+        except Exception:
+            current_app.logger.exception(
+                f"Capture #{capture.id_capture} | Failed (other, see logs)"
+            )
+            capture.update_if_started(
+                status="failed",
+                failed_reason="other",
+                ended_timestamp=datetime.datetime.now(datetime.UTC),
+            )
+        finally:
+            # Callbacks are delivered by a dedicated queue, so that capture slots never wait on them
+            if capture.callback_url is not None:
+                queue_callback(capture)
 
     #
-    # Execute capture via Scoop
+    # Start next capture, if one is available
     #
+    start_capture_process.delay(capture_class=capture_class)
+
+
+def record_capture_stats(capture: Capture) -> None:
+    """
+    Adds the outcome of a capture Scoop ran for to its domain's statistics (see models.DomainStats).
+    Statistics are a best effort: errors are logged, and do not affect the capture.
+    """
     try:
-        scoop_runner = ScoopRunner(capture, proxy_port)
-        scoop_runner.run()
+        DomainStats.record_capture(capture)
     except Exception:
-        capture.status = "failed"
-        capture.ended_timestamp = datetime.datetime.now(datetime.UTC)
-        capture.save()
-        current_app.logger.exception(f"Capture #{capture.id_capture} | Failed (other, see logs)")
-    finally:
-        if capture.callback_url is not None:
-            capture.call_callback_url()
+        current_app.logger.exception(
+            f"Capture #{capture.id_capture} | Could not record domain statistics"
+        )
 
-    #
-    # Start next capture, if one is available
-    #
-    start_capture_process.delay()
+
+def get_preflight_failure(url: str) -> str | None:
+    """
+    Checks that the domain name of a URL about to be captured resolves to allowed IP addresses.
+    Returns the reason why the capture should fail without running Scoop, if any.
+
+    Lookups that time out or fail temporarily are inconclusive: Scoop gets to try.
+    """
+    hostname = urlparse(url).hostname
+
+    if not hostname:
+        return None
+
+    try:
+        addresses = get_resolver().resolve(hostname)
+    except OSError:
+        return None
+
+    if not addresses:
+        return "domain name does not resolve"
+
+    if not validate_ip(addresses):
+        return "domain name resolves to a banned IP range"
+
+    return None
+
+
+def queue_callback(capture: Capture) -> None:
+    """
+    Schedules delivery of a completed capture's callback.
+
+    Batched callbacks are coalesced per callback URL: delivery is delayed by CALLBACK_BATCH_WINDOW
+    seconds, unless CALLBACK_BATCH_MAX_SIZE captures are already awaiting delivery.
+    """
+    if not capture.is_batch_callback:
+        deliver_callback.delay(str(capture.id_capture))
+        return
+
+    awaiting_count = Capture.select_awaiting_batch_callback(capture.callback_url).count()
+
+    countdown = current_app.config["CALLBACK_BATCH_WINDOW"]
+    if awaiting_count >= current_app.config["CALLBACK_BATCH_MAX_SIZE"]:
+        countdown = 0
+
+    deliver_callback_batch.apply_async(args=[capture.callback_url], countdown=countdown)
+
+
+def get_callback_status(response, attempts: int) -> str:
+    """
+    Determines the delivery status of a callback, given the response to the latest attempt.
+    Network errors, HTTP 429 and 5XX are retried, up to CALLBACK_MAX_ATTEMPTS attempts.
+    """
+    if response is not None and response.ok:
+        return "delivered"
+
+    if (response is None or response.status_code == 429 or response.status_code >= 500) and (
+        attempts < current_app.config["CALLBACK_MAX_ATTEMPTS"]
+    ):
+        return "pending"
+
+    return "failed"
+
+
+def get_callback_retry_countdown(attempts: int) -> int:
+    """Returns how long to wait before the next callback delivery attempt (exponential backoff)."""
+    return min(
+        current_app.config["CALLBACK_RETRY_BACKOFF"] * 2 ** (attempts - 1),
+        current_app.config["CALLBACK_RETRY_BACKOFF_MAX"],
+    )
+
+
+@shared_task(bind=True, max_retries=None)
+def deliver_callback(self, id_capture: str):
+    """
+    POST a capture's user-facing info to its callback URL.
+
+    Failed deliveries (network errors, HTTP 429 and 5XX) are retried with exponential backoff,
+    up to CALLBACK_MAX_ATTEMPTS attempts. Delivery state is recorded on the capture.
+    """
+    capture = (
+        Capture.select_without_artifacts().where(Capture.id_capture == id_capture).get_or_none()
+    )
+
+    if capture is None or capture.callback_url is None:
+        return
+
+    response = capture.call_callback_url()
+    attempts = capture.callback_attempts + 1
+    status_code = response.status_code if response is not None else None
+    callback_status = get_callback_status(response, attempts)
+
+    Capture.update(
+        callback_status=callback_status,
+        callback_attempts=attempts,
+        callback_last_status_code=status_code,
+    ).where(Capture.id_capture == id_capture).execute()
+
+    if callback_status == "failed":
+        current_app.logger.error(
+            f"Capture #{id_capture} | Callback to {capture.callback_url} failed "
+            f"after {attempts} attempt(s)"
+        )
+
+    if callback_status == "pending":
+        countdown = get_callback_retry_countdown(attempts)
+        current_app.logger.warning(
+            f"Capture #{id_capture} | Callback to {capture.callback_url} will be retried "
+            f"in {countdown}s"
+        )
+        raise self.retry(countdown=countdown)
+
+
+@shared_task(bind=True, max_retries=None)
+def deliver_callback_batch(self, callback_url: str, id_captures: list[str] | None = None):
+    """
+    POST the user-facing info of several captures to a shared callback URL, as a JSON array.
+
+    On first run, reserves up to CALLBACK_BATCH_MAX_SIZE completed captures awaiting a batched
+    callback to `callback_url` (see `models.Capture.claim_batch_callback`).
+    Retries are made with the same `id_captures`, following the same rules as `deliver_callback`.
+    """
+    if id_captures is None:
+        id_captures = Capture.claim_batch_callback(
+            callback_url, current_app.config["CALLBACK_BATCH_MAX_SIZE"]
+        )
+
+        if not id_captures:
+            return
+
+        # More captures may have completed while this batch was waiting: flush them too
+        if len(id_captures) >= current_app.config["CALLBACK_BATCH_MAX_SIZE"]:
+            deliver_callback_batch.delay(callback_url)
+
+    captures = list(
+        Capture.select_without_artifacts()
+        .where(Capture.id_capture.in_(id_captures))
+        .order_by(Capture.ended_timestamp)
+    )
+
+    if not captures:
+        return
+
+    response = Capture.call_batch_callback_url(callback_url, captures)
+    attempts = max(capture.callback_attempts for capture in captures) + 1
+    status_code = response.status_code if response is not None else None
+    callback_status = get_callback_status(response, attempts)
+
+    Capture.update(
+        callback_status=callback_status,
+        callback_attempts=attempts,
+        callback_last_status_code=status_code,
+    ).where(Capture.id_capture.in_(id_captures)).execute()
+
+    if callback_status == "failed":
+        current_app.logger.error(
+            f"Batch of {len(captures)} capture(s) | Callback to {callback_url} failed "
+            f"after {attempts} attempt(s)"
+        )
+
+    if callback_status == "pending":
+        countdown = get_callback_retry_countdown(attempts)
+        current_app.logger.warning(
+            f"Batch of {len(captures)} capture(s) | Callback to {callback_url} will be retried "
+            f"in {countdown}s"
+        )
+        raise self.retry(args=[callback_url, id_captures], countdown=countdown)
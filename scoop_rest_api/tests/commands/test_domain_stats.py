@@ -0,0 +1,32 @@
+"""
+Test suite for the "domain-stats" command.
+"""
+
+import datetime
+
+
+def test_domain_stats_cli(runner, id_capture):
+    """domain-stats command reports per-domain capture statistics and exits with code 0."""
+    from scoop_rest_api.models import Capture, DomainStats
+
+    capture = Capture.get_by_id(id_capture)  # https://example.com
+    capture.started_timestamp = datetime.datetime.now(datetime.UTC)
+
+    for seconds, status in [(10, "success"), (20, "failed"), (30, "success"), (100, "success")]:
+        capture.ended_timestamp = capture.started_timestamp + datetime.timedelta(seconds=seconds)
+        capture.status = status
+        capture.archive = b"0" * 1024 * 1024 if status == "success" else None
+        DomainStats.record_capture(capture)
+
+    result = runner.invoke(args=["domain-stats", "--sort", "duration"])
+
+    assert result.exit_code == 0
+    assert "Domain statistics (sorted by duration):" in result.output
+    assert (
+        "example.com captures: 4 failure rate: 25.0% p50: 20.0s p90: 100.0s size: 1.00 MB"
+        in result.output
+    )
+    assert "-- 1 domain(s)." in result.output
+
+    result = runner.invoke(args=["domain-stats", "--domain", "example.org"])
+    assert "-- 0 domain(s)." in result.output
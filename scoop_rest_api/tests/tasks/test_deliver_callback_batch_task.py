@@ -0,0 +1,131 @@
+"""
+Test suite for the "deliver-callback-batch" celery task.
+"""
+
+import datetime
+import json
+
+from celery.exceptions import Retry
+import pytest
+
+
+@pytest.fixture()
+def batch_callback_url(default_capture_url) -> str:
+    return f"{default_capture_url}/callback"
+
+
+@pytest.fixture()
+def id_captures_batch(client, access_key, default_capture_url, batch_callback_url) -> list[str]:
+    """Creates 3 completed capture requests with a batched callback. Returns their ids."""
+    from scoop_rest_api.models import Capture
+
+    id_captures = []
+
+    for i in range(0, 3):
+        response = client.post(
+            "/capture",
+            headers={"Access-Key": access_key["readable"]},
+            json={
+                "url": default_capture_url,
+                "callback_url": batch_callback_url,
+                "batch_callback": True,
+            },
+        )
+        id_captures.append(response.get_json()["id_capture"])
+
+    Capture.update(status="failed", ended_timestamp=datetime.datetime.now(datetime.UTC)).where(
+        Capture.id_capture.in_(id_captures)
+    ).execute()
+
+    return id_captures
+
+
+def test_deliver_callback_batch_task_delivered(
+    id_captures_batch, batch_callback_url, monkeypatch, mock_response_factory
+):
+    """Completed captures sharing a callback URL are delivered as a single JSON array."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import deliver_callback_batch
+
+    calls = []
+
+    def post(session, url, data=None, **kwargs):
+        calls.append((url, json.loads(data)))
+        return mock_response_factory(status_code=200)
+
+    monkeypatch.setattr("requests.Session.post", post)
+
+    deliver_callback_batch.run(batch_callback_url)
+
+    assert len(calls) == 1
+    assert calls[0][0] == batch_callback_url
+    assert sorted(item["id_capture"] for item in calls[0][1]) == sorted(id_captures_batch)
+
+    for id_capture in id_captures_batch:
+        capture = Capture.get_by_id(id_capture)
+        assert capture.callback_status == "delivered"
+        assert capture.callback_attempts == 1
+        assert capture.callback_last_status_code == 200
+
+    # Nothing left to deliver
+    deliver_callback_batch.run(batch_callback_url)
+    assert len(calls) == 1
+
+
+def test_deliver_callback_batch_task_max_size(
+    id_captures_batch, batch_callback_url, monkeypatch, mock_response_factory
+):
+    """Batches are capped at CALLBACK_BATCH_MAX_SIZE, and full batches trigger another one."""
+    from flask import current_app
+    from scoop_rest_api.tasks import deliver_callback_batch
+
+    calls = []
+    flushes = []
+
+    def post(session, url, data=None, **kwargs):
+        calls.append(json.loads(data))
+        return mock_response_factory(status_code=200)
+
+    monkeypatch.setitem(current_app.config, "CALLBACK_BATCH_MAX_SIZE", 2)
+    monkeypatch.setattr("requests.Session.post", post)
+    monkeypatch.setattr(deliver_callback_batch, "delay", lambda *args: flushes.append(args))
+
+    deliver_callback_batch.run(batch_callback_url)
+    assert len(calls[0]) == 2
+    assert flushes == [(batch_callback_url,)]
+
+    deliver_callback_batch.run(batch_callback_url)
+    assert len(calls[1]) == 1
+    assert len(flushes) == 1
+
+
+def test_deliver_callback_batch_task_retried(
+    id_captures_batch, batch_callback_url, monkeypatch, mock_response_factory
+):
+    """Batches failing with a server error are retried as-is."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import deliver_callback_batch
+
+    monkeypatch.setattr(
+        "requests.Session.post", lambda *args, **kwargs: mock_response_factory(status_code=503)
+    )
+
+    with pytest.raises(Retry):
+        deliver_callback_batch.run(batch_callback_url)
+
+    for id_capture in id_captures_batch:
+        capture = Capture.get_by_id(id_capture)
+        assert capture.callback_status == "pending"
+        assert capture.callback_attempts == 1
+        assert capture.callback_last_status_code == 503
+
+    monkeypatch.setattr(
+        "requests.Session.post", lambda *args, **kwargs: mock_response_factory(status_code=200)
+    )
+
+    deliver_callback_batch.run(batch_callback_url, id_captures_batch)
+
+    for id_capture in id_captures_batch:
+        capture = Capture.get_by_id(id_capture)
+        assert capture.callback_status == "delivered"
+        assert capture.callback_attempts == 2
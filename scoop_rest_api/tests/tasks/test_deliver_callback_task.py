@@ -0,0 +1,113 @@
+"""
+Test suite for the "deliver-callback" celery task.
+"""
+
+from celery.exceptions import Retry
+import pytest
+
+
+@pytest.fixture()
+def id_capture_with_callback(client, access_key, default_capture_url) -> str:
+    """Creates a capture request with a callback URL. Returns id_capture."""
+    response = client.post(
+        "/capture",
+        headers={"Access-Key": access_key["readable"]},
+        json={"url": default_capture_url, "callback_url": f"{default_capture_url}/callback"},
+    )
+    return response.get_json()["id_capture"]
+
+
+def test_deliver_callback_task_delivered(
+    id_capture_with_callback, monkeypatch, mock_response_factory
+):
+    """Successful deliveries are recorded on the capture."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import deliver_callback
+
+    calls = []
+
+    def post(session, url, **kwargs):
+        calls.append(url)
+        return mock_response_factory(status_code=200)
+
+    monkeypatch.setattr("requests.Session.post", post)
+
+    deliver_callback.run(id_capture_with_callback)
+
+    capture = Capture.get_by_id(id_capture_with_callback)
+    assert calls == [capture.callback_url]
+    assert capture.callback_status == "delivered"
+    assert capture.callback_attempts == 1
+    assert capture.callback_last_status_code == 200
+
+
+def test_deliver_callback_task_default_json_provider(
+    app, id_capture_with_callback, monkeypatch, mock_response_factory
+):
+    """Callbacks can be serialized by JSON providers other than utils.FastJSONProvider."""
+    import json
+
+    from flask.json.provider import DefaultJSONProvider
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import deliver_callback
+
+    bodies = []
+
+    def post(session, url, **kwargs):
+        bodies.append(kwargs["data"])
+        return mock_response_factory(status_code=200)
+
+    monkeypatch.setattr("requests.Session.post", post)
+    monkeypatch.setattr(app, "json", DefaultJSONProvider(app))
+
+    deliver_callback.run(id_capture_with_callback)
+
+    assert isinstance(bodies[0], bytes)
+    assert json.loads(bodies[0])["id_capture"] == id_capture_with_callback
+    assert Capture.get_by_id(id_capture_with_callback).callback_status == "delivered"
+
+
+def test_deliver_callback_task_retried(
+    id_capture_with_callback, monkeypatch, mock_response_factory
+):
+    """Deliveries failing with a server error are retried, up to CALLBACK_MAX_ATTEMPTS times."""
+    from flask import current_app
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import deliver_callback
+
+    monkeypatch.setitem(current_app.config, "CALLBACK_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(
+        "requests.Session.post", lambda *args, **kwargs: mock_response_factory(status_code=503)
+    )
+
+    with pytest.raises(Retry):
+        deliver_callback.run(id_capture_with_callback)
+
+    capture = Capture.get_by_id(id_capture_with_callback)
+    assert capture.callback_status == "pending"
+    assert capture.callback_attempts == 1
+    assert capture.callback_last_status_code == 503
+
+    deliver_callback.run(id_capture_with_callback)
+
+    capture = Capture.get_by_id(id_capture_with_callback)
+    assert capture.callback_status == "failed"
+    assert capture.callback_attempts == 2
+
+
+def test_deliver_callback_task_client_error(
+    id_capture_with_callback, monkeypatch, mock_response_factory
+):
+    """Deliveries failing with a client error are not retried."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import deliver_callback
+
+    monkeypatch.setattr(
+        "requests.Session.post", lambda *args, **kwargs: mock_response_factory(status_code=404)
+    )
+
+    deliver_callback.run(id_capture_with_callback)
+
+    capture = Capture.get_by_id(id_capture_with_callback)
+    assert capture.callback_status == "failed"
+    assert capture.callback_attempts == 1
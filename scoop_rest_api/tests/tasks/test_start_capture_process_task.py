@@ -2,6 +2,9 @@
 Test suite for the "start-capture-process" celery task.
 """
 
+import datetime
+from types import SimpleNamespace
+
 
 def test_start_capture_process_task(celery_worker, access_key, id_capture):
     """
@@ -24,3 +27,283 @@ def test_start_capture_process_task(celery_worker, access_key, id_capture):
     assert capture_before_run.id_capture == capture_after_run.id_capture
     assert capture_before_run.status != capture_after_run.status
     assert capture_before_run.ended_timestamp != capture_after_run.ended_timestamp
+
+
+def test_start_capture_process_task_preflight(id_capture, monkeypatch):
+    """Captures of URLs that do not resolve, or resolve to banned IPs, fail without running Scoop."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import start_capture_process
+
+    def scoop_runner(*args, **kwargs):
+        raise AssertionError("Scoop should not run.")
+
+    monkeypatch.setattr("scoop_rest_api.tasks.ScoopRunner", scoop_runner)
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+
+    for addresses in [[], ["93.184.215.14", "127.0.0.1"]]:
+        Capture.update(status="pending", ended_timestamp=None).execute()
+        monkeypatch.setattr(
+            "scoop_rest_api.tasks.get_resolver",
+            lambda: SimpleNamespace(resolve=lambda host: addresses),
+        )
+
+        start_capture_process.run()
+
+        capture = Capture.get(Capture.id_capture == id_capture)
+        assert capture.status == "failed"
+        assert capture.ended_timestamp
+
+
+def test_start_capture_process_task_canceled(id_capture, monkeypatch):
+    """Captures canceled while being processed are not marked as failed afterwards."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import start_capture_process
+
+    def cancel(*args, **kwargs):
+        Capture.update(status="canceled").where(Capture.id_capture == id_capture).execute()
+
+    def get_preflight_failure(url):
+        cancel()
+        return "domain name does not resolve"
+
+    def run():
+        cancel()
+        raise RuntimeError("Scoop crashed.")
+
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", get_preflight_failure)
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+
+    # Failed pre-flight check
+    start_capture_process.run()
+    capture = Capture.get_by_id(id_capture)
+    assert capture.status == "canceled"
+    assert capture.failed_reason is None
+
+    # Unexpected error
+    Capture.update(status="pending").execute()
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", lambda url: None)
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.ScoopRunner", lambda *args, **kwargs: SimpleNamespace(run=run)
+    )
+
+    start_capture_process.run()
+    capture = Capture.get_by_id(id_capture)
+    assert capture.status == "canceled"
+    assert capture.failed_reason is None
+
+
+def test_start_capture_process_task_routing(app, id_capture, monkeypatch):
+    """If CAPTURE_ROUTING_ENABLED is True, capture tasks only take captures of their class."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import route_capture_task, start_capture_process
+
+    started = []
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", lambda url: None)
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.ScoopRunner",
+        lambda capture, *args, **kwargs: SimpleNamespace(run=lambda: started.append(capture)),
+    )
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+    monkeypatch.setitem(app.config, "CAPTURE_ROUTING_ENABLED", True)
+    monkeypatch.setitem(app.extensions["celery"].conf, "capture_routing_enabled", True)
+
+    assert Capture.get_by_id(id_capture).capture_class == "light"
+
+    start_capture_process.run(capture_class="heavy")
+    assert not started
+
+    start_capture_process.run(capture_class="light")
+    assert [str(capture.id_capture) for capture in started] == [id_capture]
+
+    # Tasks dedicated to heavy captures are routed to the "heavy" queue
+    task_name = "scoop_rest_api.tasks.start_capture_process"
+    assert route_capture_task(task_name, [], {"capture_class": "heavy"}, {}) == {"queue": "heavy"}
+    assert route_capture_task(task_name, [], {"capture_class": "light"}, {}) is None
+    assert route_capture_task(task_name, [], {}, {}) is None
+
+    # Tasks that don't specify a class of captures only take light captures
+    Capture.update(status="pending", capture_class="heavy").execute()
+    start_capture_process.run()
+    assert len(started) == 1
+
+
+def test_start_capture_process_task_routing_disabled(app):
+    """If CAPTURE_ROUTING_ENABLED is False, all capture tasks are routed to the main queue."""
+    from scoop_rest_api.tasks import route_capture_task
+
+    assert not app.config["CAPTURE_ROUTING_ENABLED"]
+
+    task_name = "scoop_rest_api.tasks.start_capture_process"
+    assert route_capture_task(task_name, [], {"capture_class": "heavy"}, {}) is None
+
+    # Capture tasks scheduled with a class of captures (i.e: "run-next-heavy-capture")
+    # are sent to the main queue all the same
+    route = app.extensions["celery"].amqp.router.route(
+        {}, task_name, [], {"capture_class": "heavy"}
+    )
+    assert route["queue"].name == "main"
+
+
+def test_start_capture_process_task_domain_stats(app, id_capture, monkeypatch):
+    """Outcomes of captures Scoop ran for are added to their domain's statistics."""
+    from scoop_rest_api.models import Capture, DomainStats
+    from scoop_rest_api.tasks import start_capture_process
+
+    def run(capture):
+        capture.status = "failed"
+        capture.ended_timestamp = datetime.datetime.now(datetime.UTC)
+        capture.save()
+
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", lambda url: None)
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.ScoopRunner",
+        lambda capture, *args, **kwargs: SimpleNamespace(run=lambda: run(capture)),
+    )
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+    monkeypatch.setitem(app.config, "DOMAIN_STATS_WINDOW", 2)
+
+    for i in range(0, 3):
+        Capture.update(status="pending").execute()
+        start_capture_process.run()
+
+    stats = DomainStats.get_by_id("example.com")
+    assert stats.total_captures == 3
+    assert stats.total_failures == 3
+    assert len(stats.samples) == 2
+    assert stats.failure_rate == 1
+    assert stats.p50_duration is not None
+
+
+def test_start_capture_process_task_sjf(app, client, access_key, monkeypatch):
+    """If CAPTURE_SCHEDULING_POLICY is "sjf", captures of domains expected to be fast go first."""
+    from scoop_rest_api.models import Capture, DomainStats
+
+    monkeypatch.setitem(app.config, "CAPTURE_SCHEDULING_POLICY", "sjf")
+    monkeypatch.setitem(app.config, "CAPTURE_SCHEDULING_DEFAULT_DURATION", 30)
+    monkeypatch.setitem(app.config, "CAPTURE_SCHEDULING_AGING", 0)
+
+    ids = {}
+    for url in ["https://slow.example.com", "https://unknown.example.com", "https://example.com"]:
+        response = client.post(
+            "/capture", headers={"Access-Key": access_key["readable"]}, json={"url": url}
+        )
+        ids[url] = response.get_json()["id_capture"]
+
+    now = datetime.datetime.now(datetime.UTC)
+    DomainStats.insert_many(
+        [
+            {"domain": "slow.example.com", "updated_timestamp": now, "p50_duration": 60},
+            {"domain": "example.com", "updated_timestamp": now, "p50_duration": 5},
+        ]
+    ).execute()
+
+    order = [str(Capture.get_next_capture(reserve=True).id_capture) for i in range(0, 3)]
+    assert order == [
+        ids["https://example.com"],
+        ids["https://unknown.example.com"],
+        ids["https://slow.example.com"],
+    ]
+
+    # With aging, captures that waited long enough are picked first
+    Capture.update(status="pending").execute()
+    Capture.update(created_timestamp=now - datetime.timedelta(minutes=10)).where(
+        Capture.id_capture == ids["https://slow.example.com"]
+    ).execute()
+    monkeypatch.setitem(app.config, "CAPTURE_SCHEDULING_AGING", 0.1)
+
+    assert str(Capture.get_next_capture().id_capture) == ids["https://slow.example.com"]
+
+
+def test_start_capture_process_task_circuit_breaker(app, id_capture, monkeypatch):
+    """
+    Captures of a domain fail right away after CIRCUIT_BREAKER_THRESHOLD consecutive failures,
+    until a probe capture succeeds.
+    """
+    from scoop_rest_api.models import Capture, DomainStats
+    from scoop_rest_api.tasks import start_capture_process
+    from scoop_rest_api.utils import capture_to_dict
+
+    runs = []
+    outcome = {"status": "failed"}
+
+    def run(capture):
+        runs.append(capture.id_capture)
+        capture.status = outcome["status"]
+        capture.failed_reason = "exit code 1" if capture.status == "failed" else None
+        capture.ended_timestamp = datetime.datetime.now(datetime.UTC)
+        capture.save()
+
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", lambda url: None)
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.ScoopRunner",
+        lambda capture, *args, **kwargs: SimpleNamespace(run=lambda: run(capture)),
+    )
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+    monkeypatch.setitem(app.config, "CIRCUIT_BREAKER_THRESHOLD", 2)
+
+    def run_task():
+        Capture.update(status="pending").execute()
+        start_capture_process.run()
+        return Capture.get_by_id(id_capture)
+
+    # Consecutive failures open the circuit breaker
+    for i in range(0, 2):
+        assert run_task().failed_reason == "exit code 1"
+
+    capture = run_task()
+    assert len(runs) == 2
+    assert capture.status == "failed"
+    assert capture.failed_reason == "circuit breaker open for example.com (2 consecutive failures)"
+    assert capture_to_dict(capture)["failed_reason"] == capture.failed_reason
+
+    # Once cooled down, a single capture is let through as a probe: its success closes the breaker
+    DomainStats.update(
+        breaker_opened_timestamp=datetime.datetime.now(datetime.UTC)
+        - datetime.timedelta(seconds=app.config["CIRCUIT_BREAKER_COOLDOWN"] + 1)
+    ).execute()
+    outcome["status"] = "success"
+
+    assert DomainStats.check_circuit_breaker("example.com") is None
+    assert DomainStats.check_circuit_breaker("example.com").startswith("circuit breaker open")
+
+    DomainStats.update(breaker_probe_timestamp=None).execute()
+    assert run_task().status == "success"
+    assert len(runs) == 3
+
+    stats = DomainStats.get_by_id("example.com")
+    assert stats.consecutive_failures == 0
+    assert stats.breaker_opened_timestamp is None
+
+
+def test_start_capture_process_task_circuit_breaker_other_failures(app, id_capture, monkeypatch):
+    """Failures a domain is not responsible for (i.e: oversized archives) do not open its breaker."""
+    from scoop_rest_api.models import Capture, DomainStats
+    from scoop_rest_api.tasks import start_capture_process
+
+    def run(capture):
+        capture.status = "failed"
+        capture.failed_reason = "Archive over maximum supported filesize"
+        capture.ended_timestamp = datetime.datetime.now(datetime.UTC)
+        capture.save()
+
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", lambda url: None)
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.ScoopRunner",
+        lambda capture, *args, **kwargs: SimpleNamespace(run=lambda: run(capture)),
+    )
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+    monkeypatch.setitem(app.config, "CIRCUIT_BREAKER_THRESHOLD", 2)
+
+    for i in range(0, 3):
+        Capture.update(status="pending").execute()
+        start_capture_process.run()
+        capture = Capture.get_by_id(id_capture)
+        assert capture.failed_reason == "Archive over maximum supported filesize"
+
+    # Failures are still recorded in the domain's statistics
+    stats = DomainStats.get_by_id("example.com")
+    assert stats.total_failures == 3
+    assert stats.failure_rate == 1
+    assert stats.consecutive_failures == 0
+    assert stats.breaker_opened_timestamp is None
+    assert DomainStats.check_circuit_breaker("example.com") is None
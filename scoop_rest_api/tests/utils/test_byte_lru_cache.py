@@ -0,0 +1,54 @@
+"""
+Test suite for "utils.byte_lru_cache"
+"""
+
+from scoop_rest_api.utils import ByteLRUCache
+
+
+def test_byte_lru_cache_evicts_least_recently_used():
+    """ByteLRUCache evicts least recently used values once over its size limit."""
+    cache = ByteLRUCache(max_size=10, max_item_size=5)
+
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"  # "b" is now the least recently used value
+
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.size == 8
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_byte_lru_cache_limits():
+    """ByteLRUCache skips values over its item size limit, and stores nothing if disabled."""
+    cache = ByteLRUCache(max_size=10, max_item_size=5)
+    assert cache.set("a", b"aaaaaa") is False
+    assert cache.get("a") is None
+
+    cache = ByteLRUCache(max_size=0, max_item_size=5)
+    assert cache.set("a", b"a") is False
+    assert len(cache) == 0
+
+
+def test_byte_lru_cache_stats_and_invalidation():
+    """ByteLRUCache counts hits and misses, and deletes values by key prefix."""
+    cache = ByteLRUCache(max_size=100, max_item_size=100)
+
+    cache.set(("capture-1", "screenshot.png"), b"png")
+    cache.set(("capture-1", "provenance-summary.html"), b"html")
+    cache.set(("capture-2", "screenshot.png"), b"png")
+
+    cache.get(("capture-1", "screenshot.png"))
+    cache.get(("capture-3", "screenshot.png"))
+
+    assert cache.delete_matching("capture-1") == 2
+    assert len(cache) == 1
+    assert cache.size == 3
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
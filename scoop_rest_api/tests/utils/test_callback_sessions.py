@@ -0,0 +1,32 @@
+"""
+Test suite for "utils.callback_sessions"
+"""
+
+from scoop_rest_api.utils import get_callback_session
+
+
+def test_get_callback_session(app, monkeypatch):
+    """Sessions are reused per host, up to CALLBACK_SESSIONS_MAX: least recently used are closed."""
+    from scoop_rest_api.utils import callback_sessions
+
+    monkeypatch.setattr(callback_sessions, "_sessions", callback_sessions.OrderedDict())
+    monkeypatch.setitem(app.config, "CALLBACK_SESSIONS_MAX", 2)
+
+    closed = []
+
+    with app.app_context():
+        first = get_callback_session("https://a.example.com/callback")
+        second = get_callback_session("https://b.example.com/callback")
+
+        for session in [first, second]:
+            monkeypatch.setattr(session, "close", lambda session=session: closed.append(session))
+
+        assert get_callback_session("https://a.example.com/other") is first
+
+        # b.example.com is the least recently used host
+        third = get_callback_session("https://c.example.com/callback")
+        assert closed == [second]
+        assert get_callback_session("https://a.example.com/callback") is first
+        assert get_callback_session("https://c.example.com/callback") is third
+        assert get_callback_session("https://b.example.com/callback") is not second
+        assert closed == [second, first]
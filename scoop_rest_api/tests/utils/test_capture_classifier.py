@@ -0,0 +1,102 @@
+"""
+Test suite for "utils.capture_classifier"
+"""
+
+import datetime
+
+from scoop_rest_api.utils import (
+    DomainPolicy,
+    classify_capture,
+    get_heavy_domains,
+    get_validation_user_agent,
+    normalize_url,
+)
+
+
+def test_classify_capture(app, monkeypatch):
+    """classify_capture considers captures of video domains, or using heavy profiles, heavy."""
+    policy = DomainPolicy.from_config(
+        {
+            "CUSTOM_USER_AGENT_DOMAINS": {},
+            "VIDEO_ATTACHMENT_DOMAINS": ["youtube.com"],
+            "SCOOP_DOMAIN_PROFILES": {"music.youtube.com": "document"},
+        }
+    )
+    monkeypatch.setitem(app.extensions, "domain_policy", policy)
+    monkeypatch.setitem(app.config, "VIDEO_ATTACHMENT_DOMAINS", ["youtube.com"])
+
+    assert classify_capture("https://example.com") == "light"
+    assert classify_capture("not a url") == "light"
+    assert classify_capture("https://www.youtube.com/watch?v=foo") == "heavy"
+    assert classify_capture("https://example.com", {"profile": "media"}) == "heavy"
+
+    # Profiles that skip videos make captures of video domains light
+    assert classify_capture("https://www.youtube.com", {"profile": "document"}) == "light"
+    assert classify_capture("https://music.youtube.com") == "light"
+
+
+def test_classify_capture_content_length(app):
+    """classify_capture considers URLs reporting large contents upon validation heavy."""
+    url = "https://example.com/video.mp4"
+    cache_key = (normalize_url(url), get_validation_user_agent(url))
+    cache = app.extensions["validation_cache"]
+
+    assert classify_capture(url) == "light"
+
+    content_length = app.config["CAPTURE_HEAVY_CONTENT_LENGTH"]
+    cache.set(cache_key, {"valid": True, "content_length": content_length - 1}, 60)
+    assert classify_capture(url) == "light"
+
+    cache.set(cache_key, {"valid": True, "content_length": content_length}, 60)
+    assert classify_capture(url) == "heavy"
+
+
+def test_classify_capture_domain_stats(app):
+    """classify_capture considers captures of domains whose captures were large or slow heavy."""
+    from scoop_rest_api.models import DomainStats
+
+    url = "https://example.com/page"
+    assert classify_capture(url) == "light"
+
+    DomainStats.create(
+        domain="example.com",
+        updated_timestamp=datetime.datetime.now(datetime.UTC),
+        mean_archive_size=app.config["CAPTURE_HEAVY_ARCHIVE_SIZE"] - 1,
+        p90_duration=app.config["CAPTURE_HEAVY_DURATION"] - 1,
+    )
+    assert classify_capture(url) == "light"
+    assert classify_capture("https://www.example.com") == "light"
+
+    DomainStats.update(mean_archive_size=app.config["CAPTURE_HEAVY_ARCHIVE_SIZE"]).execute()
+    assert classify_capture(url) == "heavy"
+
+    DomainStats.update(
+        mean_archive_size=None, p90_duration=app.config["CAPTURE_HEAVY_DURATION"]
+    ).execute()
+    assert classify_capture(url) == "heavy"
+
+
+def test_get_heavy_domains(app):
+    """get_heavy_domains returns the domains whose captures were large or slow, at once."""
+    from scoop_rest_api.models import DomainStats
+
+    for domain, mean_archive_size in [("example.com", 0), ("example.org", None)]:
+        DomainStats.create(
+            domain=domain,
+            updated_timestamp=datetime.datetime.now(datetime.UTC),
+            mean_archive_size=mean_archive_size,
+        )
+
+    urls = ["https://example.com/page", "https://example.org.", "https://example.net", "foo", None]
+    assert get_heavy_domains(urls) == set()
+    assert get_heavy_domains([]) == set()
+
+    DomainStats.update(mean_archive_size=app.config["CAPTURE_HEAVY_ARCHIVE_SIZE"]).where(
+        DomainStats.domain == "example.org"
+    ).execute()
+    assert get_heavy_domains(urls) == {"example.org"}
+
+    # Provided lists of heavy domains are used as is
+    assert classify_capture("https://example.org") == "heavy"
+    assert classify_capture("https://example.org", heavy_domains=set()) == "light"
+    assert classify_capture("https://example.com", heavy_domains={"example.com"}) == "heavy"
@@ -0,0 +1,124 @@
+"""
+Test suite for "utils.capture_workspace"
+"""
+
+import json
+import os
+import subprocess
+
+import pytest
+
+
+def test_capture_workspace_create(app, tmp_path, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import CaptureWorkspace
+
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_PATH", str(tmp_path))
+
+        workspace = CaptureWorkspace.create()
+        assert workspace.path.parent == tmp_path
+        assert not workspace.is_orphaned()
+
+        workspace.remove()
+        assert not workspace.path.exists()
+
+
+def test_capture_workspace_quota(app, tmp_path, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import CaptureWorkspace
+
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_PATH", str(tmp_path))
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_QUOTA", 1024)
+
+        workspace = CaptureWorkspace.create()
+        assert not workspace.is_over_quota()
+
+        (workspace.path / "archive.wacz").write_bytes(b"0" * 2048)
+        assert workspace.is_over_quota()
+
+        # Workspaces cannot be created without enough free space for their quota
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_QUOTA", 10**18)
+
+        with pytest.raises(Exception):
+            CaptureWorkspace.create()
+
+
+def test_reclaim_orphaned_workspaces(app, tmp_path, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import CaptureWorkspace, reclaim_orphaned_workspaces
+        from scoop_rest_api.utils.capture_workspace import OWNER_FILENAME
+
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_PATH", str(tmp_path))
+        monkeypatch.setitem(current_app.config, "TEMPORARY_STORAGE_EXPIRATION", 3600)
+
+        active = CaptureWorkspace.create()
+
+        orphan = CaptureWorkspace.create()
+        dead_owner = subprocess.Popen(["true"])
+        dead_owner.wait()
+        owner = json.loads((orphan.path / OWNER_FILENAME).read_text())
+        (orphan.path / OWNER_FILENAME).write_text(
+            json.dumps({**owner, "owner_pid": dead_owner.pid})
+        )
+
+        assert reclaim_orphaned_workspaces() == 1
+        assert active.path.exists()
+        assert not orphan.path.exists()
+
+
+def test_capture_workspace_owned_by_other_user(app, tmp_path, monkeypatch):
+    """Workspaces whose owner runs, but cannot be signaled by this process, are not orphaned."""
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import CaptureWorkspace
+
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_PATH", str(tmp_path))
+
+        workspace = CaptureWorkspace.create()
+
+        def kill(pid, signal):
+            raise PermissionError()
+
+        monkeypatch.setattr("os.kill", kill)
+        assert not workspace.is_orphaned()
+
+
+def test_capture_workspace_owner_identity(app, tmp_path, monkeypatch):
+    """Workspaces whose owner's pid was reused, or that predate a reboot, are orphaned."""
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import CaptureWorkspace
+        from scoop_rest_api.utils.capture_workspace import OWNER_FILENAME
+        from scoop_rest_api.utils.process_tree import get_process_start_time
+
+        monkeypatch.setitem(current_app.config, "CAPTURE_WORKSPACE_PATH", str(tmp_path))
+
+        workspace = CaptureWorkspace.create()
+        owner_path = workspace.path / OWNER_FILENAME
+        owner = json.loads(owner_path.read_text())
+
+        assert owner["owner_pid"] == os.getpid()
+        assert owner["owner_start_time"] == get_process_start_time(os.getpid())
+
+        if owner["owner_start_time"] is None:
+            pytest.skip("Process start times are not available on this platform.")
+
+        # Another process now uses the pid of the owner
+        owner_path.write_text(
+            json.dumps({**owner, "owner_start_time": owner["owner_start_time"] - 1})
+        )
+        assert workspace.is_orphaned()
+
+        # The system restarted since the workspace was created
+        owner_path.write_text(json.dumps({**owner, "boot_id": "foo"}))
+        assert workspace.is_orphaned()
+
+        # Workspaces that do not say which process created them
+        owner_path.write_text(str(os.getpid()))
+        assert workspace.is_orphaned()
+
+        owner_path.write_text(json.dumps(owner))
+        assert not workspace.is_orphaned()
@@ -0,0 +1,74 @@
+"""
+Test suite for "utils.display_pool"
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which("Xvfb") is None, reason="Xvfb is not installed")
+
+
+def test_get_display_disabled(app, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import get_display
+
+        monkeypatch.setitem(current_app.config, "XVFB_DISPLAY_POOL", False)
+        assert get_display(current_app.config["PROXY_PORT"]) is None
+
+
+def test_get_display_starts_and_restarts_displays(app, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import get_display
+        from scoop_rest_api.utils.display_pool import _get_server_pid, is_display_healthy
+
+        monkeypatch.setitem(current_app.config, "XVFB_DISPLAY_POOL", True)
+        monkeypatch.setitem(current_app.config, "XVFB_DISPLAY_BASE", 450)
+        proxy_port = current_app.config["PROXY_PORT"]
+
+        # One display per capture slot, started on demand
+        assert get_display(proxy_port) == ":450"
+        assert get_display(proxy_port + 1) == ":451"
+        assert is_display_healthy(450)
+        assert is_display_healthy(451)
+
+        # Healthy displays are reused
+        pid = _get_server_pid(450)
+        assert get_display(proxy_port) == ":450"
+        assert _get_server_pid(450) == pid
+
+        # Unhealthy displays are restarted
+        os.kill(pid, signal.SIGKILL)
+        assert get_display(proxy_port) == ":450"
+        assert _get_server_pid(450) != pid
+        assert is_display_healthy(450)
+
+        for display_number in [450, 451]:
+            os.kill(_get_server_pid(display_number), signal.SIGKILL)
+
+
+def test_start_display_spares_unrelated_processes(app, monkeypatch):
+    """Stale lock files pointing at a process that is not Xvfb do not get that process killed."""
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import get_display
+        from scoop_rest_api.utils.display_pool import _get_lock_file, _get_server_pid
+
+        monkeypatch.setitem(current_app.config, "XVFB_DISPLAY_POOL", True)
+        monkeypatch.setitem(current_app.config, "XVFB_DISPLAY_BASE", 452)
+
+        unrelated = subprocess.Popen(["sleep", "60"])
+        _get_lock_file(452).write_text(f"{unrelated.pid:>10}\n")
+
+        assert get_display(current_app.config["PROXY_PORT"]) == ":452"
+        assert unrelated.poll() is None
+        assert _get_server_pid(452) != unrelated.pid
+
+        unrelated.kill()
+        unrelated.wait()
+        os.kill(_get_server_pid(452), signal.SIGKILL)
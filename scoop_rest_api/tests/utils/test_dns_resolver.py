@@ -0,0 +1,115 @@
+"""
+Test suite for "utils.dns_resolver"
+"""
+
+import socket
+import threading
+
+import pytest
+
+from scoop_rest_api.utils import CachingResolver
+
+
+class FakeResolver:
+    """Local stand-in for the system's resolver. Counts lookups, and can be made to hang."""
+
+    def __init__(self, records: dict):
+        self.records = records
+        self.lookups = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, host: str, family: int) -> list[str]:
+        self.lookups.append((host, family))
+        self.release.wait(5)
+
+        record = self.records.get((host, family))
+
+        if isinstance(record, Exception):
+            raise record
+
+        if not record:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+        return record
+
+
+@pytest.fixture()
+def fake_resolver() -> FakeResolver:
+    return FakeResolver(
+        {
+            ("example.com", socket.AF_INET): ["93.184.215.14"],
+            ("example.com", socket.AF_INET6): ["2606:2800:21f:cb07:6820:80da:af6b:8b2c"],
+            ("ipv4.example.com", socket.AF_INET): ["93.184.215.15"],
+            ("flaky.example.com", socket.AF_INET): socket.gaierror(socket.EAI_AGAIN, "Try again"),
+        }
+    )
+
+
+def get_resolver(lookup, **kwargs) -> CachingResolver:
+    return CachingResolver(
+        **{"ttl": 60, "negative_ttl": 10, "timeout": 1, "max_entries": 100, **kwargs},
+        lookup=lookup,
+    )
+
+
+def test_caching_resolver_resolves_a_and_aaaa(fake_resolver):
+    """CachingResolver returns IPv4 then IPv6 addresses, and caches them."""
+    resolver = get_resolver(fake_resolver)
+
+    for i in range(0, 3):
+        assert resolver.resolve("Example.com.") == [
+            "93.184.215.14",
+            "2606:2800:21f:cb07:6820:80da:af6b:8b2c",
+        ]
+
+    assert resolver.resolve("ipv4.example.com") == ["93.184.215.15"]
+
+    assert len(fake_resolver.lookups) == 4
+    stats = resolver.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_caching_resolver_negative_caching(fake_resolver):
+    """CachingResolver caches the absence of addresses, but not temporary failures."""
+    resolver = get_resolver(fake_resolver)
+
+    assert resolver.resolve("nope.example.com") == []
+    assert resolver.resolve("nope.example.com") == []
+    assert len(fake_resolver.lookups) == 2
+    assert resolver.get_stats()["negative_hits"] == 1
+
+    for i in range(0, 2):
+        with pytest.raises(socket.gaierror):
+            resolver.resolve("flaky.example.com")
+
+    assert len(fake_resolver.lookups) == 6
+
+    # Negative entries expire after their own TTL
+    resolver = get_resolver(fake_resolver, negative_ttl=0)
+    resolver.resolve("nope.example.com")
+    resolver.resolve("nope.example.com")
+    assert len(fake_resolver.lookups) == 10
+
+
+def test_caching_resolver_timeout(fake_resolver):
+    """
+    CachingResolver raises TimeoutError if a lookup takes too long,
+    merges concurrent lookups of the same host, and caches late results.
+    """
+    resolver = get_resolver(fake_resolver, timeout=0.1)
+    fake_resolver.release.clear()
+
+    for i in range(0, 2):
+        with pytest.raises(TimeoutError):
+            resolver.resolve("example.com")
+
+    assert len(fake_resolver.lookups) == 2
+    assert resolver.get_stats()["timeouts"] == 2
+
+    fake_resolver.release.set()
+    resolver._executor.shutdown(wait=True)
+
+    assert resolver.resolve("example.com")[0] == "93.184.215.14"
+    assert len(fake_resolver.lookups) == 2
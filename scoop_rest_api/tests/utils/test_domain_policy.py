@@ -0,0 +1,53 @@
+"""
+Test suite for "utils.domain_policy"
+"""
+
+from scoop_rest_api.utils import DomainPolicy
+
+
+def test_domain_policy_matches_suffixes():
+    """DomainPolicy matches domains and their subdomains, on label boundaries only."""
+    policy = DomainPolicy()
+    policy.add("fcc.gov", {"validator_ua": "FCC"})
+
+    assert policy.match("fcc.gov") == {"validator_ua": "FCC"}
+    assert policy.match("www.FCC.gov.") == {"validator_ua": "FCC"}
+    assert policy.match("notfcc.gov") == {}
+    assert policy.match("fcc.gov.evil") == {}
+    assert policy.match("gov") == {}
+    assert policy.match(None) == {}
+
+
+def test_domain_policy_longest_suffix_wins():
+    """DomainPolicy merges attributes of every matching entry, the longest suffix winning."""
+    policy = DomainPolicy()
+    policy.add("gov", {"validator_ua": "GOV", "scoop_ua_suffix": "(GOV)"})
+    policy.add("www.fcc.gov", {"validator_ua": "FCC"})
+    policy.add("www.fcc.gov", {"video_attachments": True})
+
+    assert len(policy) == 2
+    assert policy.match("a.www.fcc.gov") == {
+        "validator_ua": "FCC",
+        "scoop_ua_suffix": "(GOV)",
+        "video_attachments": True,
+    }
+    assert policy.match("fcc.gov") == {"validator_ua": "GOV", "scoop_ua_suffix": "(GOV)"}
+
+
+def test_get_custom_agents(app, monkeypatch):
+    """get_custom_agents only returns user agent settings, or None."""
+    from scoop_rest_api.utils import get_custom_agents
+
+    policy = DomainPolicy.from_config(
+        {
+            "CUSTOM_USER_AGENT_DOMAINS": {"www.fcc.gov": {"validator_ua": "FCC"}},
+            "VIDEO_ATTACHMENT_DOMAINS": ["fcc.gov"],
+            "SCOOP_DOMAIN_PROFILES": {"fcc.gov": "document"},
+        }
+    )
+    monkeypatch.setitem(app.extensions, "domain_policy", policy)
+
+    assert get_custom_agents("www.fcc.gov") == {"validator_ua": "FCC"}
+    assert get_custom_agents("fcc.gov") is None
+    assert get_custom_agents("notwww.fcc.gov") is None
+    assert policy.match("www.fcc.gov")["scoop_profile"] == "document"
@@ -0,0 +1,57 @@
+"""
+Test suite for "utils.ip_range_index"
+"""
+
+import ipaddress
+
+from netaddr import IPAddress, IPNetwork
+
+from scoop_rest_api.utils import IPRangeIndex
+
+
+def test_ip_range_index_merges_ranges():
+    """IPRangeIndex merges overlapping and adjacent ranges."""
+    index = IPRangeIndex(["10.0.0.0/8", "10.1.0.0/16", "11.0.0.0/8", "fc00::/7", "fc00::/8"])
+    assert len(index) == 2
+
+    assert "10.1.2.3" in index
+    assert "11.255.255.255" in index
+    assert "12.0.0.0" not in index
+    assert "9.255.255.255" not in index
+    assert "fd00::1" in index
+    assert ipaddress.ip_address("fe00::1") not in index
+
+
+def test_ip_range_index_matches_linear_scan(app):
+    """IPRangeIndex gives the same results as checking every range of BANNED_IP_RANGES in turn."""
+    banned_ip_ranges = app.config["BANNED_IP_RANGES"]
+    index = IPRangeIndex(banned_ip_ranges)
+
+    addresses = [
+        "0.0.0.0",
+        "1.1.1.1",
+        "9.255.255.255",
+        "10.0.0.0",
+        "100.63.255.255",
+        "100.64.0.1",
+        "127.0.0.1",
+        "172.31.255.255",
+        "172.32.0.0",
+        "192.0.0.7",
+        "192.0.0.8",
+        "198.51.100.1",
+        "223.255.255.255",
+        "255.255.255.255",
+        "::",
+        "::1",
+        "::2",
+        "::ffff:127.0.0.1",
+        "2001:db8::1",
+        "2606:4700:4700::1111",
+        "fe80::1",
+        "ff02::1",
+    ]
+
+    for address in addresses:
+        expected = any(IPAddress(address) in IPNetwork(ip_range) for ip_range in banned_ip_ranges)
+        assert (address in index) == expected, address
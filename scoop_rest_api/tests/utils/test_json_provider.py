@@ -0,0 +1,44 @@
+"""
+Test suite for "utils.json_provider"
+"""
+
+import datetime
+import json
+import uuid
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+from scoop_rest_api.utils import FastJSONProvider
+
+
+def test_fast_json_provider_matches_default_provider(app):
+    """FastJSONProvider serializes data the same way Flask's default provider does."""
+    fast_provider = FastJSONProvider(app)
+    default_provider = DefaultJSONProvider(app)
+
+    data = {
+        "id_capture": uuid.uuid4(),
+        "created_timestamp": datetime.datetime(2023, 6, 28, 16, 30, 28),
+        "ended_timestamp": None,
+        "url": "https://example.com/é",
+        "summary": {"attachments": {"certificates": ["a.pem", "b.pem"]}, "exceedsMaxSize": False},
+        "big_number": 2**70,
+    }
+
+    fast_output = fast_provider.dumps(data)
+
+    assert json.loads(fast_output) == json.loads(default_provider.dumps(data))
+    assert json.loads(fast_output)["created_timestamp"] == "Wed, 28 Jun 2023 16:30:28 GMT"
+    assert list(json.loads(fast_output).keys()) == sorted(data.keys())
+    assert fast_provider.loads(fast_output) == json.loads(fast_output)
+
+
+def test_fast_json_provider_is_used_by_app(app):
+    """The app uses FastJSONProvider, including for responses."""
+    assert isinstance(current_app.json, FastJSONProvider)
+
+    response = current_app.json.response({"id_capture": uuid.UUID(int=0)})
+
+    assert response.mimetype == "application/json"
+    assert response.get_json() == {"id_capture": "00000000-0000-0000-0000-000000000000"}
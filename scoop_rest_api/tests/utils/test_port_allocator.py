@@ -0,0 +1,62 @@
+"""
+Test suite for "utils.port_allocator" and "utils.check_proxy_port"
+"""
+
+import socket
+
+
+def test_check_proxy_port(app):
+    with app.app_context():
+        from scoop_rest_api.utils import check_proxy_port
+
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            port = listener.getsockname()[1]
+
+            assert check_proxy_port(port) is False
+
+        assert check_proxy_port(port) is True
+
+
+def test_lease_proxy_port(app, tmp_path, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import lease_proxy_port
+
+        monkeypatch.setitem(current_app.config, "PROXY_PORT_LEASE_PATH", str(tmp_path))
+        monkeypatch.setitem(current_app.config, "PROXY_PORT_RANGE", 2)
+        first_port = current_app.config["PROXY_PORT"]
+
+        with lease_proxy_port() as port_1:
+            assert port_1 == first_port
+
+            # Leased ports are not handed out twice
+            with lease_proxy_port() as port_2:
+                assert port_2 == first_port + 1
+
+                # Range is exhausted
+                with lease_proxy_port() as port_3:
+                    assert port_3 is None
+
+        # Leases are released on exit
+        with lease_proxy_port() as port_4:
+            assert port_4 == first_port
+
+
+def test_lease_proxy_port_skips_ports_in_use(app, tmp_path, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import lease_proxy_port
+
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            port_in_use = listener.getsockname()[1]
+
+            monkeypatch.setitem(current_app.config, "PROXY_PORT_LEASE_PATH", str(tmp_path))
+            monkeypatch.setitem(current_app.config, "PROXY_PORT", port_in_use)
+            monkeypatch.setitem(current_app.config, "PROXY_PORT_RANGE", 1)
+
+            with lease_proxy_port() as port:
+                assert port is None
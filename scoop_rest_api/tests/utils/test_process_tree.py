@@ -0,0 +1,107 @@
+"""
+Test suite for "utils.process_tree"
+"""
+
+import json
+import os
+import signal
+import subprocess
+import time
+
+
+def spawn_process_tree():
+    """Starts a shell in its own session, which itself spawns a long-running grandchild."""
+    return subprocess.Popen(
+        ["sh", "-c", "sleep 60 & sleep 60"],
+        start_new_session=True,
+    )
+
+
+def group_exists(pgid, timeout=0):
+    """Checks whether a process group exists, waiting up to `timeout` seconds for it to be gone."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            return False
+        if time.time() >= deadline:
+            return True
+        time.sleep(0.1)
+
+
+def test_kill_process_tree_kills_grandchildren(app):
+    with app.app_context():
+        from scoop_rest_api.utils import kill_process_tree
+
+        process = spawn_process_tree()
+        time.sleep(0.2)
+        assert group_exists(process.pid)
+
+        kill_process_tree(process, grace_period=1)
+
+        assert process.returncode is not None
+        assert not group_exists(process.pid, timeout=5)
+
+
+def test_get_resource_limiter(app):
+    with app.app_context():
+        from scoop_rest_api.utils import get_resource_limiter
+
+        assert get_resource_limiter() is None
+
+        result = subprocess.run(
+            ["sh", "-c", "ulimit -t"],
+            capture_output=True,
+            preexec_fn=get_resource_limiter(cpu_time_limit=42),
+        )
+        assert result.stdout.decode().strip() == "42"
+
+
+def test_reap_orphaned_process_groups(app, tmp_path, monkeypatch):
+    with app.app_context():
+        from flask import current_app
+        from scoop_rest_api.utils import reap_orphaned_process_groups, register_process_group
+
+        monkeypatch.setitem(current_app.config, "SCOOP_PROCESS_REGISTRY_PATH", str(tmp_path))
+
+        # Process groups owned by a live process are left untouched
+        live = spawn_process_tree()
+        register_process_group(live.pid)
+
+        # Process groups owned by a dead process are reaped
+        orphan = spawn_process_tree()
+        register_process_group(orphan.pid)
+        dead_owner = subprocess.Popen(["true"])
+        dead_owner.wait()
+        entry = json.loads((tmp_path / str(orphan.pid)).read_text())
+        (tmp_path / str(orphan.pid)).write_text(json.dumps({**entry, "owner_pid": dead_owner.pid}))
+
+        # Process groups which are not the ones that were registered (i.e: reused pid) are spared
+        reused = spawn_process_tree()
+        register_process_group(reused.pid)
+        entry = json.loads((tmp_path / str(reused.pid)).read_text())
+        (tmp_path / str(reused.pid)).write_text(
+            json.dumps(
+                {
+                    **entry,
+                    "owner_pid": dead_owner.pid,
+                    "leader_start_time": entry["leader_start_time"] - 1,
+                }
+            )
+        )
+
+        time.sleep(0.2)
+        assert reap_orphaned_process_groups() == 1
+
+        orphan.wait(timeout=5)
+        assert not group_exists(orphan.pid, timeout=5)
+        assert group_exists(live.pid)
+        assert group_exists(reused.pid)
+        assert not (tmp_path / str(orphan.pid)).exists()
+        assert not (tmp_path / str(reused.pid)).exists()
+        assert (tmp_path / str(live.pid)).exists()
+
+        for process in [live, reused]:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
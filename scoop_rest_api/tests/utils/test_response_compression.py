@@ -0,0 +1,89 @@
+"""
+Test suite for "utils.response_compression"
+"""
+
+import datetime
+import gzip
+import json
+
+import zstandard
+
+
+def test_response_compression_gzip(client, access_key, id_capture):
+    """Large JSON responses are compressed if the client accepts it. Small ones are not."""
+    from scoop_rest_api.models import Capture
+
+    headers = {"Access-Key": access_key["readable"], "Accept-Encoding": "gzip"}
+
+    # Small response
+    response = client.get(f"/capture/{id_capture}", headers=headers)
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+    # Large response (logs are only exposed once the capture reached a final state)
+    Capture.update(
+        stdout_logs="Capturing https://example.com\n" * 1000,
+        status="failed",
+        ended_timestamp=datetime.datetime.now(datetime.UTC),
+    ).where(Capture.id_capture == id_capture).execute()
+
+    response = client.get(f"/capture/{id_capture}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert response.headers["ETag"].startswith("W/")
+    assert json.loads(gzip.decompress(response.data))["id_capture"] == id_capture
+
+    # ETag still matches the uncompressed representation
+    etag = response.headers["ETag"]
+    response = client.get(f"/capture/{id_capture}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Client does not accept compressed responses
+    response = client.get(f"/capture/{id_capture}", headers={"Access-Key": access_key["readable"]})
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.vary
+    assert response.get_json()["id_capture"] == id_capture
+
+
+def test_response_compression_cached(client, access_key, id_capture):
+    """Compressed responses of captures in a final state are cached."""
+    from scoop_rest_api.models import Capture
+
+    headers = {"Access-Key": access_key["readable"], "Accept-Encoding": "gzip"}
+
+    def get_cache_stats():
+        response = client.get("/stats", headers={"Access-Key": access_key["readable"]})
+        return response.get_json()["compression_cache"]
+
+    Capture.update(
+        stdout_logs="Capturing https://example.com\n" * 1000,
+        status="failed",
+        ended_timestamp=datetime.datetime.now(datetime.UTC),
+    ).where(Capture.id_capture == id_capture).execute()
+
+    stats_before = get_cache_stats()
+
+    responses = [client.get(f"/capture/{id_capture}", headers=headers) for i in range(0, 2)]
+
+    stats_after = get_cache_stats()
+    assert stats_after["misses"] == stats_before["misses"] + 1
+    assert stats_after["hits"] == stats_before["hits"] + 1
+    assert responses[0].data == responses[1].data
+
+
+def test_response_compression_zstd(client, access_key, id_capture):
+    """zstd is preferred over gzip if accepted by the client."""
+    from scoop_rest_api.models import Capture
+
+    headers = {"Access-Key": access_key["readable"], "Accept-Encoding": "gzip, zstd"}
+
+    Capture.update(
+        stdout_logs="Capturing https://example.com\n" * 1000,
+        status="failed",
+        ended_timestamp=datetime.datetime.now(datetime.UTC),
+    ).where(Capture.id_capture == id_capture).execute()
+
+    response = client.get(f"/capture/{id_capture}", headers=headers)
+    assert response.headers["Content-Encoding"] == "zstd"
+    assert json.loads(zstandard.decompress(response.data))["id_capture"] == id_capture
@@ -0,0 +1,112 @@
+"""
+Test suite for "utils.scoop_runner"
+"""
+
+from subprocess import CompletedProcess
+import time
+
+
+def test_scoop_runner_cancel(id_capture, monkeypatch):
+    """ScoopRunner kills Scoop promptly when a started capture is canceled."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.utils import ScoopRunner
+
+    capture = Capture.get_next_capture(reserve=True)
+    assert str(capture.id_capture) == id_capture
+
+    # Stand-in for a long-running Scoop process tree
+    monkeypatch.setattr(
+        ScoopRunner, "build_scoop_args", lambda self: ["sh", "-c", "sleep 60 & sleep 60"]
+    )
+
+    Capture.update(status="canceled").where(Capture.id_capture == id_capture).execute()
+
+    start = time.time()
+    ScoopRunner(capture, 9000).run()
+
+    assert time.time() - start < 5
+    assert Capture.get_by_id(id_capture).status == "canceled"
+
+
+def test_scoop_runner_save_result_canceled(id_capture):
+    """Results of captures canceled while Scoop was running are not saved."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.utils import ScoopRunner
+
+    capture = Capture.get_next_capture(reserve=True)
+    Capture.update(status="canceled").where(Capture.id_capture == id_capture).execute()
+
+    ScoopRunner(capture, 9000).save_result(CompletedProcess([], 1, b"stdout", b"stderr"))
+
+    assert capture.status == "canceled"
+    capture = Capture.get_by_id(id_capture)
+    assert capture.status == "canceled"
+    assert capture.failed_reason is None
+    assert capture.stdout_logs is None
+
+
+def test_scoop_runner_domain_settings(app, id_capture, monkeypatch):
+    """ScoopRunner applies per-domain settings, matched by suffix (see utils.DomainPolicy)."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.utils import DomainPolicy, ScoopRunner
+
+    capture = Capture.get_by_id(id_capture)  # https://example.com
+    monkeypatch.setitem(app.config, "VIDEO_ATTACHMENT_DOMAINS", ["youtube.com"])
+
+    for domains, expected in [(["example.com"], "true"), (["notexample.com"], "false")]:
+        policy = DomainPolicy.from_config(
+            {
+                "CUSTOM_USER_AGENT_DOMAINS": {"com": {"scoop_ua_suffix": "(Perma.cc)"}},
+                "VIDEO_ATTACHMENT_DOMAINS": domains,
+                "SCOOP_DOMAIN_PROFILES": {},
+            }
+        )
+        monkeypatch.setitem(app.extensions, "domain_policy", policy)
+
+        scoop_runner = ScoopRunner(capture, 9000)
+        try:
+            scoop_args = scoop_runner.build_scoop_args()
+        finally:
+            scoop_runner.workspace.remove()
+
+        assert scoop_args[scoop_args.index("--capture-video-as-attachment") + 1] == expected
+        assert scoop_args[scoop_args.index("--user-agent-suffix") + 1] == " (Perma.cc)"
+
+
+def test_scoop_runner_capture_profiles(app, id_capture, monkeypatch):
+    """ScoopRunner applies the requested capture profile, or the domain's default profile."""
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.utils import DomainPolicy, ScoopRunner
+
+    capture = Capture.get_by_id(id_capture)  # https://example.com
+    monkeypatch.setitem(app.config, "VIDEO_ATTACHMENT_DOMAINS", [])
+    monkeypatch.setitem(
+        app.config,
+        "SCOOP_CAPTURE_PROFILES",
+        {
+            "document": {"--pdf-snapshot": "false", "--capture-timeout": 1},
+            "media": {"--pdf-snapshot": "true"},
+        },
+    )
+    policy = DomainPolicy.from_config(
+        {
+            "CUSTOM_USER_AGENT_DOMAINS": {},
+            "VIDEO_ATTACHMENT_DOMAINS": [],
+            "SCOOP_DOMAIN_PROFILES": {"example.com": "document"},
+        }
+    )
+    monkeypatch.setitem(app.extensions, "domain_policy", policy)
+
+    for options, expected in [(None, "false"), ({"profile": "media"}, "true")]:
+        capture.options = options
+        scoop_runner = ScoopRunner(capture, 9000)
+        try:
+            scoop_args = scoop_runner.build_scoop_args()
+        finally:
+            scoop_runner.workspace.remove()
+
+        assert scoop_args[scoop_args.index("--pdf-snapshot") + 1] == expected
+
+        # Options that are not whitelisted for profiles are left untouched
+        capture_timeout = app.config["SCOOP_CLI_OPTIONS"]["--capture-timeout"]
+        assert scoop_args[scoop_args.index("--capture-timeout") + 1] == str(capture_timeout)
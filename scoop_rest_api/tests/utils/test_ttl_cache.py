@@ -0,0 +1,50 @@
+"""
+Test suite for "utils.ttl_cache"
+"""
+
+from scoop_rest_api.utils import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    """TTLCache entries expire after their own TTL."""
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, clock=clock)
+
+    cache.set("a", "A", ttl=10)
+    cache.set("b", "B", ttl=1)
+    clock.now = 5
+
+    assert cache.get("a") == "A"
+    assert cache.get("b") is None
+    assert len(cache) == 1
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_cache_limits():
+    """TTLCache evicts least recently used entries, and stores nothing if disabled."""
+    cache = TTLCache(max_entries=2)
+
+    cache.set("a", "A", ttl=10)
+    cache.set("b", "B", ttl=10)
+    assert cache.get("a") == "A"  # "b" is now the least recently used entry
+    cache.set("c", "C", ttl=10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get_stats()["evictions"] == 1
+
+    cache = TTLCache(max_entries=0)
+    cache.set("a", "A", ttl=10)
+    assert cache.get("a") is None
@@ -2,8 +2,55 @@
 Test suite for "utils.validation_helpers"
 """
 
-from requests import ConnectionError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import logging
+import socket
+import threading
+import time
+
+import pytest
+from requests import TooManyRedirects
+
+
+class ValidationTestHandler(BaseHTTPRequestHandler):
+    """Serves the routes used to test `get_response`."""
+
+    def do_GET(self):
+        match self.path:
+            case "/":
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=UTF-8")
+                self.send_header("Content-Length", "648")
+            case "/redirect":
+                self.send_response(301)
+                self.send_header("Location", "/")
+            case "/loop":
+                self.send_response(302)
+                self.send_header("Location", "/loop")
+            case "/file":
+                self.send_response(302)
+                self.send_header("Location", "file:///etc/passwd")
+            case "/slow":
+                time.sleep(1)
+                self.send_response(200)
+
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def http_server():
+    """Runs a local HTTP server (see `ValidationTestHandler`) and returns its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ValidationTestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
 
 
 def test_should_reject_unresolvable_ip():
@@ -39,51 +86,74 @@ def test_should_accept_standard_ip(app):
         assert validate_ip("1.1.1.1")
 
 
-def test_should_return_headers_from_live_site(app, monkeypatch, mock_response_factory):
-    response = mock_response_factory()
-    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", lambda *args, **kwargs: response)
+def test_should_reject_list_with_blocked_ip(app):
+    with app.app_context():
+        from scoop_rest_api.utils import validate_ip
+
+        assert validate_ip(["1.1.1.1", "2606:4700:4700::1111"])
+        assert not validate_ip(["1.1.1.1", "::1"])
+        assert not validate_ip([])
+        assert not validate_ip("not-an-ip")
+
+
+def test_should_return_headers_from_live_site(app, http_server):
+    with app.app_context():
+        from scoop_rest_api.utils import get_response
+
+        response = get_response(f"{http_server}/")
+        assert response.status_code == 200
+        assert response.headers["content-length"] == "648"
+        assert response.headers["Content-Type"] == "text/html; charset=UTF-8"
+
 
+def test_should_follow_redirects(app, http_server):
     with app.app_context():
         from scoop_rest_api.utils import get_response
 
-        resp = get_response("http://this-is-not-a-functioning-url.com")
-        assert response.headers == resp.headers
+        response = get_response(f"{http_server}/redirect")
+        assert response.status_code == 200
+        assert response.url == f"{http_server}/"
 
 
-def test_should_return_no_headers_if_site_is_down(app, monkeypatch):
-    def site_is_down(*args, **kwargs):
-        raise ConnectionError()
+def test_should_raise_on_redirect_loop(app, http_server):
+    with app.app_context():
+        from scoop_rest_api.utils import get_response
 
-    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", site_is_down)
+        with pytest.raises(TooManyRedirects):
+            get_response(f"{http_server}/loop")
 
+
+def test_should_return_no_headers_if_redirected_to_invalid_schema(app, http_server):
     with app.app_context():
         from scoop_rest_api.utils import get_response
 
-        response = get_response("http://this-is-not-a-functioning-url.com")
-        assert response is None
+        assert get_response(f"{http_server}/file") is None
 
 
-def test_should_return_no_headers_if_site_times_out(
-    app, monkeypatch, caplog, mock_response_factory
-):
-    def site_times_out(*args, **kwargs):
-        from time import sleep
+def test_should_return_no_headers_if_site_is_down(app):
+    # Reserve a port nothing listens on
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
 
-        sleep(1)
+    with app.app_context():
+        from scoop_rest_api.utils import get_response
+
+        response = get_response(f"http://127.0.0.1:{port}/")
+        assert response is None
 
-        return mock_response_factory()
 
+def test_should_return_no_headers_if_site_times_out(app, monkeypatch, caplog, http_server):
     from flask import current_app
 
     monkeypatch.setitem(current_app.config, "VALIDATION_TIMEOUT", 0.1)
-    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", site_times_out)
 
     with caplog.at_level(logging.INFO):
 
         with app.app_context():
             from scoop_rest_api.utils import get_response
 
-            response = get_response("http://example.com")
+            response = get_response(f"{http_server}/slow")
             assert response is None
 
         [log] = caplog.records
@@ -116,3 +186,26 @@ def test_should_return_no_content_length_if_absent(app, mock_response_factory):
         from scoop_rest_api.utils import get_content_length
 
         assert get_content_length(response.headers) is None
+
+
+def test_should_normalize_url():
+    from scoop_rest_api.utils import normalize_url
+
+    assert normalize_url("HTTP://Example.COM") == "http://example.com/"
+    assert normalize_url("https://example.com:443/a?b=1#c") == "https://example.com/a?b=1"
+    assert normalize_url("https://example.com:8443/") == "https://example.com:8443/"
+    assert normalize_url("http://[::1]:8080/a") == "http://[::1]:8080/a"
+    assert normalize_url("http://example.com:99999/") is None
+    assert normalize_url("foo-bar-baz") is None
+
+
+def test_validation_host_header():
+    from scoop_rest_api.utils.validation_engine import get_host_header
+
+    assert get_host_header("http", "example.com", 80) == "example.com"
+    assert get_host_header("https", "example.com", 443) == "example.com"
+    assert get_host_header("http", "example.com", 443) == "example.com:443"
+    assert get_host_header("https", "example.com", 80) == "example.com:80"
+    assert get_host_header("https", "example.com", 8443) == "example.com:8443"
+    assert get_host_header("http", "::1", 80) == "[::1]"
+    assert get_host_header("https", "2001:db8::1", 8443) == "[2001:db8::1]:8443"
@@ -88,3 +88,104 @@ def test_artifact_get_file(client, runner, access_key, id_capture):
         assert "Content-Range" in response.headers["Access-Control-Expose-Headers"]
         assert "Content-Encoding" in response.headers["Access-Control-Expose-Headers"]
         assert "Content-Length" in response.headers["Access-Control-Expose-Headers"]
+
+
+def test_artifact_get_conditional(client, id_capture, monkeypatch):
+    """
+    [GET] /artifact returns cacheable files with an ETag, and HTTP 304 without reading the file
+    from the database if that ETag is provided via If-None-Match.
+    """
+    import datetime
+    from scoop_rest_api.models import Capture
+
+    Capture.update(
+        status="success",
+        started_timestamp=datetime.datetime.now(datetime.UTC),
+        ended_timestamp=datetime.datetime.now(datetime.UTC),
+        archive=b"archive",
+        summary={"attachments": {}},
+    ).where(Capture.id_capture == id_capture).execute()
+
+    response = client.get(f"/artifact/{id_capture}/archive.wacz")
+    etag = response.headers["ETag"]
+
+    assert response.status_code == 200
+    assert response.data == b"archive"
+    assert etag
+    assert response.cache_control.public
+    assert response.cache_control.immutable
+    assert 0 < response.cache_control.max_age <= current_app.config["TEMPORARY_STORAGE_EXPIRATION"]
+
+    def retrieve_artifact(*args, **kwargs):
+        raise AssertionError("Artifact should not be read from the database.")
+
+    monkeypatch.setattr("scoop_rest_api.views.artifact.retrieve_artifact", retrieve_artifact)
+
+    response = client.get(f"/artifact/{id_capture}/archive.wacz", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert not response.data
+
+
+def test_artifact_get_expiring(client, id_capture):
+    """
+    [GET] /artifact only lets artifacts be cached until their capture expires
+    (see `cleanup` command).
+    """
+    import datetime
+    from scoop_rest_api.models import Capture
+
+    expiration = current_app.config["TEMPORARY_STORAGE_EXPIRATION"]
+    started_timestamp = datetime.datetime.now(datetime.UTC) - datetime.timedelta(seconds=expiration)
+
+    Capture.update(
+        status="success",
+        started_timestamp=started_timestamp,
+        ended_timestamp=started_timestamp,
+        archive=b"archive",
+        summary={"attachments": {}},
+    ).where(Capture.id_capture == id_capture).execute()
+
+    response = client.get(f"/artifact/{id_capture}/archive.wacz")
+
+    assert response.status_code == 200
+    assert response.cache_control.max_age == 0
+
+
+def test_artifact_get_cached(client, access_key, id_capture):
+    """
+    [GET] /artifact serves small artifacts from the in-process cache,
+    until their capture is deleted.
+    """
+    import datetime
+    from scoop_rest_api.models import Capture
+
+    Capture.update(
+        status="success",
+        ended_timestamp=datetime.datetime.now(datetime.UTC),
+        archive=b"archive",
+        summary={"attachments": {}},
+    ).where(Capture.id_capture == id_capture).execute()
+
+    def get_cache_stats():
+        response = client.get("/stats", headers={"Access-Key": access_key["readable"]})
+        return response.get_json()["artifact_cache"]
+
+    stats_before = get_cache_stats()
+
+    for i in range(0, 3):
+        response = client.get(f"/artifact/{id_capture}/archive.wacz")
+        assert response.status_code == 200
+        assert response.data == b"archive"
+
+    stats_after = get_cache_stats()
+    assert stats_after["misses"] == stats_before["misses"] + 1
+    assert stats_after["hits"] == stats_before["hits"] + 2
+
+    # Deleted captures are evicted from the cache
+    Capture.delete().where(Capture.id_capture == id_capture).execute()
+
+    response = client.get(f"/artifact/{id_capture}/archive.wacz")
+    assert response.status_code == 404
+    assert current_app.extensions["artifact_cache"].get((id_capture, "archive.wacz")) is None
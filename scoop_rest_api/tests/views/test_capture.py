@@ -5,6 +5,9 @@ Test suite for "views.capture"
 from unittest.mock import patch
 import uuid
 import datetime
+import json
+import threading
+import time
 
 from flask import current_app
 
@@ -104,6 +107,24 @@ def test_capture_post_invalid_callback_url(client, access_key, default_capture_u
     assert "error" in response.get_json()
 
 
+def test_capture_post_invalid_batch_callback(client, access_key, default_capture_url):
+    """[POST] /capture returns HTTP 400 if batch_callback is invalid or has no callback URL."""
+    access_key_readable = access_key["readable"]
+
+    for input in [
+        {"url": default_capture_url, "batch_callback": True},
+        {
+            "url": default_capture_url,
+            "callback_url": default_capture_url + "callback",
+            "batch_callback": "yes",
+        },
+    ]:
+        response = client.post("/capture", headers={"Access-Key": access_key_readable}, json=input)
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+
 @patch("scoop_rest_api.views.capture.start_capture_process")
 def test_capture_post_save(start_capture_process, client, access_key, default_capture_url):
     """[POST] /capture returns HTTP 200 and saves a capture request."""
@@ -134,6 +155,35 @@ def test_capture_post_save(start_capture_process, client, access_key, default_ca
     start_capture_process.delay.assert_called_once()
 
 
+@patch("scoop_rest_api.views.capture.start_capture_process")
+def test_capture_post_profile(start_capture_process, client, access_key, default_capture_url):
+    """[POST] /capture stores the requested capture profile, and rejects unknown ones."""
+    from scoop_rest_api.models import Capture
+
+    access_key_readable = access_key["readable"]
+
+    for profile in ["foo", 12]:
+        response = client.post(
+            "/capture",
+            headers={"Access-Key": access_key_readable},
+            json={"url": default_capture_url, "profile": profile},
+        )
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+    response = client.post(
+        "/capture",
+        headers={"Access-Key": access_key_readable},
+        json={"url": default_capture_url, "profile": "document"},
+    )
+
+    assert response.status_code == 200
+    capture = Capture.get_by_id(response.get_json()["id_capture"])
+    assert capture.options == {"profile": "document"}
+    start_capture_process.delay.assert_called_once()
+
+
 def test_capture_get_misformatted_id_capture(client, access_key):
     """[GET] /capture returns HTTP 400 when provided with an id_capture in an invalid format."""
     access_key_readable = access_key["readable"]
@@ -279,3 +329,208 @@ def test_capture_get_id_capture_failed_job(
     except AssertionError:
         print(response_data)
         raise
+
+
+def test_capture_delete_invalid_id_capture(client, access_key):
+    """[DELETE] /capture returns HTTP 404 when provided with an id_capture that does not exist."""
+    access_key_readable = access_key["readable"]
+    id_capture = str(uuid.uuid4())
+
+    response = client.delete(f"/capture/{id_capture}", headers={"Access-Key": access_key_readable})
+
+    assert response.status_code == 404
+    assert "error" in response.get_json()
+
+
+def test_capture_delete_restricted_id_capture(client, access_key, default_capture_url):
+    """[DELETE] /capture returns HTTP 403 when given an id_capture owned by a different user."""
+    from scoop_rest_api.models import AccessKey, Capture
+
+    restricted_access_key_digest = AccessKey.create_key_digest(
+        salt=current_app.config["ACCESS_KEY_SALT"]
+    )
+
+    AccessKey.create(label="Test", key_digest=restricted_access_key_digest[1])
+
+    restricted_capture = client.post(
+        "/capture",
+        headers={"Access-Key": restricted_access_key_digest[0]},
+        json={"url": default_capture_url},
+    )
+
+    restricted_id_capture = restricted_capture.get_json()["id_capture"]
+
+    response = client.delete(
+        f"/capture/{restricted_id_capture}", headers={"Access-Key": access_key["readable"]}
+    )
+
+    assert response.status_code == 403
+    assert "error" in response.get_json()
+    assert Capture.get_by_id(restricted_id_capture).status == "pending"
+
+
+def test_capture_delete_pending_capture(client, access_key, id_capture):
+    """[DELETE] /capture cancels a pending capture, and returns HTTP 409 if asked to again."""
+    from scoop_rest_api.models import Capture
+
+    access_key_readable = access_key["readable"]
+
+    response = client.delete(f"/capture/{id_capture}", headers={"Access-Key": access_key_readable})
+    response_data = response.get_json()
+
+    assert response.status_code == 200
+    assert response_data["status"] == "canceled"
+    assert response_data["ended_timestamp"] is not None
+    assert "follow" not in response_data
+
+    # Canceled captures are no longer in the queue
+    assert Capture.get_next_capture() is None
+
+    response = client.delete(f"/capture/{id_capture}", headers={"Access-Key": access_key_readable})
+
+    assert response.status_code == 409
+    assert "error" in response.get_json()
+
+
+def test_capture_delete_callback(app, client, access_key, default_capture_url, monkeypatch):
+    """
+    [DELETE] /capture queues the callback of canceled pending captures.
+    The callback of canceled started captures is queued by the worker that ran them.
+    """
+    from types import SimpleNamespace
+
+    from scoop_rest_api.models import Capture
+    from scoop_rest_api.tasks import start_capture_process
+
+    headers = {"Access-Key": access_key["readable"]}
+    queued = []
+
+    monkeypatch.setattr(
+        "scoop_rest_api.views.capture.queue_callback",
+        lambda capture: queued.append(("view", str(capture.id_capture))),
+    )
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.queue_callback",
+        lambda capture: queued.append(("worker", str(capture.id_capture))),
+    )
+    monkeypatch.setattr("scoop_rest_api.tasks.get_preflight_failure", lambda url: None)
+    monkeypatch.setattr("scoop_rest_api.tasks.start_capture_process.delay", lambda **kwargs: None)
+
+    def create_capture() -> str:
+        response = client.post(
+            "/capture",
+            headers=headers,
+            json={"url": default_capture_url, "callback_url": "https://example.com/callback"},
+        )
+        return response.get_json()["id_capture"]
+
+    # Pending capture
+    id_capture = create_capture()
+
+    response = client.delete(f"/capture/{id_capture}", headers=headers)
+    assert response.status_code == 200
+    assert queued == [("view", id_capture)]
+
+    # Started capture
+    queued.clear()
+    id_capture = create_capture()
+
+    def run():
+        assert Capture.get_by_id(id_capture).status == "started"
+        response = client.delete(f"/capture/{id_capture}", headers=headers)
+        assert response.status_code == 200
+        assert not queued
+
+    monkeypatch.setattr(
+        "scoop_rest_api.tasks.ScoopRunner", lambda *args, **kwargs: SimpleNamespace(run=run)
+    )
+
+    start_capture_process.run()
+    assert Capture.get_by_id(id_capture).status == "canceled"
+    assert queued == [("worker", id_capture)]
+
+
+def test_capture_events_get_restricted_id_capture(client, access_key, default_capture_url):
+    """[GET] /capture/<id>/events returns HTTP 404 or 403 for missing or restricted captures."""
+    from scoop_rest_api.models import AccessKey, Capture
+
+    other_access_key = AccessKey.create(label="Other", key_digest="foo")
+    other_capture = Capture.create(url=default_capture_url, id_access_key=other_access_key)
+
+    response = client.get(
+        f"/capture/{uuid.uuid4()}/events", headers={"Access-Key": access_key["readable"]}
+    )
+    assert response.status_code == 404
+
+    response = client.get(
+        f"/capture/{other_capture.id_capture}/events",
+        headers={"Access-Key": access_key["readable"]},
+    )
+    assert response.status_code == 403
+
+
+def test_capture_events_get(app, client, access_key, id_capture):
+    """
+    [GET] /capture/<id>/events streams the current state of a capture, then its status changes,
+    until it reaches a final state.
+    """
+    from scoop_rest_api.models import Capture
+
+    def update_capture():
+        time.sleep(0.5)
+        with app.app_context():
+            Capture.update(status="started").where(Capture.id_capture == id_capture).execute()
+            Capture.update(
+                status="failed", ended_timestamp=datetime.datetime.now(datetime.UTC)
+            ).where(Capture.id_capture == id_capture).execute()
+
+    thread = threading.Thread(target=update_capture)
+    thread.start()
+
+    response = client.get(
+        f"/capture/{id_capture}/events", headers={"Access-Key": access_key["readable"]}
+    )
+    body = response.get_data(as_text=True)
+    thread.join()
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    statuses = [
+        json.loads(chunk.split("data: ", 1)[1])["status"]
+        for chunk in body.split("\n\n")
+        if chunk.startswith("event: status")
+    ]
+    assert statuses == ["pending", "started", "failed"]
+
+
+def test_capture_get_conditional(client, access_key, id_capture):
+    """
+    [GET] /capture returns an ETag, and HTTP 304 if that ETag is provided via If-None-Match
+    and the capture did not change in the meantime.
+    """
+    from scoop_rest_api.models import Capture
+
+    headers = {"Access-Key": access_key["readable"]}
+
+    response = client.get(f"/capture/{id_capture}", headers=headers)
+    etag = response.headers["ETag"]
+
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+
+    response = client.get(f"/capture/{id_capture}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Captures in a final state can be cached
+    Capture.update(status="failed", ended_timestamp=datetime.datetime.now(datetime.UTC)).where(
+        Capture.id_capture == id_capture
+    ).execute()
+
+    response = client.get(f"/capture/{id_capture}", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["status"] == "failed"
+    assert response.cache_control.private
+    assert 0 < response.cache_control.max_age <= current_app.config["TEMPORARY_STORAGE_EXPIRATION"]
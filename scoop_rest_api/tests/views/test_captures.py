@@ -0,0 +1,389 @@
+"""
+Test suite for "views.captures"
+"""
+
+import datetime
+import json
+import threading
+import time
+from unittest.mock import patch
+import uuid
+
+from flask import current_app
+
+
+def test_captures_batch_post_missing_access_key(client):
+    """[POST] /captures/batch returns HTTP 401 if no Access-Key was provided."""
+    response = client.post("/captures/batch")
+    assert response.status_code == 401
+    assert "error" in response.get_json()
+
+
+def test_captures_batch_post_invalid_input(client, access_key, default_capture_url):
+    """[POST] /captures/batch returns HTTP 400 and creates nothing if any item is invalid."""
+    from scoop_rest_api.models import Capture
+
+    access_key_readable = access_key["readable"]
+
+    for input in [
+        {},
+        {"captures": []},
+        {"captures": "foo"},
+        {"captures": [{"url": default_capture_url}, {}]},
+        {"captures": [{"url": default_capture_url}, {"url": "foo", "callback_url": "bar"}]},
+        {
+            "captures": [{"url": default_capture_url}]
+            * (current_app.config["CAPTURE_BATCH_MAX_SIZE"] + 1)
+        },
+    ]:
+        response = client.post(
+            "/captures/batch", headers={"Access-Key": access_key_readable}, json=input
+        )
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+    assert Capture.select().count() == 0
+
+
+def test_captures_batch_post_over_capacity(client, access_key, default_capture_url):
+    """[POST] /captures/batch returns HTTP 429 and creates nothing if it would exceed capacity."""
+    from scoop_rest_api.models import Capture
+
+    response = client.post(
+        "/captures/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={
+            "captures": [{"url": default_capture_url}]
+            * (current_app.config["MAX_PENDING_CAPTURES"] + 1)
+        },
+    )
+
+    assert response.status_code == 429
+    assert "error" in response.get_json()
+    assert Capture.select().count() == 0
+
+
+@patch("scoop_rest_api.views.captures.start_capture_process")
+def test_captures_batch_post_save(
+    start_capture_process, client, access_key, default_capture_url, monkeypatch
+):
+    """
+    [POST] /captures/batch returns HTTP 200, saves capture requests and only
+    kicks off as many capture tasks as there are worker slots.
+    """
+    from scoop_rest_api.models import Capture
+
+    monkeypatch.setitem(current_app.config, "CAPTURE_WORKER_SLOTS", 2)
+
+    captures = [
+        {"url": f"{default_capture_url}?page={i}", "callback_url": f"{default_capture_url}callback"}
+        for i in range(0, 5)
+    ]
+
+    response = client.post(
+        "/captures/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"captures": captures},
+    )
+
+    response_data = response.get_json()
+
+    assert response.status_code == 200
+    assert [item["url"] for item in response_data] == [item["url"] for item in captures]
+
+    for item in response_data:
+        assert item["status"] == "pending"
+        assert item["callback_url"] == f"{default_capture_url}callback"
+
+        capture = Capture.get_by_id(item["id_capture"])
+        assert capture.url == item["url"]
+        assert capture.id_access_key.id_access_key == access_key["instance"].id_access_key
+
+    assert start_capture_process.delay.call_count == 2
+
+
+@patch("scoop_rest_api.views.captures.start_capture_process")
+def test_captures_batch_post_order(start_capture_process, client, access_key, default_capture_url):
+    """[POST] /captures/batch creates capture requests that are processed in the order listed."""
+    from scoop_rest_api.models import Capture
+
+    captures = [{"url": f"{default_capture_url}?page={i}"} for i in range(0, 5)]
+
+    response = client.post(
+        "/captures/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"captures": captures},
+    )
+    assert response.status_code == 200
+
+    created_timestamps = [
+        Capture.get_by_id(item["id_capture"]).created_timestamp for item in response.get_json()
+    ]
+    assert created_timestamps == sorted(set(created_timestamps))
+
+    processed = []
+    while capture := Capture.get_next_capture(reserve=True):
+        processed.append(capture.url)
+
+    assert processed == [item["url"] for item in captures]
+
+
+@patch("scoop_rest_api.views.captures.start_capture_process")
+def test_captures_batch_post_routing(
+    start_capture_process, app, client, access_key, default_capture_url, monkeypatch
+):
+    """[POST] /captures/batch kicks off capture tasks for each class of captures, if routed."""
+    from scoop_rest_api.models import Capture
+
+    monkeypatch.setitem(app.config, "CAPTURE_ROUTING_ENABLED", True)
+    monkeypatch.setitem(app.config, "CAPTURE_HEAVY_WORKER_SLOTS", 1)
+
+    captures = [{"url": default_capture_url}, {"url": default_capture_url, "profile": "media"}] * 2
+
+    response = client.post(
+        "/captures/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"captures": captures},
+    )
+
+    assert response.status_code == 200
+    assert [
+        Capture.get_by_id(item["id_capture"]).capture_class for item in response.get_json()
+    ] == ["light", "heavy", "light", "heavy"]
+
+    kwargs = sorted(
+        call.kwargs["capture_class"] for call in start_capture_process.delay.call_args_list
+    )
+    assert kwargs == ["heavy", "light", "light"]
+
+
+@patch("scoop_rest_api.views.captures.start_capture_process")
+def test_captures_batch_post_domain_stats(start_capture_process, app, client, access_key):
+    """[POST] /captures/batch looks up the statistics of the domains of every item at once."""
+    from scoop_rest_api.models import Capture, DomainStats
+    from scoop_rest_api.utils import get_heavy_domains
+
+    DomainStats.create(
+        domain="example.com",
+        updated_timestamp=datetime.datetime.now(datetime.UTC),
+        p90_duration=app.config["CAPTURE_HEAVY_DURATION"],
+    )
+
+    captures = [
+        {"url": "https://example.com/foo"},
+        {"url": "https://example.org"},
+        {"url": "https://example.com/bar"},
+    ]
+
+    with patch(
+        "scoop_rest_api.views.captures.get_heavy_domains",
+        wraps=get_heavy_domains,
+    ) as spy, patch("scoop_rest_api.utils.capture_classifier.get_heavy_domains") as per_item:
+        response = client.post(
+            "/captures/batch",
+            headers={"Access-Key": access_key["readable"]},
+            json={"captures": captures},
+        )
+
+    assert response.status_code == 200
+    assert spy.call_count == 1
+    assert not per_item.called
+    assert [
+        Capture.get_by_id(item["id_capture"]).capture_class for item in response.get_json()
+    ] == ["heavy", "light", "heavy"]
+
+
+def test_captures_status_post_invalid_input(client, access_key):
+    """[POST] /captures/status returns HTTP 400 if ids or updated_since are invalid."""
+    for input in [
+        {},
+        {"ids": "foo"},
+        {"ids": ["foo"]},
+        {"ids": [str(uuid.uuid4())], "updated_since": "foo"},
+        {"ids": [str(uuid.uuid4())] * (current_app.config["CAPTURE_STATUS_MAX_SIZE"] + 1)},
+    ]:
+        response = client.post(
+            "/captures/status", headers={"Access-Key": access_key["readable"]}, json=input
+        )
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+
+@patch("scoop_rest_api.views.captures.start_capture_process")
+def test_captures_status_post(start_capture_process, client, access_key, default_capture_url):
+    """
+    [POST] /captures/status returns information about captures owned by the caller,
+    optionally filtered by "updated_since".
+    """
+    from scoop_rest_api.models import AccessKey, Capture
+
+    response = client.post(
+        "/captures/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"captures": [{"url": default_capture_url}] * 3},
+    )
+    ids = [item["id_capture"] for item in response.get_json()]
+
+    # Capture owned by another access key
+    other_access_key = AccessKey.create(label="Other", key_digest="foo")
+    other_capture = Capture.create(url=default_capture_url, id_access_key=other_access_key)
+
+    # All captures
+    response = client.post(
+        "/captures/status",
+        headers={"Access-Key": access_key["readable"]},
+        json={"ids": ids + [str(other_capture.id_capture), str(uuid.uuid4())]},
+    )
+    response_data = response.get_json()
+
+    assert response.status_code == 200
+    assert sorted(item["id_capture"] for item in response_data["captures"]) == sorted(ids)
+    assert response_data["timestamp"]
+
+    # Captures updated since then
+    updated_since = response_data["timestamp"]
+    Capture.update(status="failed", ended_timestamp=datetime.datetime.now(datetime.UTC)).where(
+        Capture.id_capture == ids[0]
+    ).execute()
+    Capture.update(created_timestamp=datetime.datetime(2020, 1, 1, tzinfo=datetime.UTC)).where(
+        Capture.id_capture.in_(ids)
+    ).execute()
+
+    response = client.post(
+        "/captures/status",
+        headers={"Access-Key": access_key["readable"]},
+        json={"ids": ids, "updated_since": updated_since},
+    )
+    response_data = response.get_json()
+
+    assert response.status_code == 200
+    assert [item["id_capture"] for item in response_data["captures"]] == [ids[0]]
+    assert response_data["captures"][0]["status"] == "failed"
+
+
+@patch("scoop_rest_api.views.capture.start_capture_process")
+def test_captures_events_get(
+    start_capture_process, app, client, access_key, default_capture_url, monkeypatch
+):
+    """
+    [GET] /captures/events streams status changes of the captures owned by the caller,
+    and sends heartbeats in between.
+    """
+    from scoop_rest_api.models import AccessKey, Capture
+
+    monkeypatch.setitem(current_app.config, "SSE_HEARTBEAT_INTERVAL", 0.5)
+    monkeypatch.setitem(current_app.config, "SSE_MAX_DURATION", 2)
+
+    response = client.post(
+        "/capture",
+        headers={"Access-Key": access_key["readable"]},
+        json={"url": default_capture_url},
+    )
+    id_capture = response.get_json()["id_capture"]
+
+    other_access_key = AccessKey.create(label="Other", key_digest="foo")
+    other_capture = Capture.create(url=default_capture_url, id_access_key=other_access_key)
+
+    def update_captures():
+        time.sleep(0.75)
+        with app.app_context():
+            Capture.update(status="started").where(
+                Capture.id_capture.in_([id_capture, other_capture.id_capture])
+            ).execute()
+
+    thread = threading.Thread(target=update_captures)
+    thread.start()
+
+    response = client.get("/captures/events", headers={"Access-Key": access_key["readable"]})
+    body = response.get_data(as_text=True)
+    thread.join()
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert ": heartbeat" in body
+
+    events = [chunk for chunk in body.split("\n\n") if chunk.startswith("event: status")]
+    assert len(events) == 1
+
+    data = json.loads(events[0].split("data: ", 1)[1])
+    assert data["id_capture"] == id_capture
+    assert data["status"] == "started"
+
+
+def test_captures_get_invalid_input(client, access_key):
+    """[GET] /captures returns HTTP 400 if any filter is invalid."""
+    for query_string in [
+        {"status": "foo"},
+        {"created_after": "foo"},
+        {"limit": 0},
+        {"limit": current_app.config["CAPTURE_LIST_MAX_PAGE_SIZE"] + 1},
+        {"cursor": "foo"},
+    ]:
+        response = client.get(
+            "/captures", headers={"Access-Key": access_key["readable"]}, query_string=query_string
+        )
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+
+@patch("scoop_rest_api.views.captures.start_capture_process")
+def test_captures_get(start_capture_process, client, access_key, default_capture_url):
+    """[GET] /captures lists captures owned by the caller, newest first, page by page."""
+    from scoop_rest_api.models import AccessKey, Capture
+
+    response = client.post(
+        "/captures/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"captures": [{"url": f"{default_capture_url}?page={i}"} for i in range(0, 5)]},
+    )
+    ids = [item["id_capture"] for item in response.get_json()]
+
+    # Spread creation dates, and make one capture fail
+    for i, id_capture in enumerate(ids):
+        Capture.update(
+            created_timestamp=datetime.datetime(2024, 1, 1 + i, tzinfo=datetime.UTC)
+        ).where(Capture.id_capture == id_capture).execute()
+
+    Capture.update(status="failed").where(Capture.id_capture == ids[0]).execute()
+
+    # Capture owned by another access key
+    other_access_key = AccessKey.create(label="Other", key_digest="foo")
+    Capture.create(url=default_capture_url, id_access_key=other_access_key)
+
+    # Paginate
+    listed = []
+    cursor = None
+
+    for i in range(0, 3):
+        query_string = {"limit": 2}
+        if cursor:
+            query_string["cursor"] = cursor
+
+        response = client.get(
+            "/captures", headers={"Access-Key": access_key["readable"]}, query_string=query_string
+        )
+        response_data = response.get_json()
+
+        assert response.status_code == 200
+        listed.extend(item["id_capture"] for item in response_data["captures"])
+        cursor = response_data["next_cursor"]
+
+    assert listed == list(reversed(ids))
+    assert cursor is None
+
+    # Filter by status and creation date
+    for query_string, expected in [
+        ({"status": "failed"}, [ids[0]]),
+        ({"status": "pending,started"}, list(reversed(ids[1:]))),
+        ({"created_after": "2024-01-04T00:00:00"}, [ids[4], ids[3]]),
+        ({"created_before": "Wed, 03 Jan 2024 00:00:00 GMT"}, [ids[1], ids[0]]),
+    ]:
+        response = client.get(
+            "/captures", headers={"Access-Key": access_key["readable"]}, query_string=query_string
+        )
+
+        assert response.status_code == 200
+        assert [item["id_capture"] for item in response.get_json()["captures"]] == expected
@@ -2,6 +2,12 @@
 Test suite for "views.validate"
 """
 
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import current_app
 from requests import TooManyRedirects
 
 
@@ -197,3 +203,178 @@ def test_validate_post_valid_but_tricky_url(client, access_key, monkeypatch, moc
     assert response.status_code == 200
     data = response.get_json()
     assert data["valid"]
+
+
+def test_validate_batch_post_invalid_input(client, access_key):
+    """[POST] /validate/batch returns HTTP 400 if no list of URLs, or too many URLs, are provided."""
+    headers = {"Access-Key": access_key["readable"]}
+    max_size = current_app.config["VALIDATION_BATCH_MAX_SIZE"]
+
+    for input in [{}, {"urls": []}, {"urls": "http://example.com"}]:
+        response = client.post("/validate/batch", headers=headers, json=input)
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+    response = client.post(
+        "/validate/batch",
+        headers=headers,
+        json={"urls": ["http://example.com"] * (max_size + 1)},
+    )
+    assert response.status_code == 400
+
+
+def test_validate_batch_post(client, access_key, monkeypatch, mock_response_factory):
+    """[POST] /validate/batch returns validation results for each URL, in order."""
+    resp = mock_response_factory()
+    monkeypatch.setattr(
+        "scoop_rest_api.views.validate.resolve_ip",
+        lambda url: None if "unresolvable" in url else "1.1.1.1",
+    )
+    monkeypatch.setattr("scoop_rest_api.views.validate.get_response", lambda *args, **kwargs: resp)
+
+    urls = ["http://example.com", "foo-bar-baz", "http://unresolvable.example.com", 42]
+
+    response = client.post(
+        "/validate/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"urls": urls},
+    )
+    assert response.status_code == 200
+
+    data = response.get_json()
+    assert [result["url"] for result in data] == urls
+    assert data[0]["valid"]
+    assert data[0]["content_length"] == int(resp.headers["Content-Length"])
+    assert data[1] == {"url": "foo-bar-baz", "valid": False, "message": "Not a valid URL."}
+    assert data[2]["message"] == "Couldn't resolve domain."
+    assert data[3]["message"] == "Not a valid URL."
+
+
+def test_validate_batch_post_ndjson(client, access_key, monkeypatch, mock_response_factory):
+    """[POST] /validate/batch streams results as NDJSON if requested, observing per-host limits."""
+    resp = mock_response_factory()
+    lock = threading.Lock()
+    in_flight = {}
+    max_in_flight = {}
+
+    def get_response(url):
+        host = urlparse(url).hostname
+
+        with lock:
+            in_flight[host] = in_flight.get(host, 0) + 1
+            max_in_flight[host] = max(max_in_flight.get(host, 0), in_flight[host])
+
+        time.sleep(0.05)
+
+        with lock:
+            in_flight[host] -= 1
+
+        return resp
+
+    monkeypatch.setattr(
+        "scoop_rest_api.views.validate.resolve_ip", lambda *args, **kwargs: "1.1.1.1"
+    )
+    monkeypatch.setattr("scoop_rest_api.views.validate.get_response", get_response)
+    monkeypatch.setitem(current_app.config, "VALIDATION_BATCH_PER_HOST", 2)
+
+    urls = [f"http://a.example.com/{i}" for i in range(0, 10)]
+    urls += [f"http://b.example.com/{i}" for i in range(0, 10)]
+
+    response = client.post(
+        "/validate/batch",
+        headers={"Access-Key": access_key["readable"], "Accept": "application/x-ndjson"},
+        json={"urls": urls},
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(0, len(urls)))
+    assert all(line["valid"] and line["url"] == urls[line["index"]] for line in lines)
+    assert max_in_flight == {"a.example.com": 2, "b.example.com": 2}
+
+
+def test_validate_post_cached(client, access_key, monkeypatch, mock_response_factory):
+    """
+    [POST] /validate caches results by normalized URL,
+    for VALIDATION_CACHE_TTL or VALIDATION_CACHE_INVALID_TTL seconds.
+    """
+    resp = mock_response_factory()
+    calls = []
+
+    def get_response(url):
+        calls.append(url)
+        return None if "down" in url else resp
+
+    monkeypatch.setattr(
+        "scoop_rest_api.views.validate.resolve_ip", lambda *args, **kwargs: "1.1.1.1"
+    )
+    monkeypatch.setattr("scoop_rest_api.views.validate.get_response", get_response)
+
+    def validate(url):
+        response = client.post(
+            "/validate",
+            headers={"Access-Key": access_key["readable"]},
+            json={"url": url},
+        )
+        return response.get_json()
+
+    # Valid results
+    assert validate("http://example.com")["valid"]
+    assert validate("HTTP://Example.com:80/#fragment")["valid"]
+    assert validate("http://example.com/?page=2")["valid"]
+    assert len(calls) == 2
+
+    # Invalid results
+    monkeypatch.setitem(current_app.config, "VALIDATION_CACHE_INVALID_TTL", 0)
+
+    for i in range(0, 2):
+        assert validate("http://down.example.com")["message"] == "Couldn't load URL."
+
+    assert len(calls) == 4
+
+    stats = current_app.extensions["validation_cache"].get_stats()
+    assert stats["entries"] == 2
+
+
+def test_validate_batch_post_busy_host(client, access_key, monkeypatch, mock_response_factory):
+    """[POST] /validate/batch does not hold up URLs of other hosts while a host is busy."""
+    resp = mock_response_factory()
+    lock = threading.Lock()
+    in_flight = []
+    overlaps = []
+
+    def get_response(url):
+        host = urlparse(url).hostname
+
+        with lock:
+            in_flight.append(host)
+            overlaps.append(set(in_flight))
+
+        time.sleep(0.05)
+
+        with lock:
+            in_flight.remove(host)
+
+        return resp
+
+    monkeypatch.setattr(
+        "scoop_rest_api.views.validate.resolve_ip", lambda *args, **kwargs: "1.1.1.1"
+    )
+    monkeypatch.setattr("scoop_rest_api.views.validate.get_response", get_response)
+    monkeypatch.setitem(current_app.config, "VALIDATION_BATCH_CONCURRENCY", 2)
+    monkeypatch.setitem(current_app.config, "VALIDATION_BATCH_PER_HOST", 1)
+
+    urls = [f"http://a.example.com/{i}" for i in range(0, 4)] + ["http://b.example.com"]
+
+    response = client.post(
+        "/validate/batch",
+        headers={"Access-Key": access_key["readable"]},
+        json={"urls": urls},
+    )
+    assert response.status_code == 200
+    assert all(result["valid"] for result in response.get_json())
+
+    # b.example.com is validated alongside the first URL of a.example.com
+    assert {"a.example.com", "b.example.com"} in overlaps[0:2]
+    assert max(len(overlap) for overlap in overlaps) == 2
@@ -3,15 +3,45 @@
 """
 
 from scoop_rest_api.utils.access_check import access_check
+from scoop_rest_api.utils.byte_lru_cache import ByteLRUCache
+from scoop_rest_api.utils.callback_sessions import get_callback_session
+from scoop_rest_api.utils.capture_events import (
+    create_capture_events_trigger,
+    stream_capture_events,
+)
+from scoop_rest_api.utils.capture_classifier import (
+    CAPTURE_CLASSES,
+    classify_capture,
+    get_heavy_domains,
+)
 from scoop_rest_api.utils.capture_to_dict import capture_to_dict
+from scoop_rest_api.utils.capture_workspace import CaptureWorkspace, reclaim_orphaned_workspaces
 from scoop_rest_api.utils.check_proxy_port import check_proxy_port
 from scoop_rest_api.utils.config_check import config_check
+from scoop_rest_api.utils.display_pool import get_display
+from scoop_rest_api.utils.dns_resolver import CachingResolver, get_resolver
+from scoop_rest_api.utils.domain_policy import DomainPolicy
+from scoop_rest_api.utils.etags import get_artifact_etag, get_capture_etag
 from scoop_rest_api.utils.get_custom_agents import get_custom_agents
 from scoop_rest_api.utils.get_db import get_db
-from scoop_rest_api.utils.scoop_runner import ScoopRunner
+from scoop_rest_api.utils.ip_range_index import IPRangeIndex
+from scoop_rest_api.utils.json_provider import FastJSONProvider
+from scoop_rest_api.utils.port_allocator import lease_proxy_port
+from scoop_rest_api.utils.process_tree import (
+    get_resource_limiter,
+    kill_process_tree,
+    reap_orphaned_process_groups,
+    register_process_group,
+    unregister_process_group,
+)
+from scoop_rest_api.utils.response_compression import compress_response
+from scoop_rest_api.utils.scoop_runner import ScoopRunner, get_scoop_options
+from scoop_rest_api.utils.ttl_cache import TTLCache
 from scoop_rest_api.utils.validation_helpers import (
     get_content_length,
     get_response,
+    get_validation_user_agent,
+    normalize_url,
     resolve_ip,
     validate_ip,
 )
@@ -0,0 +1,108 @@
+"""
+`utils.byte_lru_cache` module: Thread-safe, in-process LRU cache bounded by size in bytes.
+"""
+
+from collections import OrderedDict
+from collections.abc import Hashable
+import threading
+
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU cache for bytes, bounded by the total size of the values it holds.
+
+    - Values larger than `max_item_size` are not cached.
+    - Least recently used values are evicted once `max_size` is exceeded.
+    - A `max_size` of 0 disables the cache.
+
+    Keeps track of hits, misses and evictions (see `get_stats`).
+    """
+
+    def __init__(self, max_size: int, max_item_size: int):
+        self.max_size = int(max_size)
+        self.max_item_size = min(int(max_item_size), self.max_size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> bytes | None:
+        """Returns the value stored under `key`, if any, and marks it as recently used."""
+        with self._lock:
+            value = self._entries.get(key)
+
+            if value is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: bytes) -> bool:
+        """
+        Stores `value` under `key`, evicting least recently used values as needed.
+        Returns False if `value` is too large to be cached.
+        """
+        value = bytes(value)
+
+        if len(value) > self.max_item_size:
+            return False
+
+        with self._lock:
+            self._delete(key)
+            self._entries[key] = value
+            self.size += len(value)
+
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+        return True
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def delete_matching(self, prefix: Hashable) -> int:
+        """
+        Deletes every value stored under a tuple key starting with `prefix`.
+        Returns the number of values deleted.
+        """
+        with self._lock:
+            keys = [
+                key for key in self._entries if isinstance(key, tuple) and key and key[0] == prefix
+            ]
+            for key in keys:
+                self._delete(key)
+
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def get_stats(self) -> dict:
+        """Returns usage statistics for this cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _delete(self, key: Hashable) -> None:
+        """Deletes the value stored under `key`, if any. Lock must be held by caller."""
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
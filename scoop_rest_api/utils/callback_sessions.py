@@ -0,0 +1,51 @@
+"""
+`utils.callback_sessions` module: Pooled, keep-alive HTTP sessions for callback delivery.
+"""
+
+from collections import OrderedDict
+import threading
+from urllib.parse import urlparse
+
+from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+
+_sessions: OrderedDict[tuple[str, str], requests.Session] = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_callback_session(url: str) -> requests.Session:
+    """
+    Returns a `requests.Session` dedicated to the host of a given callback URL.
+
+    Sessions are kept across deliveries, so that connections to hosts receiving many callbacks
+    are reused rather than re-established for every delivery.
+
+    Up to CALLBACK_SESSIONS_MAX sessions are kept per process: the least recently used one is
+    closed to make room for new hosts. Requests it is still sending complete nonetheless.
+    """
+    parsed = urlparse(url)
+    key = (parsed.scheme, parsed.netloc)
+    evicted = []
+
+    with _sessions_lock:
+        if key in _sessions:
+            _sessions.move_to_end(key)
+            return _sessions[key]
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=int(current_app.config["CALLBACK_POOL_MAXSIZE"]),
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sessions[key] = session
+
+        while len(_sessions) > max(int(current_app.config["CALLBACK_SESSIONS_MAX"]), 1):
+            evicted.append(_sessions.popitem(last=False)[1])
+
+    for evicted_session in evicted:
+        evicted_session.close()
+
+    return session
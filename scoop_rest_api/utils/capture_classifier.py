@@ -0,0 +1,95 @@
+"""
+`utils.capture_classifier` module: Sorts capture requests into "light" and "heavy" captures.
+"""
+
+from urllib.parse import urlparse
+
+from flask import current_app
+
+from scoop_rest_api.utils.scoop_runner import get_scoop_options
+from scoop_rest_api.utils.validation_helpers import get_validation_user_agent, normalize_url
+
+CAPTURE_CLASSES = ["light", "heavy"]
+""" Classes of captures. Heavy captures can be routed to a separate queue (see CAPTURE_ROUTING_ENABLED). """  # noqa
+
+
+def get_heavy_domains(urls: list) -> set[str]:
+    """
+    Returns which of the domains of a list of URLs had past captures that produced archives of
+    CAPTURE_HEAVY_ARCHIVE_SIZE bytes on average, or took CAPTURE_HEAVY_DURATION seconds or more
+    (90th percentile), as per models.DomainStats.
+
+    Uses a single query, so that batches of capture requests can be classified at once
+    (see `classify_capture`).
+    """
+    from scoop_rest_api.models import DomainStats
+
+    domains = {DomainStats.get_domain(url) for url in urls if isinstance(url, str)}
+    domains.discard(None)
+
+    if not domains:
+        return set()
+
+    return {
+        stats.domain
+        for stats in DomainStats.select(DomainStats.domain).where(
+            DomainStats.domain.in_(list(domains)),
+            (DomainStats.mean_archive_size >= current_app.config["CAPTURE_HEAVY_ARCHIVE_SIZE"])
+            | (DomainStats.p90_duration >= current_app.config["CAPTURE_HEAVY_DURATION"]),
+        )
+    }
+
+
+def classify_capture(
+    url: str,
+    options: dict | None = None,
+    heavy_domains: set[str] | None = None,
+) -> str:
+    """
+    Guesses, at submission time, whether a capture will be "light" or "heavy".
+
+    A capture is considered heavy if:
+    - Its target domain is allowed to capture videos as attachments (see VIDEO_ATTACHMENT_DOMAINS),
+      and its capture profile does not prevent it from doing so.
+    - Its capture profile is listed in CAPTURE_HEAVY_PROFILES.
+    - Its URL was recently validated, and reported a content length of at least
+      CAPTURE_HEAVY_CONTENT_LENGTH bytes (see views.validate).
+      This is a best-effort hint: validation results are only cached by the process that
+      handled the validation request.
+    - Past captures of its domain were large or slow (see `get_heavy_domains`).
+      Callers classifying several captures may provide the result of `get_heavy_domains`
+      for all of them via `heavy_domains`.
+    """
+    try:
+        domain = urlparse(url).hostname if isinstance(url, str) else None
+    except ValueError:
+        domain = None
+
+    domain_settings = current_app.extensions["domain_policy"].match(domain)
+    scoop_options, profile_name = get_scoop_options(domain_settings, options)
+
+    if domain_settings.get("video_attachments") and (
+        str(scoop_options.get("--capture-video-as-attachment")).lower() == "true"
+    ):
+        return "heavy"
+
+    if profile_name and profile_name in current_app.config["CAPTURE_HEAVY_PROFILES"]:
+        return "heavy"
+
+    if domain and (normalized_url := normalize_url(url)):
+        validation = current_app.extensions["validation_cache"].get(
+            (normalized_url, get_validation_user_agent(url))
+        )
+        content_length = (validation or {}).get("content_length") or 0
+
+        if content_length >= current_app.config["CAPTURE_HEAVY_CONTENT_LENGTH"]:
+            return "heavy"
+
+    if domain:
+        if heavy_domains is None:
+            heavy_domains = get_heavy_domains([url])
+
+        if domain.rstrip(".") in heavy_domains:
+            return "heavy"
+
+    return "light"
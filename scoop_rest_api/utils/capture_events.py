@@ -0,0 +1,149 @@
+"""
+`utils.capture_events` module: Push notifications of capture status changes, via Postgres LISTEN/NOTIFY.
+
+A trigger on the "capture" table notifies CAPTURE_EVENTS_CHANNEL whenever a capture is created,
+or its status or timestamps change. Listeners receive a small JSON payload
+(id_capture, id_access_key, status), which they can filter on before querying anything.
+"""
+
+from contextlib import contextmanager
+import json
+import select
+import time
+from typing import Iterator
+
+from flask import current_app
+
+from scoop_rest_api.utils.capture_to_dict import capture_to_dict
+from scoop_rest_api.utils.get_db import get_db
+
+CAPTURE_EVENTS_CHANNEL = "capture_events"
+
+CAPTURE_EVENTS_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_capture_event() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.status IS NOT DISTINCT FROM NEW.status
+        AND OLD.started_timestamp IS NOT DISTINCT FROM NEW.started_timestamp
+        AND OLD.ended_timestamp IS NOT DISTINCT FROM NEW.ended_timestamp
+    THEN
+        RETURN NEW;
+    END IF;
+
+    PERFORM pg_notify(
+        '{CAPTURE_EVENTS_CHANNEL}',
+        json_build_object(
+            'id_capture', NEW.id_capture,
+            'id_access_key', NEW.id_access_key_id,
+            'status', NEW.status
+        )::text
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS capture_events ON capture;
+
+CREATE TRIGGER capture_events
+AFTER INSERT OR UPDATE ON capture
+FOR EACH ROW EXECUTE FUNCTION notify_capture_event();
+"""
+
+
+def create_capture_events_trigger(db) -> None:
+    """Creates or replaces the trigger notifying CAPTURE_EVENTS_CHANNEL of capture changes."""
+    with db.atomic():
+        db.execute_sql(CAPTURE_EVENTS_TRIGGER_SQL)
+
+
+@contextmanager
+def listen_to_capture_events():
+    """
+    Opens a dedicated database connection listening to CAPTURE_EVENTS_CHANNEL.
+    Yields the underlying psycopg2 connection, which is closed on exit.
+    """
+    db = get_db()
+    db.connect()
+
+    try:
+        connection = db.connection()
+        connection.autocommit = True
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CAPTURE_EVENTS_CHANNEL}")
+
+        yield connection
+    finally:
+        db.close()
+
+
+def format_server_sent_event(event: str, data: dict) -> str:
+    """Formats a JSON-serializable dictionary as a server-sent event."""
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+def stream_capture_events(id_access_key: int, id_capture: str | None = None) -> Iterator[str]:
+    """
+    Generator yielding status changes of the captures associated with a given access key,
+    as server-sent events containing user-facing capture information.
+
+    If `id_capture` is provided:
+    - Only changes to that capture are streamed.
+    - The current state of the capture is sent first.
+    - The stream ends once the capture reaches a terminal status.
+
+    A heartbeat comment is sent every SSE_HEARTBEAT_INTERVAL seconds without events.
+    The stream ends after SSE_MAX_DURATION seconds: clients are expected to reconnect.
+    """
+    from ..models import Capture
+
+    heartbeat_interval = float(current_app.config["SSE_HEARTBEAT_INTERVAL"])
+    deadline = time.monotonic() + float(current_app.config["SSE_MAX_DURATION"])
+
+    def get_capture(id_capture: str):
+        return (
+            Capture.select_without_artifacts()
+            .where(Capture.id_capture == id_capture, Capture.id_access_key == id_access_key)
+            .get_or_none()
+        )
+
+    # Listen before sending the current state, so that no change can be missed in between
+    with listen_to_capture_events() as connection:
+        if id_capture:
+            capture = get_capture(id_capture)
+
+            if capture is None:
+                return
+
+            yield format_server_sent_event("status", capture_to_dict(capture))
+
+            if capture.is_terminal:
+                return
+
+        while (remaining := deadline - time.monotonic()) > 0:
+            readable, _, _ = select.select([connection], [], [], min(heartbeat_interval, remaining))
+
+            if not readable:
+                yield ": heartbeat\n\n"
+                continue
+
+            connection.poll()
+
+            while connection.notifies:
+                payload = json.loads(connection.notifies.pop(0).payload)
+
+                if payload["id_access_key"] != id_access_key:
+                    continue
+
+                if id_capture and payload["id_capture"] != str(id_capture):
+                    continue
+
+                capture = get_capture(payload["id_capture"])
+
+                if capture is None:
+                    continue
+
+                yield format_server_sent_event("status", capture_to_dict(capture))
+
+                if id_capture and capture.is_terminal:
+                    return
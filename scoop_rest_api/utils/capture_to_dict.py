@@ -48,6 +48,12 @@ def capture_to_dict(capture) -> dict:
                 f"https://replayweb.page/?source={to_return['artifacts'][0]}"
             )
 
+    #
+    # Properties specific to status "failed"
+    #
+    if capture.status == "failed":
+        to_return["failed_reason"] = capture.failed_reason
+
     #
     # Expose logs?
     #
@@ -0,0 +1,140 @@
+"""
+`utils.capture_workspace` module: Temporary folders in which Scoop writes the output of a capture.
+
+Workspaces are created under CAPTURE_WORKSPACE_PATH, which may point to a tmpfs mount
+(i.e: /dev/shm/scoop-rest-api) so that capture I/O never hits the disk.
+
+Each workspace records the process that created it, so that workspaces left behind
+by a worker that crashed or was killed mid-capture can be found and reclaimed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+import shutil
+import time
+from tempfile import mkdtemp
+
+from flask import current_app
+
+from scoop_rest_api.utils.process_tree import (
+    get_boot_id,
+    get_process_start_time,
+    is_process_alive,
+)
+
+OWNER_FILENAME = ".owner"
+
+
+class CaptureWorkspace:
+    """Temporary folder in which Scoop writes the output of a capture."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @staticmethod
+    def get_root() -> Path:
+        """Returns the folder workspaces are created in, creating it if needed."""
+        root = Path(current_app.config["CAPTURE_WORKSPACE_PATH"])
+        root.mkdir(parents=True, exist_ok=True)
+        return root
+
+    @classmethod
+    def create(cls) -> CaptureWorkspace:
+        """
+        Creates a new workspace, owned by the current process.
+        The owner is identified by pid and start time, along with the current boot id,
+        so that it is never mistaken for a process that reused its pid.
+
+        Throws if CAPTURE_WORKSPACE_QUOTA is set and the workspace's filesystem does not
+        have that much free space left.
+        """
+        root = cls.get_root()
+        quota = current_app.config["CAPTURE_WORKSPACE_QUOTA"]
+
+        if quota and shutil.disk_usage(root).free < quota:
+            raise Exception(f"Less than {quota} bytes available in {root}")
+
+        workspace = cls(Path(mkdtemp(prefix="capture-", dir=root)))
+        (workspace.path / OWNER_FILENAME).write_text(
+            json.dumps(
+                {
+                    "boot_id": get_boot_id(),
+                    "owner_pid": os.getpid(),
+                    "owner_start_time": get_process_start_time(os.getpid()),
+                }
+            )
+        )
+        return workspace
+
+    def get_usage(self) -> int:
+        """Returns the total size of the files in this workspace, in bytes."""
+        total = 0
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def is_over_quota(self) -> bool:
+        """Returns True if this workspace uses more than CAPTURE_WORKSPACE_QUOTA bytes."""
+        quota = current_app.config["CAPTURE_WORKSPACE_QUOTA"]
+        return bool(quota) and self.get_usage() > quota
+
+    def is_orphaned(self) -> bool:
+        """
+        Returns True if the process that created this workspace is no longer running,
+        or if the workspace does not say which process created it.
+
+        Start times are not available on every platform (see utils.get_process_start_time):
+        if none was recorded, the owner is only identified by its pid.
+        """
+        try:
+            owner = json.loads((self.path / OWNER_FILENAME).read_text())
+            owner_pid = int(owner["owner_pid"])
+        except (ValueError, TypeError, KeyError, OSError):
+            return True
+
+        if owner.get("boot_id") != get_boot_id():
+            return True
+
+        if owner.get("owner_start_time") is not None:
+            return get_process_start_time(owner_pid) != owner["owner_start_time"]
+
+        return not is_process_alive(owner_pid)
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def reclaim_orphaned_workspaces() -> int:
+    """
+    Deletes workspaces whose owner is no longer running, as well as workspaces older than
+    TEMPORARY_STORAGE_EXPIRATION seconds.
+
+    Returns the number of workspaces that were deleted.
+    """
+    expiration = int(current_app.config["TEMPORARY_STORAGE_EXPIRATION"])
+    reclaimed = 0
+
+    for path in CaptureWorkspace.get_root().iterdir():
+        if not path.is_dir():
+            continue
+
+        workspace = CaptureWorkspace(path)
+
+        try:
+            expired = time.time() - path.stat().st_mtime >= expiration
+        except OSError:
+            continue
+
+        if expired or workspace.is_orphaned():
+            current_app.logger.info(f"Reclaiming capture workspace {path}")
+            workspace.remove()
+            reclaimed += 1
+
+    return reclaimed
@@ -2,16 +2,24 @@
 `utils.check_proxy_port` module: Checks whether a proxy port is available.
 """
 
-import requests
+import errno
+import socket
 
 
 def check_proxy_port(proxy_port: int) -> bool:
-    """Check whether the specified proxy port is available."""
-    proxy_port_is_available = False
-    try:
-        requests.head(f"http://localhost:{proxy_port}", timeout=1)
-    except requests.exceptions.ReadTimeout:
-        return False
-    except Exception:
-        proxy_port_is_available = True
-    return proxy_port_is_available
+    """
+    Check whether the specified proxy port is available, by trying to bind to it on the loopback
+    interfaces Scoop's proxy may listen on.
+    """
+    for family, host in [(socket.AF_INET, "127.0.0.1"), (socket.AF_INET6, "::1")]:
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                # Ignore connections lingering in TIME_WAIT, as Scoop's proxy would
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind((host, proxy_port))
+        except OSError as err:
+            if err.errno == errno.EADDRINUSE:
+                return False
+            # Other errors (i.e: IPv6 not being available) are not a sign that the port is in use
+
+    return True
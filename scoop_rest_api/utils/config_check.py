@@ -21,6 +21,25 @@ EXCLUDED_SCOOP_CLI_OPTIONS = [
 ]
 """ List of Scoop CLI options which cannot be set at config level. """
 
+PROFILE_SCOOP_CLI_OPTIONS = [
+    "--screenshot",
+    "--pdf-snapshot",
+    "--dom-snapshot",
+    "--capture-video-as-attachment",
+    "--capture-certificates-as-attachment",
+    "--provenance-summary",
+    "--auto-scroll",
+    "--auto-play-media",
+    "--grab-secondary-resources",
+    "--run-site-specific-behaviors",
+    "--load-timeout",
+    "--network-idle-timeout",
+    "--behaviors-timeout",
+    "--capture-video-as-attachment-timeout",
+    "--capture-certificates-as-attachment-timeout",
+]
+""" List of Scoop CLI options which capture profiles (SCOOP_CAPTURE_PROFILES) can override. """
+
 
 def config_check() -> bool:
     """
@@ -49,6 +68,30 @@ def config_check() -> bool:
         if key.lower() in EXCLUDED_SCOOP_CLI_OPTIONS:
             raise Exception(f"Scoop CLI option {key} cannot be set at config level.")
 
+    # Check SCOOP_CAPTURE_PROFILES and SCOOP_DOMAIN_PROFILES
+    for prop in ["SCOOP_CAPTURE_PROFILES", "SCOOP_DOMAIN_PROFILES"]:
+        if prop not in config or not isinstance(config[prop], dict):
+            raise Exception(f"config object must contain a {prop} dictionary.")
+
+    for name, profile in config["SCOOP_CAPTURE_PROFILES"].items():
+        if not isinstance(profile, dict):
+            raise Exception(f"Capture profile {name} should be a dictionary.")
+
+        for key in profile:
+            if key.lower() in EXCLUDED_SCOOP_CLI_OPTIONS:
+                raise Exception(f"Scoop CLI option {key} cannot be set at config level.")
+
+            if key.lower() not in PROFILE_SCOOP_CLI_OPTIONS:
+                raise Exception(f"Scoop CLI option {key} cannot be set by a capture profile.")
+
+    for domain, name in config["SCOOP_DOMAIN_PROFILES"].items():
+        if name not in config["SCOOP_CAPTURE_PROFILES"]:
+            raise Exception(f"Capture profile {name} (used for {domain}) does not exist.")
+
+    # Check CAPTURE_SCHEDULING_POLICY
+    if config.get("CAPTURE_SCHEDULING_POLICY") not in ["fifo", "sjf"]:
+        raise Exception('CAPTURE_SCHEDULING_POLICY must be either "fifo" or "sjf".')
+
     # Misc (just check presence)
     for prop in [
         "DATABASE_USERNAME",
@@ -57,11 +100,69 @@ def config_check() -> bool:
         "DATABASE_PORT",
         "DATABASE_NAME",
         "MAX_PENDING_CAPTURES",
+        "CAPTURE_BATCH_MAX_SIZE",
+        "CAPTURE_STATUS_MAX_SIZE",
+        "CAPTURE_LIST_PAGE_SIZE",
+        "CAPTURE_LIST_MAX_PAGE_SIZE",
+        "CAPTURE_WORKER_SLOTS",
+        "CAPTURE_ROUTING_ENABLED",
+        "CAPTURE_HEAVY_WORKER_SLOTS",
+        "CAPTURE_HEAVY_CONTENT_LENGTH",
+        "CAPTURE_HEAVY_PROFILES",
+        "CAPTURE_HEAVY_ARCHIVE_SIZE",
+        "CAPTURE_HEAVY_DURATION",
+        "CAPTURE_SCHEDULING_WINDOW",
+        "CAPTURE_SCHEDULING_AGING",
+        "CAPTURE_SCHEDULING_DEFAULT_DURATION",
+        "DOMAIN_STATS_WINDOW",
+        "CIRCUIT_BREAKER_THRESHOLD",
+        "CIRCUIT_BREAKER_WINDOW",
+        "CIRCUIT_BREAKER_COOLDOWN",
+        "SSE_HEARTBEAT_INTERVAL",
+        "SSE_MAX_DURATION",
         "EXPOSE_SCOOP_LOGS",
         "TEMPORARY_STORAGE_EXPIRATION",
+        "ARTIFACT_CACHE_SIZE",
+        "ARTIFACT_CACHE_MAX_ITEM_SIZE",
+        "COMPRESSION_MIN_SIZE",
+        "COMPRESSION_CACHE_SIZE",
+        "COMPRESSION_CACHE_MAX_ITEM_SIZE",
+        "CAPTURE_WORKSPACE_PATH",
+        "CAPTURE_WORKSPACE_QUOTA",
         "PROXY_PORT",
+        "PROXY_PORT_RANGE",
+        "PROXY_PORT_LEASE_PATH",
         "ACCESS_KEY_SALT",
         "SCOOP_TIMEOUT_FUSE",
+        "SCOOP_KILL_GRACE_PERIOD",
+        "SCOOP_MEMORY_LIMIT",
+        "SCOOP_CPU_TIME_LIMIT",
+        "SCOOP_PROCESS_REGISTRY_PATH",
+        "CANCEL_POLL_INTERVAL",
+        "XVFB_DISPLAY_POOL",
+        "XVFB_DISPLAY_BASE",
+        "XVFB_SCREEN",
+        "XVFB_STARTUP_TIMEOUT",
+        "CALLBACK_TIMEOUT",
+        "CALLBACK_MAX_ATTEMPTS",
+        "CALLBACK_RETRY_BACKOFF",
+        "CALLBACK_RETRY_BACKOFF_MAX",
+        "CALLBACK_POOL_MAXSIZE",
+        "CALLBACK_SESSIONS_MAX",
+        "CALLBACK_BATCH_WINDOW",
+        "CALLBACK_BATCH_MAX_SIZE",
+        "VALIDATION_MAX_CONNECTIONS",
+        "DNS_CACHE_TTL",
+        "DNS_CACHE_NEGATIVE_TTL",
+        "DNS_CACHE_MAX_ENTRIES",
+        "DNS_TIMEOUT",
+        "CAPTURE_PREFLIGHT_CHECK",
+        "VALIDATION_CACHE_TTL",
+        "VALIDATION_CACHE_INVALID_TTL",
+        "VALIDATION_CACHE_MAX_ENTRIES",
+        "VALIDATION_BATCH_MAX_SIZE",
+        "VALIDATION_BATCH_CONCURRENCY",
+        "VALIDATION_BATCH_PER_HOST",
     ]:
         if prop not in config:
             raise Exception(f"config object must define {prop}.")
@@ -0,0 +1,135 @@
+"""
+`utils.display_pool` module: Per-slot Xvfb displays for captures running in headful mode.
+
+Each capture slot gets its own display, so that concurrent browsers neither compete for nor
+draw on the same X server. Slots are identified by the proxy port they leased
+(see `utils.port_allocator`), which makes displays exclusive to a capture for its duration.
+
+Displays are started on first use, checked before every capture and restarted if unhealthy.
+They are kept running in between captures.
+"""
+
+import os
+from pathlib import Path
+import signal
+import socket
+import subprocess
+import time
+
+from flask import current_app
+
+X_LOCK_PATH = Path("/tmp")
+X_SOCKET_PATH = Path("/tmp/.X11-unix")
+
+
+def _get_lock_file(display_number: int) -> Path:
+    return X_LOCK_PATH / f".X{display_number}-lock"
+
+
+def _get_socket_file(display_number: int) -> Path:
+    return X_SOCKET_PATH / f"X{display_number}"
+
+
+def _get_server_pid(display_number: int) -> int | None:
+    """Returns the pid of the X server holding a given display, if any, as per its lock file."""
+    try:
+        return int(_get_lock_file(display_number).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def is_display_server(pid: int, display_number: int) -> bool:
+    """
+    Checks that a process is an Xvfb server for a given display, as per its command line.
+    Lock files may outlive their server, whose pid may since have been reused by another process.
+    """
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes().split(b"\0")
+    except OSError:
+        return False
+
+    return (
+        bool(cmdline)
+        and Path(cmdline[0].decode(errors="replace")).name == "Xvfb"
+        and f":{display_number}".encode() in cmdline
+    )
+
+
+def is_display_healthy(display_number: int) -> bool:
+    """Checks that the X server of a given display is running and accepts connections."""
+    if _get_server_pid(display_number) is None:
+        return False
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(1)
+            client.connect(str(_get_socket_file(display_number)))
+    except OSError:
+        return False
+
+    return True
+
+
+def start_display(display_number: int) -> None:
+    """
+    (Re)starts an Xvfb server for a given display, cleaning up after its predecessor if needed.
+    Raises an exception if the server does not accept connections within XVFB_STARTUP_TIMEOUT.
+    """
+    # Tear down previous server, if any and still running.
+    # Otherwise, its lock file is stale: it is removed, and whichever process now has its pid is spared.
+    pid = _get_server_pid(display_number)
+    if pid and is_display_server(pid, display_number):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    _get_lock_file(display_number).unlink(missing_ok=True)
+    _get_socket_file(display_number).unlink(missing_ok=True)
+
+    current_app.logger.info(f"Starting Xvfb on :{display_number}")
+
+    # Xvfb runs in its own session, so that it outlives the capture that started it
+    subprocess.Popen(
+        [
+            "Xvfb",
+            f":{display_number}",
+            "-screen",
+            "0",
+            current_app.config["XVFB_SCREEN"],
+            "-nolisten",
+            "tcp",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + float(current_app.config["XVFB_STARTUP_TIMEOUT"])
+    while not is_display_healthy(display_number):
+        if time.monotonic() >= deadline:
+            raise Exception(f"Xvfb did not start on :{display_number}")
+        time.sleep(0.1)
+
+
+def get_display(proxy_port: int) -> str | None:
+    """
+    Returns a healthy X display (i.e: ":101") dedicated to the capture slot that leased `proxy_port`,
+    starting or restarting its Xvfb server if needed.
+
+    Returns None if XVFB_DISPLAY_POOL is off, or if Scoop runs in headless mode.
+    """
+    if not current_app.config["XVFB_DISPLAY_POOL"]:
+        return None
+
+    # Scoop runs in headful mode by default
+    if str(current_app.config["SCOOP_CLI_OPTIONS"].get("--headless", "false")).lower() == "true":
+        return None
+
+    slot = proxy_port - int(current_app.config["PROXY_PORT"])
+    display_number = int(current_app.config["XVFB_DISPLAY_BASE"]) + slot
+
+    if not is_display_healthy(display_number):
+        start_display(display_number)
+
+    return f":{display_number}"
@@ -0,0 +1,174 @@
+"""
+`utils.dns_resolver` module: Caching DNS resolver, shared by URL validation and captures.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import os
+import socket
+import threading
+
+from scoop_rest_api.utils.ttl_cache import TTLCache
+
+FAMILIES = [socket.AF_INET, socket.AF_INET6]
+""" Address families looked up for each host: A and AAAA records. """
+
+NEGATIVE_ERRORS = [
+    getattr(socket, name)
+    for name in ["EAI_NONAME", "EAI_NODATA", "EAI_ADDRFAMILY"]
+    if hasattr(socket, name)
+]
+"""
+    `getaddrinfo` errors indicating that a host has no address (for a given family).
+    Other errors (i.e: EAI_AGAIN) are considered temporary, and are not cached.
+"""
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def getaddrinfo_lookup(host: str, family: int) -> list[str]:
+    """
+    Returns the addresses of `host` for a given address family, using the system's resolver.
+    Raises socket.gaierror if there are none.
+    """
+    infos = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class CachingResolver:
+    """
+    Resolves host names to IPv4 and IPv6 addresses, looked up concurrently.
+
+    - Results are cached for `ttl` seconds, or `negative_ttl` seconds if the host has no address.
+    - Lookups taking more than `timeout` seconds raise TimeoutError. They keep running in the
+      background, up to `max_workers` at once, and their result is cached once available.
+    - Concurrent lookups of the same host are merged.
+
+    `lookup(host, family) -> list[str]` can be replaced for testing purposes.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float,
+        timeout: float,
+        max_entries: int,
+        lookup: Callable[[str, int], list[str]] = getaddrinfo_lookup,
+        max_workers: int = 16,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.lookup = lookup
+        self.cache = TTLCache(max_entries)
+        self.negative_hits = 0
+        self.timeouts = 0
+        self.pid = os.getpid()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dns")
+
+    def resolve(self, host: str) -> list[str]:
+        """
+        Returns the addresses of `host`, IPv4 first. Returns an empty list if it has none.
+
+        Raises:
+        - TimeoutError if the lookup did not complete within `timeout` seconds.
+        - socket.gaierror if the lookup failed for another reason (i.e: temporary failure).
+        """
+        host = host.lower().rstrip(".")
+        addresses = self.cache.get(host)
+
+        if addresses is not None:
+            if not addresses:
+                with self._lock:
+                    self.negative_hits += 1
+            return list(addresses)
+
+        with self._lock:
+            future = self._in_flight.get(host)
+            is_new_lookup = future is None
+
+            if is_new_lookup:
+                future = Future()
+                self._in_flight[host] = future
+
+        if is_new_lookup:
+            self._start_lookup(host, future)
+
+        try:
+            return list(future.result(timeout=self.timeout))
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"DNS lookup for {host} timed out.")
+
+    def _start_lookup(self, host: str, combined: Future) -> None:
+        """
+        Looks up A and AAAA records of `host` concurrently.
+        Resolves `combined` to a tuple of addresses, and caches that result.
+        """
+        results = {}
+
+        def on_done(family: int, future: Future):
+            with self._lock:
+                results[family] = future.exception() or future.result()
+
+                if len(results) < len(FAMILIES):
+                    return
+
+                self._in_flight.pop(host, None)
+
+            addresses = tuple(
+                address
+                for family in FAMILIES
+                if not isinstance(results[family], BaseException)
+                for address in results[family]
+            )
+            errors = [result for result in results.values() if isinstance(result, BaseException)]
+
+            # Temporary failures are not cached
+            if not addresses and any(
+                not isinstance(error, socket.gaierror) or error.errno not in NEGATIVE_ERRORS
+                for error in errors
+            ):
+                combined.set_exception(errors[0])
+                return
+
+            self.cache.set(host, addresses, self.ttl if addresses else self.negative_ttl)
+            combined.set_result(addresses)
+
+        for family in FAMILIES:
+            future = self._executor.submit(self.lookup, host, family)
+            future.add_done_callback(lambda future, family=family: on_done(family, future))
+
+    def get_stats(self) -> dict:
+        """Returns usage statistics for this resolver and its cache."""
+        return {
+            **self.cache.get_stats(),
+            "negative_hits": self.negative_hits,
+            "timeouts": self.timeouts,
+        }
+
+
+def get_resolver() -> CachingResolver:
+    """
+    Returns the caching resolver of the current process, creating it if needed.
+    Processes forked from one that already created a resolver (i.e: Celery workers) get their own.
+    """
+    global _resolver
+
+    from flask import current_app  # noqa
+
+    with _resolver_lock:
+        if _resolver is None or _resolver.pid != os.getpid():
+            _resolver = CachingResolver(
+                ttl=current_app.config["DNS_CACHE_TTL"],
+                negative_ttl=current_app.config["DNS_CACHE_NEGATIVE_TTL"],
+                timeout=current_app.config["DNS_TIMEOUT"],
+                max_entries=current_app.config["DNS_CACHE_MAX_ENTRIES"],
+            )
+
+        return _resolver
@@ -0,0 +1,103 @@
+"""
+`utils.domain_policy` module: Per-domain settings, matched by domain name suffix.
+"""
+
+
+class DomainPolicyNode:
+    """Node of a DomainPolicy trie: one label of a domain name, read right to left."""
+
+    __slots__ = ["children", "attributes"]
+
+    def __init__(self):
+        self.children: dict[str, DomainPolicyNode] = {}
+        self.attributes: dict | None = None
+
+
+class DomainPolicy:
+    """
+    Maps domain names to settings ("attributes"), which apply to that domain and its subdomains.
+
+    Compiled once (see `from_config`) into a trie of reversed labels:
+    "www.fcc.gov" is stored as "gov" -> "fcc" -> "www".
+
+    - Matches are made on label boundaries: "fcc.gov" matches "www.fcc.gov", but not "notfcc.gov".
+    - Matching costs O(number of labels of the domain), regardless of the number of entries.
+    - Attributes of every matching entry are merged: the longest suffix wins, key by key.
+
+    Usage:
+    ```
+    policy = DomainPolicy()
+    policy.add("gov", {"scoop_ua_suffix": "(Perma.cc)"})
+    policy.add("fcc.gov", {"validator_ua": "Perma.cc/FCC URL Validator"})
+    policy.match("www.fcc.gov")  # {"scoop_ua_suffix": "(Perma.cc)", "validator_ua": "..."}
+    ```
+    """
+
+    def __init__(self):
+        self.root = DomainPolicyNode()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def get_labels(domain: str) -> list[str]:
+        """Returns the labels of a domain name, normalized and in reverse order."""
+        return list(reversed(domain.strip().lower().rstrip(".").split(".")))
+
+    def add(self, domain: str, attributes: dict) -> None:
+        """Adds attributes for a domain and its subdomains, merged with existing ones if any."""
+        node = self.root
+
+        for label in self.get_labels(domain):
+            node = node.children.setdefault(label, DomainPolicyNode())
+
+        if node.attributes is None:
+            node.attributes = {}
+            self.size += 1
+
+        node.attributes.update(attributes)
+
+    def match(self, domain: str | None) -> dict:
+        """
+        Returns the attributes that apply to a domain name, merged from its longest suffix match
+        and every shorter one. Returns an empty dict if there are none.
+        """
+        attributes = {}
+
+        if not domain:
+            return attributes
+
+        node = self.root
+
+        for label in self.get_labels(domain):
+            node = node.children.get(label)
+
+            if node is None:
+                break
+
+            if node.attributes:
+                attributes.update(node.attributes)
+
+        return attributes
+
+    @classmethod
+    def from_config(cls, config) -> "DomainPolicy":
+        """
+        Compiles per-domain settings from the app's config:
+        - CUSTOM_USER_AGENT_DOMAINS: "validator_ua" and "scoop_ua_suffix" attributes.
+        - VIDEO_ATTACHMENT_DOMAINS: "video_attachments" attribute.
+        - SCOOP_DOMAIN_PROFILES: "scoop_profile" attribute.
+        """
+        policy = cls()
+
+        for domain, agents in config["CUSTOM_USER_AGENT_DOMAINS"].items():
+            policy.add(domain, agents)
+
+        for domain in config["VIDEO_ATTACHMENT_DOMAINS"]:
+            policy.add(domain, {"video_attachments": True})
+
+        for domain, profile in config["SCOOP_DOMAIN_PROFILES"].items():
+            policy.add(domain, {"scoop_profile": profile})
+
+        return policy
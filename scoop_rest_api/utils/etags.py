@@ -0,0 +1,34 @@
+"""
+`utils.etags` module: Strong ETags for capture information and artifacts.
+
+ETags are derived from capture metadata only, so that they can be checked against
+If-None-Match headers without loading artifacts from the database.
+"""
+
+import hashlib
+
+
+def get_capture_etag(capture) -> str:
+    """
+    Returns an ETag for the user-facing information of a given capture.
+    Changes whenever the capture changes status or its timestamps are updated.
+    """
+    state = ":".join(
+        str(value)
+        for value in [
+            capture.id_capture,
+            capture.status,
+            capture.started_timestamp,
+            capture.ended_timestamp,
+        ]
+    )
+    return hashlib.sha256(state.encode()).hexdigest()
+
+
+def get_artifact_etag(capture, filename: str) -> str:
+    """
+    Returns an ETag for a given artifact of a capture.
+    Artifacts are written once, when the capture ends, and never change after that.
+    """
+    state = f"{capture.id_capture}:{capture.ended_timestamp}:{filename}"
+    return hashlib.sha256(state.encode()).hexdigest()
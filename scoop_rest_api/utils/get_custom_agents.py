@@ -6,7 +6,13 @@ from flask import current_app
 
 
 def get_custom_agents(domain):
-    for d, agents in current_app.config["CUSTOM_USER_AGENT_DOMAINS"].items():
-        if d in domain:
-            return agents
-    return None
+    """
+    Returns the custom user agents set for a domain or any of its parent domains via
+    CUSTOM_USER_AGENT_DOMAINS, the longest match winning (see utils.DomainPolicy).
+    Returns None if there are none.
+    """
+    attributes = current_app.extensions["domain_policy"].match(domain)
+    agents = {
+        key: attributes[key] for key in ["validator_ua", "scoop_ua_suffix"] if key in attributes
+    }
+    return agents or None
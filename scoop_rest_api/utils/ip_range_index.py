@@ -0,0 +1,63 @@
+"""
+`utils.ip_range_index` module: Sorted index of IP ranges, for fast membership checks.
+"""
+
+from bisect import bisect_right
+import ipaddress
+
+
+class IPRangeIndex:
+    """
+    Index of IPv4 and IPv6 ranges (i.e: BANNED_IP_RANGES), compiled once.
+
+    Ranges are merged into sorted, non-overlapping intervals of integers, one list per IP version.
+    Checking whether an address belongs to any of the ranges is a binary search: O(log n).
+
+    Usage:
+    ```
+    index = IPRangeIndex(["10.0.0.0/8", "fc00::/7"])
+    "10.1.2.3" in index  # True
+    ```
+    """
+
+    def __init__(self, ranges: list[str]):
+        intervals = {4: [], 6: []}
+
+        for ip_range in ranges:
+            network = ipaddress.ip_network(ip_range, strict=False)
+            intervals[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+
+        self._starts = {}
+        self._ends = {}
+
+        for version, version_intervals in intervals.items():
+            merged = []
+
+            for start, end in sorted(version_intervals):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        """Returns the number of intervals in this index, once overlapping ranges are merged."""
+        return sum(len(starts) for starts in self._starts.values())
+
+    def __contains__(self, address) -> bool:
+        """
+        Returns True if `address` (a string or ipaddress object) belongs to any of the ranges.
+        Raises ValueError if `address` is not a valid IP address.
+        """
+        if isinstance(address, str):
+            address = ipaddress.ip_address(address)
+
+        value = int(address)
+        starts = self._starts[address.version]
+        i = bisect_right(starts, value) - 1
+
+        return i >= 0 and value <= self._ends[address.version][i]
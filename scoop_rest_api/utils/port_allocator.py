@@ -0,0 +1,56 @@
+"""
+`utils.port_allocator` module: Leases proxy ports to the captures running on a given host.
+"""
+
+from contextlib import contextmanager
+import fcntl
+from pathlib import Path
+from typing import Iterator
+
+from flask import current_app
+
+from scoop_rest_api.utils.check_proxy_port import check_proxy_port
+
+
+@contextmanager
+def lease_proxy_port() -> Iterator[int | None]:
+    """
+    Leases a proxy port from the [PROXY_PORT, PROXY_PORT + PROXY_PORT_RANGE) range,
+    for the duration of the context.
+
+    Leases are exclusive `flock()` locks on a per-port file under PROXY_PORT_LEASE_PATH:
+    - Acquiring one is atomic across every worker process of the host, however workers are named.
+    - The kernel releases them when their holder exits, including when it crashes or is killed.
+
+    Leased ports are also checked for availability (see `check_proxy_port`), in case they are held
+    by something else (i.e: an orphaned Scoop process which has not been reaped yet).
+
+    Yields None if no port is available.
+    """
+    lease_path = Path(current_app.config["PROXY_PORT_LEASE_PATH"])
+    lease_path.mkdir(parents=True, exist_ok=True)
+
+    first_port = int(current_app.config["PROXY_PORT"])
+    last_port = first_port + int(current_app.config["PROXY_PORT_RANGE"])
+
+    for port in range(first_port, last_port):
+        lease_file = open(lease_path / f"{port}.lease", "w")
+
+        try:
+            fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lease_file.close()
+            continue
+
+        if not check_proxy_port(port):
+            current_app.logger.warning(f"Port {port} is leased to no one, yet in use.")
+            lease_file.close()  # Also releases the lock
+            continue
+
+        try:
+            yield port
+        finally:
+            lease_file.close()
+        return
+
+    yield None
@@ -0,0 +1,233 @@
+"""
+`utils.process_tree` module: Helpers for limiting, tracking and tearing down Scoop process trees.
+
+Scoop is started in its own session (and therefore its own process group), so that the
+browser, ffmpeg and yt-dlp processes it spawns can be signaled along with it.
+
+Process groups are recorded in a registry folder (see `SCOOP_PROCESS_REGISTRY_PATH`) for as long as
+they run, so that groups left behind by a worker that crashed or was killed can be found and reaped.
+"""
+
+import json
+import os
+from pathlib import Path
+import resource
+import signal
+import subprocess
+from typing import Callable
+
+from flask import current_app
+
+
+def get_resource_limiter(
+    memory_limit: int | None = None, cpu_time_limit: int | None = None
+) -> Callable[[], None] | None:
+    """
+    Returns a function applying resource limits to a child process, to be used as `preexec_fn`.
+    - `memory_limit`: Maximum size of each process' data segment, in bytes (RLIMIT_DATA).
+    - `cpu_time_limit`: Maximum CPU time each process may use, in seconds (RLIMIT_CPU).
+
+    Limits are inherited by every process Scoop spawns.
+    Returns None if no limit was provided.
+    """
+    if not memory_limit and not cpu_time_limit:
+        return None
+
+    def limit_resources() -> None:
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_DATA, (memory_limit, memory_limit))
+
+        if cpu_time_limit:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_time_limit, cpu_time_limit))
+
+    return limit_resources
+
+
+def signal_process_group(pgid: int, signum: int) -> bool:
+    """
+    Sends a signal to every process of a given process group.
+    Returns False if the process group no longer exists.
+    """
+    try:
+        os.killpg(pgid, signum)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        current_app.logger.warning(f"Not allowed to signal process group {pgid}.")
+        return False
+    return True
+
+
+def kill_process_tree(process: subprocess.Popen, grace_period: float = 0) -> None:
+    """
+    Tears down a process started with `start_new_session=True`, along with all of its descendants.
+
+    Sends SIGTERM to the process group, waits up to `grace_period` seconds for the session leader
+    to exit, then sends SIGKILL to whatever is left in the group.
+    """
+    pgid = process.pid  # Session leaders are process group leaders: pgid == pid
+
+    if grace_period > 0 and signal_process_group(pgid, signal.SIGTERM):
+        try:
+            process.wait(timeout=grace_period)
+        except subprocess.TimeoutExpired:
+            pass
+
+    signal_process_group(pgid, signal.SIGKILL)
+    process.wait()
+
+
+def _get_registry_path() -> Path:
+    path = Path(current_app.config["SCOOP_PROCESS_REGISTRY_PATH"])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def is_process_alive(pid: int) -> bool:
+    """
+    Returns True if a process with the given pid exists,
+    including processes owned by other users (which cannot be signaled).
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_boot_id() -> str | None:
+    """Returns an id unique to the current boot of the system, if available (Linux only)."""
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        return None
+
+
+def _read_process_stat(pid: int) -> list[str] | None:
+    """
+    Returns the fields of /proc/<pid>/stat following the process name (Linux only):
+    index 0 is the process state, index 2 its process group, index 19 its start time.
+    Returns None if the process does not exist.
+    """
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+
+    # The process name is in parentheses, and may contain spaces or parentheses itself
+    return stat[stat.rindex(")") + 2 :].split()
+
+
+def get_process_start_time(pid: int) -> int | None:
+    """
+    Returns when a process started, in clock ticks since boot (Linux only).
+    Together with its pid, identifies a process even if its pid is reused later.
+    Returns None if the process does not exist.
+    """
+    fields = _read_process_stat(pid)
+    return int(fields[19]) if fields else None
+
+
+def _get_process_group_start_times(pgid: int) -> list[int]:
+    """Returns the start times of every process in a given process group (Linux only)."""
+    start_times = []
+
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+
+        fields = _read_process_stat(int(entry.name))
+        if fields and int(fields[2]) == pgid:
+            start_times.append(int(fields[19]))
+
+    return start_times
+
+
+def register_process_group(pgid: int) -> None:
+    """
+    Records a running process group, owned by the current process.
+    Both the owner and the group leader are identified by pid and start time, along with the
+    current boot id, so that entries are never mistaken for processes that reused their pids.
+    """
+    (_get_registry_path() / str(pgid)).write_text(
+        json.dumps(
+            {
+                "boot_id": get_boot_id(),
+                "owner_pid": os.getpid(),
+                "owner_start_time": get_process_start_time(os.getpid()),
+                "leader_start_time": get_process_start_time(pgid),
+            }
+        )
+    )
+
+
+def unregister_process_group(pgid: int) -> None:
+    """Removes a process group from the registry."""
+    (_get_registry_path() / str(pgid)).unlink(missing_ok=True)
+
+
+def is_registered_process_group(pgid: int, entry: dict) -> bool:
+    """
+    Checks that process group `pgid` is still the one described by a registry entry:
+    - The system was not rebooted (or the container restarted) since it was registered.
+    - Its leader, if still running, is the process that was registered.
+    - Otherwise, none of its members started before the registered leader.
+    """
+    if entry.get("boot_id") != get_boot_id() or entry.get("leader_start_time") is None:
+        return False
+
+    leader_start_time = get_process_start_time(pgid)
+
+    if leader_start_time is not None:
+        return leader_start_time == entry["leader_start_time"]
+
+    # Leader is gone: processes it spawned, which may still be running, started after it
+    return all(
+        start_time >= entry["leader_start_time"]
+        for start_time in _get_process_group_start_times(pgid)
+    )
+
+
+def reap_orphaned_process_groups() -> int:
+    """
+    Kills registered process groups whose owner is no longer running,
+    for example because a worker crashed or hit Celery's hard time limit mid-capture.
+
+    Process groups owned by live processes (i.e: captures in progress) are left untouched.
+    Entries that no longer match the processes they describe (i.e: after a restart, or if their
+    pids were reused) are removed without signaling anything (see `is_registered_process_group`).
+
+    Returns the number of process groups that were killed.
+    """
+    reaped = 0
+
+    for entry_path in _get_registry_path().iterdir():
+        try:
+            pgid = int(entry_path.name)
+            entry = json.loads(entry_path.read_text())
+            owner_pid = int(entry["owner_pid"])
+        except (ValueError, TypeError, KeyError, OSError):
+            entry_path.unlink(missing_ok=True)
+            continue
+
+        # Owner still running: capture in progress
+        if (
+            entry.get("boot_id") == get_boot_id()
+            and entry.get("owner_start_time") is not None
+            and get_process_start_time(owner_pid) == entry["owner_start_time"]
+        ):
+            continue
+
+        if not is_registered_process_group(pgid, entry):
+            current_app.logger.warning(
+                f"Process group {pgid} no longer matches its registry entry: not reaping it."
+            )
+        elif signal_process_group(pgid, signal.SIGKILL):
+            current_app.logger.warning(f"Reaped orphaned Scoop process group {pgid}.")
+            reaped += 1
+
+        entry_path.unlink(missing_ok=True)
+
+    return reaped
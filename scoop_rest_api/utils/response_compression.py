@@ -0,0 +1,82 @@
+"""
+`utils.response_compression` module: Negotiated compression of JSON responses.
+"""
+
+import gzip
+
+from flask import Response, current_app, request
+import zstandard
+
+COMPRESSIBLE_MIMETYPES = ["application/json"]
+""" Artifacts (.wacz, .png, .mp4 ...) are either already compressed or served as-is. """
+
+AVAILABLE_ENCODINGS = ["zstd", "gzip"]
+""" Content encodings this module can produce, by order of preference. """
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compresses `data` using `encoding` ("zstd" or "gzip")."""
+    if encoding == "zstd":
+        return zstandard.compress(data, level=3)
+
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def compress_response(response: Response) -> Response:
+    """
+    `after_request` hook compressing JSON responses of COMPRESSION_MIN_SIZE bytes or more,
+    using the best encoding accepted by the client (zstd, gzip).
+
+    - Streamed responses (i.e: server-sent events) and artifacts are never compressed.
+    - Strong ETags are made weak once a response is compressed, as the compressed and
+      uncompressed representations are not byte-for-byte identical.
+    - Compressed variants of responses that clients may cache without revalidation
+      (i.e: captures in a final state, see views.capture) are cached by each process.
+    """
+    if (
+        response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    data = response.get_data()
+
+    if len(data) < current_app.config["COMPRESSION_MIN_SIZE"]:
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = request.accept_encodings.best_match(AVAILABLE_ENCODINGS)
+
+    if not encoding:
+        return response
+
+    etag, is_weak = response.get_etag()
+    cache = current_app.extensions["compression_cache"]
+    cache_key = None
+
+    if (
+        etag
+        and not is_weak
+        and response.cache_control.max_age
+        and not response.cache_control.no_cache
+    ):
+        cache_key = (request.path, etag, encoding)
+
+    compressed = cache.get(cache_key) if cache_key else None
+
+    if compressed is None:
+        compressed = compress(data, encoding)
+
+        if cache_key:
+            cache.set(cache_key, compressed)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+
+    return response
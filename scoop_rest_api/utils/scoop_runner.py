@@ -5,26 +5,92 @@
 import datetime
 from io import BytesIO
 import json
+import os
 from pathlib import Path
 import shlex
-import shutil
 import subprocess
 from subprocess import CompletedProcess
-from tempfile import mkdtemp
+import time
 from typing import Any
 from urllib.parse import urlparse
 from zipfile import ZIP_DEFLATED, ZipFile
 
 from flask import current_app
 
+from scoop_rest_api.utils.capture_workspace import CaptureWorkspace
+from scoop_rest_api.utils.config_check import (
+    EXCLUDED_SCOOP_CLI_OPTIONS,
+    PROFILE_SCOOP_CLI_OPTIONS,
+)
+from scoop_rest_api.utils.process_tree import (
+    get_resource_limiter,
+    kill_process_tree,
+    register_process_group,
+    unregister_process_group,
+)
+
+
+class CaptureCanceled(Exception):
+    """Raised when a capture is canceled while Scoop is running."""
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """Raised when Scoop writes more than CAPTURE_WORKSPACE_QUOTA bytes to a capture's workspace."""
+
+
+def get_scoop_options(
+    domain_settings: dict, capture_options: dict | None
+) -> tuple[dict[str, Any], str | None]:
+    """
+    Returns the Scoop CLI options to use for a given capture, and the name of the capture profile
+    that was applied to them, if any.
+
+    - `domain_settings`: Settings of the target domain (see utils.DomainPolicy).
+    - `capture_options`: The capture's options (see models.Capture.options).
+
+    The requested profile takes precedence over the domain's profile (see SCOOP_CAPTURE_PROFILES).
+    """
+    scoop_options: dict[str, Any] = dict(current_app.config["SCOOP_CLI_OPTIONS"])
+
+    profile_name = (capture_options or {}).get("profile") or domain_settings.get("scoop_profile")
+    profile = None
+
+    if profile_name:
+        profile = current_app.config["SCOOP_CAPTURE_PROFILES"].get(profile_name)
+
+        if profile is None:
+            current_app.logger.warning(f"Unknown capture profile: {profile_name}")
+            profile_name = None
+
+    for key, value in (profile or {}).items():
+        if (
+            key.lower() in PROFILE_SCOOP_CLI_OPTIONS
+            and key.lower() not in EXCLUDED_SCOOP_CLI_OPTIONS
+        ):
+            scoop_options[key] = value
+
+    # Special handling for --capture-video-as-attachment:
+    # Only attempt to capture videos as attachments if the target domain
+    # is in the allow list.
+    if (
+        "--capture-video-as-attachment" in scoop_options
+        and current_app.config["VIDEO_ATTACHMENT_DOMAINS"]
+        and not domain_settings.get("video_attachments")
+    ):
+        scoop_options["--capture-video-as-attachment"] = "false"
+
+    return scoop_options, profile_name
+
 
 class ScoopRunner:
     """Class for executing Scoop via a subprocess."""
 
-    def __init__(self, capture, proxy_port: int):
+    def __init__(self, capture, proxy_port: int, display: str | None = None):
         self.capture = capture
         self.proxy_port = proxy_port
-        self.capture_path = Path(mkdtemp())
+        self.display = display
+        self.workspace = CaptureWorkspace.create()
+        self.capture_path = self.workspace.path
 
     @property
     def json_summary_path(self) -> Path:
@@ -54,6 +120,7 @@ class ScoopRunner:
         # Prepare Scoop command and options
         #
         domain = urlparse(self.capture.url).hostname
+        domain_settings = current_app.extensions["domain_policy"].match(domain)
 
         scoop_prefix = shlex.split(current_app.config["SCOOP_PREFIX"])
         scoop_args = [
@@ -72,18 +139,14 @@ class ScoopRunner:
             "--proxy-port",
             str(self.proxy_port),
         ]
-        scoop_options: dict[str, Any] = current_app.config["SCOOP_CLI_OPTIONS"]
-        for key, value in scoop_options.items():
-            # Special handling for --capture-video-as-attachment:
-            # Only attempt to capture videos as attachments if the target domain
-            # is in the allow list.
-            if (
-                key == "--capture-video-as-attachment"
-                and current_app.config["VIDEO_ATTACHMENT_DOMAINS"]
-            ):
-                if domain not in current_app.config["VIDEO_ATTACHMENT_DOMAINS"]:
-                    value = "false"
+        scoop_options, profile_name = get_scoop_options(domain_settings, self.capture.options)
 
+        if profile_name:
+            current_app.logger.info(
+                f"Capture #{self.capture.id_capture} | Capture profile: {profile_name}"
+            )
+
+        for key, value in scoop_options.items():
             scoop_args.append(key)
             scoop_args.append(str(value))
 
@@ -99,14 +162,18 @@ class ScoopRunner:
         return scoop_args
 
     def save_result(self, result: CompletedProcess[bytes]):
-        """Validate a Scoop result and save it to the database."""
+        """
+        Validate a Scoop result and save it to the database.
+        Captures that are no longer "started" (i.e: canceled in the meantime) are left untouched.
+        """
         # Write log output to database
-        self.capture.stdout_logs = result.stdout.decode("utf-8")
-        self.capture.stderr_logs = result.stderr.decode("utf-8")
+        fields = {
+            "stdout_logs": result.stdout.decode("utf-8"),
+            "stderr_logs": result.stderr.decode("utf-8"),
+            "ended_timestamp": datetime.datetime.now(datetime.UTC),
+        }
 
         # Assume capture failed until proven otherwise
-        self.capture.status = "failed"
-        self.capture.ended_timestamp = datetime.datetime.now(datetime.UTC)
         success = False
         failed_reason = ""
 
@@ -119,15 +186,16 @@ class ScoopRunner:
             if not self.archive_path.exists():
                 failed_reason = f"{self.archive_path} not found"
                 success = False
-            else:
-                with open(self.archive_path, "rb") as archive_file:
-                    self.capture.archive = archive_file.read()
-
-            # Archive must not be larger than max supported limit
-            if len(self.capture.archive) >= current_app.config["MAX_SUPPORTED_ARCHIVE_FILESIZE"]:
-                self.capture.archive = None
+            # Archive must not be larger than max supported limit.
+            # (Checked on disk, so that oversized archives are never loaded in memory)
+            elif (
+                self.archive_path.stat().st_size
+                >= current_app.config["MAX_SUPPORTED_ARCHIVE_FILESIZE"]
+            ):
                 failed_reason = "Archive over maximum supported filesize"
                 success = False
+            else:
+                fields["archive"] = self.archive_path.read_bytes()
 
             # JSON summary must exist
             if not self.json_summary_path.exists() and not failed_reason:
@@ -139,7 +207,7 @@ class ScoopRunner:
             # - Store a copy of the summary in the database
             if success is True:
                 json_summary = json.loads(self.json_summary_path.read_text())
-                self.capture.summary = json_summary  # Store copy of JSON summary
+                fields["summary"] = json_summary  # Store copy of JSON summary
 
                 filenames_to_check = []
                 for filename in json_summary["attachments"].values():
@@ -158,25 +226,64 @@ class ScoopRunner:
                             current_app.logger.error(
                                 f"Capture #{self.capture.id_capture} | Failed ({filepath} not found)"
                             )
+                            failed_reason = failed_reason or "attachments not found"
                             success = False
                         else:
-                            with open(filepath, "rb") as data:
-                                zip_file.writestr(filename, data.read())
+                            # Streamed from disk, rather than read in memory first
+                            zip_file.write(filepath, arcname=filename)
 
                 # Write attachments, if any, to the database
                 if filenames_to_check and len(missing_attachments) < len(filenames_to_check):
-                    self.capture.attachments = attachments_buffer.getvalue()
+                    fields["attachments"] = attachments_buffer.getvalue()
 
-        # Report on status and update database record
+        # Update database record and report on status
         if success is True:
-            current_app.logger.info(f"Capture #{self.capture.id_capture} | Success")
-            self.capture.status = "success"
+            if self.capture.update_if_started(status="success", **fields):
+                current_app.logger.info(f"Capture #{self.capture.id_capture} | Success")
         else:
-            current_app.logger.error(
-                f"Capture #{self.capture.id_capture} | Failed ({failed_reason})"
-            )
-            self.capture.status = "failed"
-        self.capture.save()
+            if self.capture.update_if_started(
+                status="failed", failed_reason=failed_reason, **fields
+            ):
+                current_app.logger.error(
+                    f"Capture #{self.capture.id_capture} | Failed ({failed_reason})"
+                )
+
+    def is_canceled(self) -> bool:
+        """Checks whether this capture was canceled (see `views.capture.capture_delete`)."""
+        Capture = type(self.capture)
+        status = (
+            Capture.select(Capture.status)
+            .where(Capture.id_capture == self.capture.id_capture)
+            .scalar()
+        )
+        return status == "canceled"
+
+    def communicate(self, process: subprocess.Popen, timeout: float) -> tuple[bytes, bytes]:
+        """
+        Waits for Scoop to complete and returns its output.
+        Checks for cancellation every CANCEL_POLL_INTERVAL seconds while doing so.
+
+        Raises subprocess.TimeoutExpired if Scoop does not complete within `timeout` seconds.
+        Raises CaptureCanceled if the capture was canceled in the meantime.
+        Raises WorkspaceQuotaExceeded if Scoop writes more than CAPTURE_WORKSPACE_QUOTA bytes.
+        """
+        poll_interval = float(current_app.config["CANCEL_POLL_INTERVAL"])
+        deadline = time.monotonic() + timeout
+
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                # Output collected by an interrupted `communicate()` call is not lost on retry.
+                return process.communicate(timeout=max(min(poll_interval, remaining), 0))
+            except subprocess.TimeoutExpired:
+                if remaining <= poll_interval:
+                    raise
+
+            if self.is_canceled():
+                raise CaptureCanceled()
+
+            if self.workspace.is_over_quota():
+                raise WorkspaceQuotaExceeded()
 
     def run(self) -> None:
         """Execute Scoop for this capture."""
@@ -184,22 +291,64 @@ class ScoopRunner:
         scoop_args = self.build_scoop_args()
         capture_timeout = float(current_app.config["SCOOP_CLI_OPTIONS"]["--capture-timeout"]) / 1000
 
+        # Point Scoop to this capture slot's X display, if it has one
+        env = None
+        if self.display:
+            env = {**os.environ, "DISPLAY": self.display}
+
         # Run Scoop and save result
+        process = None
         try:
-            result = subprocess.run(
+            process = subprocess.Popen(
                 scoop_args,
-                capture_output=True,
-                # Enforce hard timeout after SCOOP_TIMEOUT_FUSE seconds past capture timeout
-                timeout=capture_timeout + current_app.config["SCOOP_TIMEOUT_FUSE"],
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                # Run Scoop in its own session, so that its whole process tree can be torn down
+                start_new_session=True,
+                preexec_fn=get_resource_limiter(
+                    current_app.config["SCOOP_MEMORY_LIMIT"],
+                    current_app.config["SCOOP_CPU_TIME_LIMIT"],
+                ),
             )
-        except subprocess.TimeoutExpired:
-            self.capture.status = "failed"
-            self.capture.ended_timestamp = datetime.datetime.now(datetime.UTC)
-            self.capture.save()
-            current_app.logger.error(
-                f"Capture #{self.capture.id_capture} | Failed (timeout violation)"
+            register_process_group(process.pid)
+
+            # Enforce hard timeout after SCOOP_TIMEOUT_FUSE seconds past capture timeout
+            stdout, stderr = self.communicate(
+                process, timeout=capture_timeout + current_app.config["SCOOP_TIMEOUT_FUSE"]
             )
+        except CaptureCanceled:
+            # Status and end time were already recorded upon cancellation
+            kill_process_tree(process)
+            self.capture.status = "canceled"
+            current_app.logger.info(f"Capture #{self.capture.id_capture} | Canceled")
+        except WorkspaceQuotaExceeded:
+            kill_process_tree(process)
+            if self.capture.update_if_started(
+                status="failed",
+                failed_reason="workspace quota exceeded",
+                ended_timestamp=datetime.datetime.now(datetime.UTC),
+            ):
+                current_app.logger.error(
+                    f"Capture #{self.capture.id_capture} | Failed (workspace quota exceeded)"
+                )
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process, current_app.config["SCOOP_KILL_GRACE_PERIOD"])
+            if self.capture.update_if_started(
+                status="failed",
+                failed_reason="timeout violation",
+                ended_timestamp=datetime.datetime.now(datetime.UTC),
+            ):
+                current_app.logger.error(
+                    f"Capture #{self.capture.id_capture} | Failed (timeout violation)"
+                )
         else:
-            self.save_result(result)
+            self.save_result(CompletedProcess(scoop_args, process.returncode, stdout, stderr))
         finally:
-            shutil.rmtree(self.capture_path, ignore_errors=True)
+            # Tear down anything Scoop left behind, including when interrupted
+            # (e.g: soft time limit exceeded)
+            if process is not None:
+                kill_process_tree(process)
+                unregister_process_group(process.pid)
+
+            self.workspace.remove()
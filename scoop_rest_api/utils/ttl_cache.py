@@ -0,0 +1,86 @@
+"""
+`utils.ttl_cache` module: Thread-safe, in-process cache of entries expiring after a given time.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+import threading
+import time
+from typing import Any
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire `ttl` seconds after being stored.
+
+    - Each entry is stored with its own TTL (see `set`).
+    - Least recently used entries are evicted once `max_entries` is exceeded.
+    - A `max_entries` of 0 disables the cache.
+
+    Keeps track of hits, misses and evictions (see `get_stats`).
+    `clock` can be replaced for testing purposes.
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = int(max_entries)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Returns the value stored under `key`, if any and not expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Stores `value` under `key` for `ttl` seconds. `value` cannot be None."""
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self.clock() + ttl, value)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Returns usage statistics for this cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,203 @@
+"""
+`utils.validation_engine` module: Asyncio-based retrieval of response headers for URL validation.
+"""
+
+import asyncio
+from dataclasses import dataclass
+import http.client
+import io
+import os
+import ssl
+import threading
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import requote_uri
+
+REDIRECT_STATUSES = [301, 302, 303, 307, 308]
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+MAX_REDIRECTS = requests.models.DEFAULT_REDIRECT_LIMIT
+""" Same as requests: more redirects than this raises requests.TooManyRedirects. """
+
+MAX_HEADERS_SIZE = 64 * 1024
+""" Responses with a status line and headers larger than this are considered invalid (bytes). """
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Accept": "*/*",
+    "Connection": "keep-alive",
+}
+""" Default headers sent by requests, which validation requests used to be made with. """
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_host_header(scheme: str, host: str, port: int) -> str:
+    """
+    Returns the value of the Host header for a request to `host` on `port` (RFC 9110):
+    IPv6 literals are bracketed, and the port is omitted only if it is the scheme's default.
+    """
+    if ":" in host:
+        host = f"[{host}]"
+
+    return host if port == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+
+
+@dataclass
+class ValidationResponse:
+    """Status and headers of the response to a validation request. The body is never read."""
+
+    url: str
+    status_code: int
+    headers: CaseInsensitiveDict
+
+
+class ValidationEngine:
+    """
+    Retrieves the response headers of URLs to validate, on an asyncio event loop running in a
+    dedicated thread. One engine is shared by all the threads of a process (see `get_engine`).
+
+    - Requests that exceed their timeout are cancelled, and their connection closed.
+    - At most `max_connections` connections are open at once.
+    - The security level required for TLS is lowered, as some websites otherwise fail with
+      DH_KEY_TOO_SMALL errors (https://github.com/psf/requests/issues/4775).
+      Certificates are not verified: we plan to capture even insecure sites.
+    - Redirects are followed, like requests does, up to MAX_REDIRECTS times.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = int(max_connections)
+        self.pid = os.getpid()
+
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.set_ciphers("DEFAULT@SECLEVEL=1")
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = asyncio.Semaphore(self.max_connections)
+        self.thread = threading.Thread(
+            target=self.loop.run_forever,
+            name="validation-engine",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def get_headers(self, url: str, headers: dict, timeout: float) -> ValidationResponse:
+        """
+        Requests `url` and returns the status and headers of the response.
+        Blocks the calling thread for up to `timeout` seconds.
+
+        Raises:
+        - TimeoutError if the request did not complete within `timeout` seconds.
+        - requests.TooManyRedirects if there were more than MAX_REDIRECTS redirects.
+        - OSError (including SSL errors) or EOFError if the request could not be completed.
+        - ValueError if the URL, or one it redirected to, or the response, is invalid.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self._get_headers(url, headers), timeout),
+            self.loop,
+        )
+
+        try:
+            return future.result(timeout + 1)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def _get_headers(self, url: str, headers: dict) -> ValidationResponse:
+        """Requests `url`, following redirects, and returns the status and headers of the response."""
+        for i in range(0, MAX_REDIRECTS + 1):
+            response = await self._request(url, headers)
+
+            if response.status_code not in REDIRECT_STATUSES or "Location" not in response.headers:
+                return response
+
+            url = urljoin(url, response.headers["Location"])
+
+        raise requests.TooManyRedirects(f"Exceeded {MAX_REDIRECTS} redirects.")
+
+    async def _request(self, url: str, headers: dict) -> ValidationResponse:
+        """Sends a single GET request to `url` and reads the status line and headers it returns."""
+        parsed = urlsplit(url)
+
+        # Redirects may point to any arbitrary schema, for instance file://
+        if parsed.scheme not in ["http", "https"]:
+            raise ValueError(f"Invalid schema: {parsed.scheme}")
+
+        if not parsed.hostname:
+            raise ValueError(f"No host in URL: {url}")
+
+        is_https = parsed.scheme == "https"
+        host = parsed.hostname.encode("idna").decode("ascii")
+        port = parsed.port or DEFAULT_PORTS[parsed.scheme]  # Raises ValueError if port is invalid
+
+        target = requote_uri(parsed.path or "/")
+        if parsed.query:
+            target += f"?{requote_uri(parsed.query)}"
+
+        host_header = get_host_header(parsed.scheme, host, port)
+        request_headers = {**DEFAULT_HEADERS, "Host": host_header, **headers}
+        request = f"GET {target} HTTP/1.1\r\n"
+        request += "".join(f"{name}: {value}\r\n" for name, value in request_headers.items())
+        request += "\r\n"
+
+        async with self.semaphore:
+            reader, writer = await asyncio.open_connection(
+                host,
+                port,
+                ssl=self.ssl_context if is_https else None,
+                server_hostname=host if is_https else None,
+                limit=MAX_HEADERS_SIZE,
+            )
+
+            try:
+                writer.write(request.encode("latin-1"))
+                await writer.drain()
+
+                # Skip informational responses (i.e: 100 Continue)
+                while True:
+                    raw = await reader.readuntil(b"\r\n\r\n")
+                    status_line, _, raw_headers = raw.partition(b"\r\n")
+                    status_line = status_line.split(b" ", 2)
+
+                    if len(status_line) < 2 or not status_line[0].startswith(b"HTTP/"):
+                        raise ValueError("Invalid status line.")
+
+                    status_code = int(status_line[1])
+
+                    if status_code >= 200 or status_code == 101:
+                        break
+            except asyncio.LimitOverrunError as err:
+                raise ValueError("Response headers are too large.") from err
+            finally:
+                writer.close()
+
+        message = http.client.parse_headers(io.BytesIO(raw_headers))
+        response_headers = CaseInsensitiveDict()
+
+        # Like requests: repeated headers are joined
+        for name in dict.fromkeys(message.keys()):
+            response_headers[name] = ", ".join(message.get_all(name))
+
+        return ValidationResponse(url=url, status_code=status_code, headers=response_headers)
+
+
+def get_engine() -> ValidationEngine:
+    """
+    Returns the validation engine of the current process, starting it if needed.
+    Processes forked from one that already started an engine (i.e: Celery workers) get their own.
+    """
+    global _engine
+
+    from flask import current_app  # noqa
+
+    with _engine_lock:
+        if _engine is None or _engine.pid != os.getpid():
+            _engine = ValidationEngine(current_app.config["VALIDATION_MAX_CONNECTIONS"])
+
+        return _engine
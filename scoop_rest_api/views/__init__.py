@@ -3,6 +3,13 @@
 """
 
 from .ping import ping_get
-from .capture import capture_get, capture_post
+from .capture import capture_delete, capture_events_get, capture_get, capture_post
+from .captures import (
+    captures_batch_post,
+    captures_events_get,
+    captures_get,
+    captures_status_post,
+)
 from .artifact import artifact_get
-from .validate import validate_post
+from .validate import validate_batch_post, validate_post
+from .stats import stats_get
@@ -8,9 +8,10 @@ import uuid
 import io
 from zipfile import ZipFile
 
-from flask import jsonify, make_response, send_file, current_app
+from flask import jsonify, make_response, request, send_file, current_app
 
 from scoop_rest_api.models import Capture
+from scoop_rest_api.utils import get_artifact_etag
 
 
 @current_app.route("/artifact/<string:id_capture>/<string:filename>")
@@ -21,11 +22,19 @@ def artifact_get(id_capture, filename):
     `id_capture` and `filename` params must be provided.
 
     Not behind auth.
+
+    Artifacts never change once written: they are served with a strong ETag and can be cached
+    publicly until the capture expires (see `Capture.get_remaining_lifetime`).
+    Returns HTTP 304, without reading the artifact from the database, if the ETag provided
+    via If-None-Match matches.
+
+    Artifacts up to ARTIFACT_CACHE_MAX_ITEM_SIZE bytes are cached in memory by each process
+    (see utils.ByteLRUCache).
     """
 
     # Is id_capture an uuid?
     try:
-        uuid.UUID(id_capture, version=4)  # noqa
+        capture_uuid = uuid.UUID(id_capture, version=4)  # noqa
     except ValueError:
         return jsonify({"error": "Invalid format for id_capture."}), 400
 
@@ -35,6 +44,47 @@ def artifact_get(id_capture, filename):
     # - "*.(pem|png|pdf|html|mp4|vtt)" (will be loaded from /attachments/)
     attachments_pattern = r"^[\w._-]+\.(pem|png|pdf|html|mp4|vtt)$"
 
+    if filename not in ["archive.wacz", "data.warc.gz", "archive.warc.gz"] and not re.match(
+        attachments_pattern, filename
+    ):
+        return jsonify({"error": "Invalid filename provided."}), 400
+
+    artifact_cache = current_app.extensions["artifact_cache"]
+    cache_key = (str(capture_uuid), filename)
+
+    # Artifacts are only available once a capture reached a final state.
+    # Only pull the metadata needed to check that, and to generate an ETag.
+    capture = (
+        Capture.select(
+            Capture.id_capture,
+            Capture.status,
+            Capture.created_timestamp,
+            Capture.started_timestamp,
+            Capture.ended_timestamp,
+        )
+        .where(Capture.id_capture == id_capture)
+        .get_or_none()
+    )
+
+    if capture is None or not capture.is_terminal:
+        # Cached artifacts of captures deleted since (see `cleanup` command) are no longer valid
+        if capture is None:
+            artifact_cache.delete_matching(cache_key[0])
+
+        return jsonify({"error": "Requested file was not found."}), 404
+
+    etag = get_artifact_etag(capture, filename)
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return add_artifact_headers(response, capture)
+
+    # Small artifacts are cached by each process, as they tend to be requested repeatedly
+    # right after a capture completes.
+    if data := artifact_cache.get(cache_key):
+        return serve_artifact(data, filename, etag, capture)
+
     # Retrieve the WACZ or an associated file (WARC or attachment) from the database
     match filename:
         # WACZ
@@ -48,46 +98,65 @@ def artifact_get(id_capture, filename):
             with ZipFile(io.BytesIO(wacz)) as zip_file:
                 data = zip_file.open("archive/data.warc.gz").read()
         # Attachment
-        case _ if re.match(attachments_pattern, filename):
-            data = retrieve_artifact(id_capture, filename, attachment=True)
-        # If any other filename was requested, return an error
         case _:
-            return jsonify({"error": "Invalid filename provided."}), 400
+            data = retrieve_artifact(id_capture, filename, attachment=True)
 
     if not data:
         return jsonify({"error": "Requested file was not found."}), 404
 
-    # Return file
+    artifact_cache.set(cache_key, data)
+
+    return serve_artifact(data, filename, etag, capture)
+
+
+def serve_artifact(data: bytes, filename: str, etag: str, capture: Capture):
+    """Returns a given artifact as a file download."""
     response = make_response(
-        send_file(io.BytesIO(data), as_attachment=True, download_name=filename),
+        send_file(
+            io.BytesIO(data),
+            as_attachment=True,
+            download_name=filename,
+            etag=etag,
+            max_age=capture.get_remaining_lifetime(),
+        ),
     )
+
+    return add_artifact_headers(response, capture)
+
+
+def add_artifact_headers(response, capture: Capture):
+    """Adds CORS and caching headers to an artifact response."""
     response.headers["Access-Control-Allow-Origin"] = "*"
     response.headers["Access-Control-Allow-Headers"] = "*"
     response.headers["Access-Control-Allow-Methods"] = "*"
 
     response.headers["Access-Control-Expose-Headers"] = (
-        "Content-Range, Content-Encoding, Content-Length"
+        "Content-Range, Content-Encoding, Content-Length, ETag"
     )
 
+    response.cache_control.public = True
+    response.cache_control.max_age = capture.get_remaining_lifetime()
+    response.cache_control.immutable = True
+
     return response
 
 
 def retrieve_artifact(id_capture, filename, attachment=False):
-    """Gets a capture file from the database."""
-    try:
-        capture = Capture.get_by_id(id_capture)
-        if capture.status == "pending":
-            return None
-    except Capture.DoesNotExist:
+    """Gets a capture file from the database. Only reads the column holding that file."""
+    data = None
+    column = Capture.attachments if attachment else Capture.archive
+    value = Capture.select(column).where(Capture.id_capture == id_capture).scalar()
+
+    if not value:
         return None
 
     if attachment:
-        with ZipFile(io.BytesIO(capture.attachments)) as container:
+        with ZipFile(io.BytesIO(value)) as container:
             for zip_info in container.infolist():
                 if zip_info.filename == filename:
                     with container.open(zip_info) as contents:
                         data = contents.read()
     else:
-        data = capture.archive
+        data = value
 
     return data
@@ -2,15 +2,88 @@
 `views.capture` module: /capture routes.
 """
 
+import datetime
 from pathlib import Path
 import uuid
 
-from flask import current_app, g, jsonify, request
+from flask import Response, current_app, g, jsonify, request, stream_with_context
 import validators
 
 from ..models import Capture
-from ..tasks import start_capture_process
-from ..utils import access_check, capture_to_dict
+from ..tasks import get_routing_class, queue_callback, start_capture_process
+from ..utils import (
+    access_check,
+    capture_to_dict,
+    classify_capture,
+    get_capture_etag,
+    stream_capture_events,
+)
+
+
+def parse_capture_input(input: dict, heavy_domains: set[str] | None = None) -> dict:
+    """
+    Validates the properties of a capture request (see `capture_post`).
+    `heavy_domains` is passed to `utils.classify_capture`.
+
+    Returns a dictionary of Capture fields.
+    Raises a ValueError, with a user-facing message, if input is invalid.
+    """
+    fields = {}
+    options = {}
+
+    if not isinstance(input, dict):
+        raise ValueError("Capture request must be a JSON object.")
+
+    #
+    # Required input: url
+    #
+    if "url" not in input:
+        raise ValueError("No URL provided.")
+
+    fields["url"] = input["url"]
+
+    #
+    # Optional input: callback url
+    #
+    if "callback_url" in input:
+        if validators.url(input["callback_url"]) is not True:
+            raise ValueError("Provided callback URL is not valid.")
+
+        fields["callback_url"] = input["callback_url"]
+
+    #
+    # Optional input: batch callback
+    #
+    if "batch_callback" in input:
+        if not isinstance(input["batch_callback"], bool):
+            raise ValueError("batch_callback must be a boolean.")
+
+        if input["batch_callback"] and "callback_url" not in fields:
+            raise ValueError("batch_callback requires a callback URL.")
+
+        if input["batch_callback"]:
+            options["batch_callback"] = True
+
+    #
+    # Optional input: capture profile
+    #
+    if "profile" in input:
+        profiles = current_app.config["SCOOP_CAPTURE_PROFILES"]
+
+        if not isinstance(input["profile"], str) or input["profile"] not in profiles:
+            raise ValueError(f"profile must be one of: {', '.join(profiles)}.")
+
+        options["profile"] = input["profile"]
+
+    if options:
+        fields["options"] = options
+
+    #
+    # Capture class, used to route heavy captures to dedicated workers
+    #
+    fields["capture_class"] = classify_capture(fields["url"], options, heavy_domains)
+
+    return fields
 
 
 @current_app.route("/capture", methods=["POST"])
@@ -25,13 +98,15 @@ def capture_post():
     Accepts JSON body with the following properties:
     - "url": Url to capture (required)
     - "callback_url": POST URL to be called upon completion (optional)
+    - "batch_callback": If true, completions sharing the same "callback_url" are delivered together,
+      as a JSON array, within CALLBACK_BATCH_WINDOW seconds (optional, requires "callback_url")
+    - "profile": Name of a capture profile, overriding some Scoop options (optional).
+      See SCOOP_CAPTURE_PROFILES.
 
     Returns HTTP 200 and a JSON object containing user-facing capture information.
     Returns HTTP 429 if MAX_PENDING_CAPTURES is exceeded.
     """
     input = request.get_json()
-    url = None
-    callback_url = None
     MAX_PENDING_CAPTURES = current_app.config["MAX_PENDING_CAPTURES"]
 
     #
@@ -46,31 +121,17 @@ def capture_post():
         return jsonify({"error": "Capture server is over capacity."}), 429
 
     #
-    # Required input: url
-    #
-    if "url" not in input:
-        return jsonify({"error": "No URL provided."}), 400
-
-    url = input["url"]
-
-    #
-    # Optional input: callback url
+    # Validate input
     #
-    if "callback_url" in input:
-        if validators.url(input["callback_url"]) is not True:
-            return jsonify({"error": "Provided callback URL is not valid."}), 400
-
-        callback_url = input["callback_url"]
+    try:
+        fields = parse_capture_input(input)
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
 
     #
     # Create capture request
     #
-    capture = Capture()
-    capture.url = url
-
-    if callback_url:
-        capture.callback_url = callback_url
-
+    capture = Capture(**fields)
     capture.id_access_key = g.access_key.id_access_key
 
     try:
@@ -86,7 +147,7 @@ def capture_post():
     if sentinel.exists():
         current_app.logger.info("Deployment sentinel is present, not triggering next capture.")
     else:
-        start_capture_process.delay()
+        start_capture_process.delay(capture_class=get_routing_class(capture.capture_class))
 
     #
     # Return info
@@ -104,6 +165,104 @@ def capture_get(id_capture):
     Behind auth: Requires Access-Key header (see utils.access_check).
 
     Will only return information if the capture is associated with the access key that was provided.
+
+    Supports conditional requests: returns HTTP 304 if the capture did not change since the
+    ETag provided via If-None-Match was issued. Captures in a final state are cacheable by
+    the client until they expire (see `Capture.get_remaining_lifetime`).
+    """
+    capture = None
+
+    # Is id_capture an uuid?
+    try:
+        uuid.UUID(id_capture, version=4)  # noqa
+    except ValueError:
+        return jsonify({"error": "Invalid format for id_capture."}), 400
+
+    # Get capture object from database (artifacts are not needed)
+    capture = (
+        Capture.select_without_artifacts().where(Capture.id_capture == id_capture).get_or_none()
+    )
+
+    if capture is None:
+        return jsonify({"error": "No match for given id_capture."}), 404
+
+    # Is the currently logged-in user the owner of this capture?
+    if capture.id_access_key_id != g.access_key.id_access_key:
+        return jsonify({"error": "Access to this capture was denied."}), 403
+
+    response = jsonify(capture_to_dict(capture))
+    response.set_etag(get_capture_etag(capture))
+
+    # Captures in a final state no longer change: clients may cache them.
+    # Other captures may be cached, but must be revalidated.
+    if capture.is_terminal:
+        response.cache_control.private = True
+        response.cache_control.max_age = capture.get_remaining_lifetime()
+    else:
+        response.cache_control.no_cache = True
+
+    return response.make_conditional(request)
+
+
+@current_app.route("/capture/<id_capture>/events", methods=["GET"])
+@access_check
+def capture_events_get(id_capture):
+    """
+    [GET] /capture/<id_capture>/events
+    Streams status changes of a given capture, identified by `id_capture`, as server-sent events.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Will only stream information if the capture is associated with the access key that was provided.
+
+    Each "status" event contains user-facing capture information. The current state of the capture
+    is sent first, and the stream ends once the capture reaches a final state.
+    See utils.stream_capture_events for details.
+    """
+    capture = None
+
+    # Is id_capture an uuid?
+    try:
+        uuid.UUID(id_capture, version=4)  # noqa
+    except ValueError:
+        return jsonify({"error": "Invalid format for id_capture."}), 400
+
+    # Get capture object from database
+    capture = (
+        Capture.select(Capture.id_capture, Capture.id_access_key)
+        .where(Capture.id_capture == id_capture)
+        .get_or_none()
+    )
+
+    if capture is None:
+        return jsonify({"error": "No match for given id_capture."}), 404
+
+    # Is the currently logged-in user the owner of this capture?
+    if capture.id_access_key_id != g.access_key.id_access_key:
+        return jsonify({"error": "Access to this capture was denied."}), 403
+
+    return Response(
+        stream_with_context(stream_capture_events(g.access_key.id_access_key, id_capture)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@current_app.route("/capture/<id_capture>", methods=["DELETE"])
+@access_check
+def capture_delete(id_capture):
+    """
+    [DELETE] /capture/<id_capture>
+    Cancels a given capture, identified by `id_capture`.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Pending captures are canceled right away, and their callback is queued.
+    Started captures are canceled right away, and the worker running them kills Scoop
+    within CANCEL_POLL_INTERVAL seconds (see utils.ScoopRunner), then queues their callback.
+
+    Returns HTTP 200 and a JSON object containing user-facing capture information.
+    Returns HTTP 409 if the capture already reached a final state.
     """
     capture = None
 
@@ -123,4 +282,29 @@ def capture_get(id_capture):
     if capture.id_access_key.id_access_key != g.access_key.id_access_key:
         return jsonify({"error": "Access to this capture was denied."}), 403
 
+    # Only pending or started captures can be canceled.
+    # Statuses are checked one at a time, so that callbacks of captures that were pending
+    # are queued here, whereas workers queue those of captures they started.
+    was_pending = False
+
+    for status in ["pending", "started"]:
+        update_count = (
+            Capture.update(status="canceled", ended_timestamp=datetime.datetime.now(datetime.UTC))
+            .where(Capture.id_capture == id_capture, Capture.status == status)
+            .execute()
+        )
+
+        if update_count > 0:
+            was_pending = status == "pending"
+            break
+    else:
+        return jsonify({"error": "Capture can no longer be canceled."}), 409
+
+    current_app.logger.info(f"Capture #{id_capture} | Marked as canceled")
+
+    capture = Capture.get_by_id(id_capture)
+
+    if was_pending and capture.callback_url is not None:
+        queue_callback(capture)
+
     return jsonify(capture_to_dict(capture)), 200
@@ -0,0 +1,411 @@
+"""
+`views.captures` module: /captures routes, operating on several captures at once.
+"""
+
+import base64
+import binascii
+from collections import defaultdict
+import datetime
+import email.utils
+import json
+from pathlib import Path
+import uuid
+
+from flask import Response, current_app, g, jsonify, request, stream_with_context
+from peewee import Tuple, fn
+
+from ..models import Capture
+from ..tasks import get_routing_class, start_capture_process
+from ..utils import access_check, capture_to_dict, get_heavy_domains, stream_capture_events
+from .capture import parse_capture_input
+
+CAPACITY_LOCK_ID = 7_212_023
+""" Postgres advisory lock held while checking capacity and inserting a batch of captures. """
+
+
+@current_app.route("/captures", methods=["GET"])
+@access_check
+def captures_get():
+    """
+    [GET] /captures
+    Lists the captures associated with the access key that was provided, newest first.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Accepts the following query string parameters (all optional):
+    - "status": Comma-separated list of statuses to filter on.
+    - "created_after" / "created_before": Only list captures created at or after / before
+      that point in time. Accepts HTTP dates, as returned by this API, and ISO 8601 dates.
+    - "limit": Number of captures per page. Defaults to CAPTURE_LIST_PAGE_SIZE,
+      up to CAPTURE_LIST_MAX_PAGE_SIZE.
+    - "cursor": Opaque value returned as "next_cursor" by the previous page.
+
+    Pages are keyset-paginated on (created_timestamp, id_capture), so that every page
+    costs the same to retrieve, no matter how deep.
+
+    Returns HTTP 200 and a JSON object with the following properties:
+    - "captures": List of JSON objects containing user-facing capture information.
+    - "next_cursor": Cursor pointing to the next page, or null if this is the last page.
+    """
+    CAPTURE_LIST_PAGE_SIZE = current_app.config["CAPTURE_LIST_PAGE_SIZE"]
+    CAPTURE_LIST_MAX_PAGE_SIZE = current_app.config["CAPTURE_LIST_MAX_PAGE_SIZE"]
+
+    query = Capture.select_without_artifacts().where(
+        Capture.id_access_key == g.access_key.id_access_key
+    )
+
+    #
+    # Optional input: status
+    #
+    if request.args.get("status"):
+        statuses = request.args["status"].split(",")
+
+        if not set(statuses).issubset(Capture.status.choices):
+            return jsonify({"error": "Invalid status."}), 400
+
+        query = query.where(Capture.status.in_(statuses))
+
+    #
+    # Optional input: created_after / created_before
+    #
+    try:
+        if request.args.get("created_after"):
+            query = query.where(
+                Capture.created_timestamp >= parse_date(request.args["created_after"])
+            )
+
+        if request.args.get("created_before"):
+            query = query.where(
+                Capture.created_timestamp < parse_date(request.args["created_before"])
+            )
+    except ValueError:
+        return jsonify({"error": "Invalid format for created_after or created_before."}), 400
+
+    #
+    # Optional input: limit
+    #
+    try:
+        limit = int(request.args.get("limit", CAPTURE_LIST_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+
+    if not 0 < limit <= CAPTURE_LIST_MAX_PAGE_SIZE:
+        return (
+            jsonify({"error": f"limit must be between 1 and {CAPTURE_LIST_MAX_PAGE_SIZE}."}),
+            400,
+        )
+
+    #
+    # Optional input: cursor
+    #
+    if request.args.get("cursor"):
+        try:
+            created_timestamp, id_capture = decode_cursor(request.args["cursor"])
+        except ValueError:
+            return jsonify({"error": "Invalid cursor."}), 400
+
+        query = query.where(
+            Tuple(Capture.created_timestamp, Capture.id_capture)
+            < Tuple(created_timestamp, id_capture)
+        )
+
+    #
+    # Pull one more capture than needed, to know whether there is a next page
+    #
+    captures = list(
+        query.order_by(Capture.created_timestamp.desc(), Capture.id_capture.desc()).limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(captures) > limit:
+        captures = captures[:limit]
+        next_cursor = encode_cursor(captures[-1])
+
+    return (
+        jsonify(
+            {
+                "captures": [capture_to_dict(capture) for capture in captures],
+                "next_cursor": next_cursor,
+            }
+        ),
+        200,
+    )
+
+
+@current_app.route("/captures/batch", methods=["POST"])
+@access_check
+def captures_batch_post():
+    """
+    [POST] /captures/batch
+    Creates several capture requests at once.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Accepts JSON body with the following properties:
+    - "captures": List of objects, accepting the same properties as POST /capture (required).
+      Up to CAPTURE_BATCH_MAX_SIZE items.
+
+    Either all or none of the capture requests are created:
+    - Every item is validated before anything is written to the database.
+    - Capture requests are inserted using a single statement, in the same transaction as the
+      capacity check.
+
+    Capture requests are processed in the order in which they were listed.
+
+    Returns HTTP 200 and a list of JSON objects containing user-facing capture information.
+    Returns HTTP 400 if any item is invalid.
+    Returns HTTP 429 if MAX_PENDING_CAPTURES would be exceeded.
+    """
+    input = request.get_json(silent=True)
+    MAX_PENDING_CAPTURES = current_app.config["MAX_PENDING_CAPTURES"]
+    CAPTURE_BATCH_MAX_SIZE = current_app.config["CAPTURE_BATCH_MAX_SIZE"]
+
+    #
+    # Validate input
+    #
+    if not isinstance(input, dict) or not isinstance(input.get("captures"), list):
+        return jsonify({"error": "No list of captures provided."}), 400
+
+    if not input["captures"]:
+        return jsonify({"error": "Provided list of captures is empty."}), 400
+
+    if len(input["captures"]) > CAPTURE_BATCH_MAX_SIZE:
+        return (
+            jsonify({"error": f"Too many captures: up to {CAPTURE_BATCH_MAX_SIZE} accepted."}),
+            400,
+        )
+
+    created_timestamp = datetime.datetime.now(datetime.UTC)
+    rows = []
+
+    # Statistics of the domains of every item are looked up at once
+    heavy_domains = get_heavy_domains(
+        [item.get("url") for item in input["captures"] if isinstance(item, dict)]
+    )
+
+    for index, item in enumerate(input["captures"]):
+        try:
+            fields = parse_capture_input(item, heavy_domains)
+        except ValueError as err:
+            return jsonify({"error": f"Capture #{index}: {err}"}), 400
+
+        rows.append(
+            {
+                "id_capture": uuid.uuid4(),
+                "id_access_key": g.access_key.id_access_key,
+                # Strictly increasing (timestamps are stored with a millisecond resolution),
+                # so that captures are processed in the order they were listed
+                "created_timestamp": created_timestamp + datetime.timedelta(milliseconds=index),
+                "url": None,
+                "callback_url": None,
+                "options": None,
+                **fields,
+            }
+        )
+
+    #
+    # Check capacity and create capture requests, atomically
+    #
+    db = Capture._meta.database
+
+    try:
+        with db.atomic():
+            # Serializes concurrent batches, so that they cannot jointly exceed capacity
+            db.execute_sql("SELECT pg_advisory_xact_lock(%s)", (CAPACITY_LOCK_ID,))
+
+            pending_captures_count = Capture.select().where(Capture.status == "pending").count()
+
+            if pending_captures_count + len(rows) > MAX_PENDING_CAPTURES:
+                current_app.logger.warning(
+                    f"Capture server is over capacity: {pending_captures_count} pending jobs, "
+                    f"{len(rows)} requested."
+                )
+                return jsonify({"error": "Capture server is over capacity."}), 429
+
+            Capture.insert_many(rows).execute()
+    except Exception as err:
+        current_app.logger.error(err)
+        return jsonify({"error": "Could not create capture requests."}), 500
+
+    #
+    # Kick off as many capture tasks as there are idle worker slots.
+    # Each capture task starts the next one upon completion, which takes care of the rest.
+    #
+    sentinel = Path(current_app.config["DEPLOYMENT_SENTINEL_PATH"])
+    if sentinel.exists():
+        current_app.logger.info("Deployment sentinel is present, not triggering next capture.")
+    else:
+        # If captures are routed by class, each class has its own pool of worker slots
+        rows_by_class = defaultdict(list)
+        for row in rows:
+            rows_by_class[get_routing_class(row["capture_class"])].append(row)
+
+        for capture_class, class_rows in rows_by_class.items():
+            started_captures = Capture.select().where(Capture.status == "started")
+            worker_slots = current_app.config["CAPTURE_WORKER_SLOTS"]
+
+            if capture_class is not None:
+                started_captures = started_captures.where(Capture.capture_class == capture_class)
+
+            if capture_class == "heavy":
+                worker_slots = current_app.config["CAPTURE_HEAVY_WORKER_SLOTS"]
+
+            free_slots = worker_slots - started_captures.count()
+
+            for i in range(0, min(len(class_rows), max(free_slots, 0))):
+                start_capture_process.delay(capture_class=capture_class)
+
+    #
+    # Return info
+    #
+    captures = [Capture(**row) for row in rows]
+    return jsonify([capture_to_dict(capture) for capture in captures]), 200
+
+
+@current_app.route("/captures/status", methods=["POST"])
+@access_check
+def captures_status_post():
+    """
+    [POST] /captures/status
+    Returns information about several captures at once, identified by their `id_capture`.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Accepts JSON body with the following properties:
+    - "ids": List of `id_capture` (required). Up to CAPTURE_STATUS_MAX_SIZE items.
+    - "updated_since": Only return captures created, started or ended at or after that point
+      in time (optional). Accepts HTTP dates, as returned by this API, and ISO 8601 dates.
+
+    Only returns information about captures associated with the access key that was provided:
+    other ids are ignored.
+
+    Returns HTTP 200 and a JSON object with the following properties:
+    - "captures": List of JSON objects containing user-facing capture information.
+    - "timestamp": Time at which the request was processed.
+      Can be passed as "updated_since" by the next request of a poller.
+    """
+    input = request.get_json(silent=True)
+    updated_since = None
+    CAPTURE_STATUS_MAX_SIZE = current_app.config["CAPTURE_STATUS_MAX_SIZE"]
+
+    # Captures updated while this request is being processed will be returned by the next one
+    timestamp = datetime.datetime.now(datetime.UTC).replace(microsecond=0)
+
+    #
+    # Required input: ids
+    #
+    if not isinstance(input, dict) or not isinstance(input.get("ids"), list):
+        return jsonify({"error": "No list of ids provided."}), 400
+
+    if len(input["ids"]) > CAPTURE_STATUS_MAX_SIZE:
+        return (
+            jsonify({"error": f"Too many ids: up to {CAPTURE_STATUS_MAX_SIZE} accepted."}),
+            400,
+        )
+
+    try:
+        ids = [uuid.UUID(id_capture, version=4) for id_capture in input["ids"]]  # noqa
+    except (ValueError, TypeError, AttributeError):
+        return jsonify({"error": "Invalid format for id_capture."}), 400
+
+    #
+    # Optional input: updated_since
+    #
+    if input.get("updated_since") is not None:
+        try:
+            updated_since = parse_date(input["updated_since"])
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid format for updated_since."}), 400
+
+    #
+    # Pull matching captures, without their artifacts
+    #
+    captures = []
+
+    if ids:
+        query = Capture.select_without_artifacts().where(
+            Capture.id_capture.in_(ids),
+            Capture.id_access_key == g.access_key.id_access_key,
+        )
+
+        if updated_since:
+            # Timestamps are stored as milliseconds
+            query = query.where(
+                fn.GREATEST(
+                    Capture.created_timestamp,
+                    Capture.started_timestamp,
+                    Capture.ended_timestamp,
+                )
+                >= int(updated_since.timestamp() * 1000)
+            )
+
+        captures = list(query.order_by(Capture.created_timestamp))
+
+    return (
+        jsonify(
+            {
+                "captures": [capture_to_dict(capture) for capture in captures],
+                "timestamp": timestamp,
+            }
+        ),
+        200,
+    )
+
+
+@current_app.route("/captures/events", methods=["GET"])
+@access_check
+def captures_events_get():
+    """
+    [GET] /captures/events
+    Streams status changes of all the captures associated with the access key that was provided,
+    as server-sent events.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Each "status" event contains user-facing capture information.
+    See utils.stream_capture_events for details.
+    """
+    return Response(
+        stream_with_context(stream_capture_events(g.access_key.id_access_key)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def encode_cursor(capture: Capture) -> str:
+    """
+    Returns an opaque pagination cursor pointing right after a given capture (see `captures_get`).
+    Timestamps are encoded as stored in the database, in milliseconds.
+    """
+    created_timestamp = Capture.created_timestamp.db_value(capture.created_timestamp)
+    cursor = json.dumps([created_timestamp, str(capture.id_capture)])
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, uuid.UUID]:
+    """
+    Decodes a pagination cursor generated by `encode_cursor`.
+    Raises a ValueError if `cursor` is invalid.
+    """
+    try:
+        created_timestamp, id_capture = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(created_timestamp), uuid.UUID(id_capture)
+    except (binascii.Error, TypeError, AttributeError, json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def parse_date(value: str) -> datetime.datetime:
+    """
+    Parses an HTTP date (i.e: "Wed, 28 Jun 2023 16:30:28 GMT") or ISO 8601 date.
+    Dates without timezone information are assumed to be UTC.
+    Raises a ValueError if `value` cannot be parsed.
+    """
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (ValueError, TypeError):
+        date = datetime.datetime.fromisoformat(value)
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.UTC)
+
+    return date
@@ -0,0 +1,38 @@
+"""
+`views.stats` module: API process statistics route.
+"""
+
+from flask import current_app, jsonify
+
+from ..utils import access_check, get_resolver
+
+
+@current_app.route("/stats", methods=["GET"])
+@access_check
+def stats_get():
+    """
+    [GET] /stats
+    Returns usage statistics of the API process that handled the request.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Returns HTTP 200 and a JSON object with the following properties:
+    - "artifact_cache": Hits, misses, evictions and size of the artifact cache (see views.artifact).
+    - "compression_cache": Same, for the cache of compressed responses
+      (see utils.response_compression).
+    - "dns_cache": Hits, misses, negative hits and timeouts of the DNS cache
+      (see utils.dns_resolver).
+    - "validation_cache": Hits, misses and size of the cache of URL validation results
+      (see views.validate).
+    """
+    return (
+        jsonify(
+            {
+                "artifact_cache": current_app.extensions["artifact_cache"].get_stats(),
+                "compression_cache": current_app.extensions["compression_cache"].get_stats(),
+                "dns_cache": get_resolver().get_stats(),
+                "validation_cache": current_app.extensions["validation_cache"].get_stats(),
+            }
+        ),
+        200,
+    )
@@ -1,12 +1,102 @@
 """
-`views.validate` module: URL validation route.
+`views.validate` module: URL validation routes.
 """
 
-from flask import request, jsonify, current_app
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import defaultdict, deque
+import heapq
+from urllib.parse import urlparse
+
+from flask import Response, request, jsonify, current_app, stream_with_context
 import requests
 import validators
 
-from ..utils import access_check, resolve_ip, validate_ip, get_response, get_content_length
+from ..utils import (
+    access_check,
+    get_content_length,
+    get_response,
+    get_validation_user_agent,
+    normalize_url,
+    resolve_ip,
+    validate_ip,
+)
+
+
+def validate_url(url: str) -> dict:
+    """
+    Checks to see if a URL is a valid capture target (see `check_url`).
+
+    Results are cached by each process, keyed by normalized URL and validation user agent,
+    for VALIDATION_CACHE_TTL seconds if valid, VALIDATION_CACHE_INVALID_TTL seconds otherwise.
+
+    Returns a dictionary containing user-facing validation information (see `validate_post`).
+    """
+    # Does the URL appear to be valid?
+    strict = current_app.config["STRICT_URL_VALIDATION"]
+    if not isinstance(url, str) or validators.url(url, strict_query=strict) is not True:
+        return {"valid": False, "message": "Not a valid URL."}
+
+    cache = current_app.extensions["validation_cache"]
+    cache_key = (normalize_url(url), get_validation_user_agent(url))
+
+    if cache_key[0] and (result := cache.get(cache_key)) is not None:
+        return dict(result)
+
+    result = check_url(url)
+
+    if cache_key[0]:
+        if result["valid"]:
+            cache.set(cache_key, result, current_app.config["VALIDATION_CACHE_TTL"])
+        else:
+            cache.set(cache_key, result, current_app.config["VALIDATION_CACHE_INVALID_TTL"])
+
+    return dict(result)
+
+
+def check_url(url: str) -> dict:
+    """
+    Checks to see if a valid URL is a valid capture target:
+    does its domain name resolve to allowed IP ranges, and does it respond to our requests?
+
+    Returns a dictionary containing user-facing validation information (see `validate_post`).
+    """
+    #
+    # Validate URL
+    #
+
+    # Does the domain name resolve?
+    try:
+        if not (ips := resolve_ip(url)):
+            return {"valid": False, "message": "Couldn't resolve domain."}
+    except OSError:
+        return {"valid": False, "message": "Couldn't resolve domain promptly."}
+
+    # Does the domain only resolve to allowed IP ranges? (IPv4 and IPv6)
+    if not validate_ip(ips):
+        return {"valid": False, "message": "Not a valid IP."}
+
+    # Does the page respond to our requests?
+    try:
+        response = get_response(url)
+    except requests.TooManyRedirects:
+        return {"valid": False, "message": "URL caused a redirect loop."}
+    # With requests < 3, responses where response.ok() is false are falsey.
+    # So, explicitly check for None
+    if response is None:
+        return {"valid": False, "message": "Couldn't load URL."}
+
+    # The URL is valid! Return the content length if we have one
+    if content_length := get_content_length(response.headers):
+        return {
+            "valid": True,
+            "status_code": response.status_code,
+            "content_length": content_length,
+        }
+
+    return {
+        "valid": True,
+        "status_code": response.status_code,
+    }
 
 
 @current_app.route("/validate", methods=["POST"])
@@ -21,10 +111,9 @@ def validate_post():
     Accepts JSON body with the following properties:
     - "url": Url to validate (required)
 
-    Returns HTTP 200 and a JSON object containing user-facing capture information.
+    Returns HTTP 200 and a JSON object containing user-facing validation information.
     """
     input = request.get_json()
-    url = None
 
     #
     # Required input: url
@@ -32,55 +121,141 @@ def validate_post():
     if "url" not in input:
         return jsonify({"error": "No URL provided."}), 400
 
-    url = input["url"]
+    return jsonify(validate_url(input["url"])), 200
+
+
+@current_app.route("/validate/batch", methods=["POST"])
+@access_check
+def validate_batch_post():
+    """
+    [POST] /validate/batch
+    Checks to see if a list of URLs are valid capture targets.
+
+    Behind auth: Requires Access-Key header (see utils.access_check).
+
+    Accepts JSON body with the following properties:
+    - "urls": List of up to VALIDATION_BATCH_MAX_SIZE urls to validate (required)
+
+    URLs are validated concurrently: up to VALIDATION_BATCH_CONCURRENCY at once,
+    and no more than VALIDATION_BATCH_PER_HOST at once for a given host.
+
+    Returns HTTP 200 and a JSON array containing user-facing validation information for each URL,
+    in order, with an additional "url" property (see `validate_post`).
+
+    If the request's Accept header prefers "application/x-ndjson", results are streamed as
+    newline-delimited JSON objects as soon as they are available, in no particular order,
+    with an additional "index" property.
+    """
+    input = request.get_json()
+    MAX_SIZE = current_app.config["VALIDATION_BATCH_MAX_SIZE"]
 
     #
-    # Validate URL
+    # Required input: urls
     #
-    # Does the URL appear to be valid?
-    strict = current_app.config["STRICT_URL_VALIDATION"]
-    if validators.url(url, strict_query=strict) is not True:
-        return jsonify({"valid": False, "message": "Not a valid URL."}), 200
+    if not isinstance(input, dict) or "urls" not in input:
+        return jsonify({"error": "No URLs provided."}), 400
 
-    # Does the domain name resolve?
-    try:
-        if not (ip := resolve_ip(url)):
-            return jsonify({"valid": False, "message": "Couldn't resolve domain."}), 200
-    except OSError:
-        return jsonify({"valid": False, "message": "Couldn't resolve domain promptly."}), 200
+    urls = input["urls"]
 
-    # Does the domain resolve to an allowed IP range?
-    if not validate_ip(ip):
-        return jsonify({"valid": False, "message": "Not a valid IP."}), 200
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "urls must be a non-empty list."}), 400
 
-    # Does the page respond to our requests?
-    try:
-        response = get_response(url)
-    except requests.TooManyRedirects:
-        return jsonify({"valid": False, "message": "URL caused a redirect loop."}), 200
-    # With requests < 3, responses where response.ok() is false are falsey.
-    # So, explicitly check for None
-    if response is None:
-        return jsonify({"valid": False, "message": "Couldn't load URL."}), 200
+    if len(urls) > MAX_SIZE:
+        return jsonify({"error": f"Cannot validate more than {MAX_SIZE} URLs at once."}), 400
 
-    # The URL is valid! Return the content length if we have one
-    if content_length := get_content_length(response.headers):
-        return (
-            jsonify(
-                {
-                    "valid": True,
-                    "status_code": response.status_code,
-                    "content_length": content_length,
-                }
+    results = validate_urls(urls)
+
+    if request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == (
+        "application/x-ndjson"
+    ):
+        return Response(
+            stream_with_context(
+                current_app.json.dumps({"index": index, "url": urls[index], **result}) + "\n"
+                for index, result in results
             ),
-            200,
+            mimetype="application/x-ndjson",
+            headers={"X-Accel-Buffering": "no"},
         )
-    return (
-        jsonify(
-            {
-                "valid": True,
-                "status_code": response.status_code,
-            }
-        ),
-        200,
-    )
+
+    ordered = [None] * len(urls)
+    for index, result in results:
+        ordered[index] = {"url": urls[index], **result}
+
+    return jsonify(ordered), 200
+
+
+def validate_urls(urls: list):
+    """
+    Runs `validate_url` concurrently on a list of URLs (see `validate_batch_post`).
+    Yields (index, result) tuples as validations complete.
+
+    URLs are only handed to the thread pool once their host is validated by fewer than
+    VALIDATION_BATCH_PER_HOST threads, oldest first: threads never wait on a busy host while
+    URLs of other hosts are pending. URLs without a host fail without any request, and are
+    not limited.
+    """
+    app = current_app._get_current_object()
+    per_host_limit = int(app.config["VALIDATION_BATCH_PER_HOST"])
+    max_workers = min(int(app.config["VALIDATION_BATCH_CONCURRENCY"]), len(urls))
+
+    def get_host(url):
+        try:
+            return urlparse(url).hostname if isinstance(url, str) else None
+        except ValueError:
+            return None
+
+    def get_limit(host):
+        return per_host_limit if host is not None else len(urls)
+
+    def validate(url):
+        with app.app_context():
+            return validate_url(url)
+
+    hosts = [get_host(url) for url in urls]
+    waiting = defaultdict(deque)  # Indexes of URLs not submitted yet, per host
+    running = defaultdict(int)  # Number of validations in progress, per host
+
+    for index, host in enumerate(hosts):
+        waiting[host].append(index)
+
+    # Hosts with URLs waiting and a free slot, by index of their next URL
+    ready = [(indexes[0], host) for host, indexes in waiting.items()]
+    heapq.heapify(ready)
+
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="validate-batch")
+
+    def submit_ready():
+        while ready and len(futures) < max_workers:
+            _, host = heapq.heappop(ready)
+            index = waiting[host].popleft()
+            running[host] += 1
+            futures[executor.submit(validate, urls[index])] = index
+
+            if waiting[host] and running[host] < get_limit(host):
+                heapq.heappush(ready, (waiting[host][0], host))
+
+    def release(host):
+        running[host] -= 1
+
+        # The host just got a free slot back
+        if waiting[host] and running[host] == get_limit(host) - 1:
+            heapq.heappush(ready, (waiting[host][0], host))
+
+    try:
+        submit_ready()
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            results = []
+
+            for future in done:
+                index = futures.pop(future)
+                release(hosts[index])
+                results.append((index, future.result()))
+
+            submit_ready()
+            yield from results
+    finally:
+        # Pending validations are abandoned if the client disconnects
+        executor.shutdown(wait=False, cancel_futures=True)